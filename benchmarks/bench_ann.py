@@ -0,0 +1,126 @@
+"""
+Recall/latency benchmark of the IVF index against exact search.
+
+Generates clustered synthetic embeddings, builds an IVF index and reports,
+for each ``nprobe``, recall@k against brute-force search together with
+queries per second and p50/p99 single-query latency.
+
+Usage:
+    python benchmarks/bench_ann.py --vectors 100000 --dimension 384
+    python benchmarks/bench_ann.py --vectors 1000000 --nprobe 4,8,16,32 --json results.json
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "services" / "embeddings_service"))
+
+from ann_index import IVFIndex  # noqa: E402
+from vector_store import normalize_rows  # noqa: E402
+
+
+def synthetic_vectors(count: int, centers: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Unit vectors drawn around cluster centres, like topic-clustered chunk embeddings."""
+    clusters, dimension = centers.shape
+    vectors = np.empty((count, dimension), dtype=np.float32)
+    for start in range(0, count, 1 << 16):
+        n = min(1 << 16, count - start)
+        noise = rng.standard_normal((n, dimension)).astype(np.float32)
+        vectors[start:start + n] = centers[rng.integers(clusters, size=n)] + 0.5 * noise
+    return normalize_rows(vectors)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Ground-truth neighbours by brute force, in blocks to bound memory."""
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_rows = np.zeros((len(queries), k), dtype=np.int64)
+    for start in range(0, len(vectors), 1 << 16):
+        block_scores = queries @ vectors[start:start + (1 << 16)].T
+        block_rows = np.broadcast_to(np.arange(start, start + block_scores.shape[1]), block_scores.shape)
+        scores = np.concatenate([best_scores, block_scores], axis=1)
+        rows = np.concatenate([best_rows, block_rows], axis=1)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_rows = np.take_along_axis(rows, top, axis=1)
+    return best_rows
+
+
+def percentile_ms(samples: list[float], q: float) -> float:
+    return float(np.percentile(samples, q) * 1000)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--clusters", type=int, default=200, help="Topic clusters in the synthetic data")
+    parser.add_argument("--nlist", type=int, default=0, help="IVF cells; 0 = 4 * sqrt(vectors)")
+    parser.add_argument("--nprobe", default="1,4,8,16,32,64", help="Comma-separated nprobe values")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((args.clusters, args.dimension)).astype(np.float32)
+    vectors = synthetic_vectors(args.vectors, centers, rng)
+    queries = synthetic_vectors(args.queries, centers, rng)
+    ids = np.column_stack([np.zeros(args.vectors, dtype=np.int64), np.arange(args.vectors)])
+
+    nlist = args.nlist or int(4 * np.sqrt(args.vectors))
+    started = time.perf_counter()
+    index = IVFIndex(args.dimension, nlist=nlist)
+    index.train(vectors[rng.choice(args.vectors, min(args.vectors, nlist * 64), replace=False)])
+    train_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    index.add(vectors, ids)
+    add_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    truth = exact_top_k(vectors, queries, args.k)
+    exact_qps = args.queries / (time.perf_counter() - started)
+
+    print(f"{args.vectors} vectors x {args.dimension} dims, {nlist} cells: "
+          f"train {train_seconds:.1f}s, add {add_seconds:.1f}s, exact search {exact_qps:.0f} QPS (batched)")
+    print(f"{'nprobe':>6} {'recall@' + str(args.k):>10} {'QPS':>8} {'p50 ms':>8} {'p99 ms':>8}")
+
+    results = []
+    for nprobe in [int(value) for value in args.nprobe.split(",")]:
+        latencies = []
+        found = []
+        for query in queries:
+            started = time.perf_counter()
+            hits = index.search(query, k=args.k, nprobe=nprobe)[0]
+            latencies.append(time.perf_counter() - started)
+            found.append({hit.ordinal for hit in hits})
+        recall = float(np.mean([len(f & set(t)) / args.k for f, t in zip(found, truth.tolist())]))
+        row = {
+            "nprobe": nprobe,
+            "recall": recall,
+            "qps": len(queries) / sum(latencies),
+            "p50_ms": percentile_ms(latencies, 50),
+            "p99_ms": percentile_ms(latencies, 99),
+        }
+        results.append(row)
+        print(f"{nprobe:>6} {recall:>10.3f} {row['qps']:>8.0f} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "vectors": args.vectors,
+                "dimension": args.dimension,
+                "nlist": nlist,
+                "train_seconds": train_seconds,
+                "add_seconds": add_seconds,
+                "exact_qps": exact_qps,
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
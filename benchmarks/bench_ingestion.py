@@ -0,0 +1,204 @@
+"""
+Benchmark of the ingestion hot path and end-to-end uploads.
+
+Synthetic PDFs are generated offline, then each stage is timed on its own:
+
+* ``extract``: text extraction, per page, once per backend in ``--extractors``
+  (``extract`` for ``layout``, so earlier reports stay comparable, then
+  ``extract[fast]``, ``extract[auto]``)
+* ``chunk``: ``chunk_text`` over each document's text
+* ``commit``: saving a document and its chunks to the database
+* ``process_pdf``: full ingestion service request, in-process over ASGI
+* ``upload``: full gateway request forwarded to the ingestion service, in-process over ASGI
+
+Every request uploads a distinct PDF so content deduplication does not skew
+the numbers. The database defaults to a temporary SQLite file; set
+``DATABASE_URL`` to benchmark against PostgreSQL.
+
+Usage:
+    python benchmarks/bench_ingestion.py --pages 20 --documents 20 --concurrency 4
+    python benchmarks/bench_ingestion.py --stages process_pdf,upload --json results.json
+    python benchmarks/bench_ingestion.py --stages extract --extractors layout,fast,auto
+    python benchmarks/compare.py baseline.json results.json
+"""
+import argparse
+import asyncio
+import hashlib
+import importlib.util
+import logging
+import os
+import sys
+import tempfile
+
+import httpx
+
+from harness import REPO_ROOT, print_table, run_concurrent, run_sync, summarize, write_report
+from synthetic import synthetic_pdf
+
+STAGES = ("extract", "chunk", "commit", "process_pdf", "upload")
+API_KEY = os.getenv("API_KEY", "dev-key-change-in-production")
+
+
+def load_service(service: str, module_name: str):
+    """Import a service's ``main.py`` under a unique module name, as the test suite does."""
+    service_dir = REPO_ROOT / "services" / service
+    sys.path.insert(0, str(service_dir))
+    spec = importlib.util.spec_from_file_location(module_name, service_dir / "main.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+async def run(args) -> list[dict]:
+    ingestion = load_service("ingestion_service", "ingestion_main")
+    from extraction import extract_page_range, inspect_document
+    from extractors import LAYOUT
+    from utils import chunk_text
+
+    documents = [
+        synthetic_pdf(args.pages, args.words_per_page, seed=args.seed + i) for i in range(args.documents)
+    ]
+    doc_bytes = sum(len(content) for content in documents)
+    doc_pages = args.pages * args.documents
+    stages = args.stages.split(",")
+    results = []
+
+    texts = []
+    if "extract" in stages or "chunk" in stages:
+        # The chunk stage only needs one backend's text
+        modes = args.extractors.split(",") if "extract" in stages else [LAYOUT]
+        for mode in modes:
+            page_latencies = []
+            mode_texts = []
+
+            def extract(content):
+                with tempfile.NamedTemporaryFile(suffix=".pdf") as spooled:
+                    spooled.write(content)
+                    spooled.flush()
+                    # As the executor does: resolve ``auto`` first, then extract
+                    _, resolved = inspect_document(spooled.name, mode)
+                    pages = extract_page_range(spooled.name, 1, args.pages, mode=resolved)
+                page_latencies.extend(seconds for _, _, seconds, _ in pages)
+                mode_texts.append(" ".join(text for _, text, _, _ in pages))
+
+            _, elapsed = run_sync([lambda content=content: extract(content) for content in documents])
+            if "extract" in stages:
+                name = "extract" if mode == LAYOUT else f"extract[{mode}]"
+                results.append(summarize(name, page_latencies, elapsed, pages=doc_pages, nbytes=doc_bytes))
+            if not texts:
+                texts = mode_texts
+
+    if "chunk" in stages:
+        text_bytes = sum(len(text.encode()) for text in texts)
+        latencies, elapsed = run_sync([lambda text=text: chunk_text(text) for text in texts])
+        results.append(summarize("chunk", latencies, elapsed, pages=doc_pages, nbytes=text_bytes))
+
+    if "commit" in stages:
+        rows = [
+            {"ordinal": i, "page_start": 1, "page_end": 1, "char_start": i * 900, "char_end": i * 900 + 1000,
+             "text": text}
+            for i, text in enumerate(chunk_text(texts[0] if texts else "lorem ipsum " * 5000))
+        ]
+        run_id = os.urandom(8).hex()
+        latencies, elapsed = await run_concurrent([
+            lambda i=i: ingestion.save_document(
+                f"bench-{i}.pdf", hashlib.sha256(f"{run_id}-{i}".encode()).hexdigest(), args.pages, rows
+            )
+            for i in range(args.documents)
+        ], args.concurrency)
+        results.append(summarize("commit", latencies, elapsed, pages=doc_pages, concurrency=args.concurrency))
+
+    # Later stages upload fresh documents so earlier ones are not deduplicated
+    offset = args.documents
+
+    if "process_pdf" in stages:
+        fresh = [
+            synthetic_pdf(args.pages, args.words_per_page, seed=args.seed + offset + i)
+            for i in range(args.documents)
+        ]
+        offset += args.documents
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=ingestion.app), base_url="http://ingestion", timeout=None
+        ) as client:
+            async def process(content):
+                response = await client.post(
+                    "/process_pdf", files={"file": ("bench.pdf", content, "application/pdf")}
+                )
+                response.raise_for_status()
+
+            latencies, elapsed = await run_concurrent(
+                [lambda content=content: process(content) for content in fresh], args.concurrency
+            )
+        results.append(summarize(
+            "process_pdf", latencies, elapsed, pages=doc_pages, nbytes=doc_bytes, concurrency=args.concurrency
+        ))
+
+    if "upload" in stages:
+        gateway = load_service("api_gateway", "gateway_main")
+        fresh = [
+            synthetic_pdf(args.pages, args.words_per_page, seed=args.seed + offset + i)
+            for i in range(args.documents)
+        ]
+        # The gateway's shared upstream client talks to the ingestion app in-process
+        gateway.app.state.ingestion_client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=ingestion.app), timeout=None
+        )
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=gateway.app), base_url="http://gateway", timeout=None
+        ) as client:
+            async def upload(content):
+                response = await client.post(
+                    "/upload", headers={"X-API-Key": API_KEY},
+                    files={"file": ("bench.pdf", content, "application/pdf")}
+                )
+                response.raise_for_status()
+
+            latencies, elapsed = await run_concurrent(
+                [lambda content=content: upload(content) for content in fresh], args.concurrency
+            )
+        await gateway.app.state.ingestion_client.aclose()
+        results.append(summarize(
+            "upload", latencies, elapsed, pages=doc_pages, nbytes=doc_bytes, concurrency=args.concurrency
+        ))
+
+    ingestion.extraction_executor.shutdown()
+    await ingestion.async_engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pages", type=int, default=10, help="Pages per synthetic PDF")
+    parser.add_argument("--words-per-page", type=int, default=400, help="Text density, up to 700")
+    parser.add_argument("--documents", type=int, default=10, help="Documents per stage")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight for the async stages")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated subset of " + ", ".join(STAGES))
+    parser.add_argument("--extractors", default="layout",
+                        help="Comma-separated extraction backends for the extract stage: layout, fast, auto")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    unknown = set(args.stages.split(",")) - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+    unknown = set(args.extractors.split(",")) - {"layout", "fast", "auto"}
+    if unknown:
+        parser.error(f"Unknown extractors: {', '.join(sorted(unknown))}")
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    os.environ.setdefault("EMBEDDINGS_SERVICE_URL", "")  # no vector indexing
+    os.environ.setdefault("ENABLE_METRICS", "false")
+
+    # Per-request INFO logs would dominate the timings (and both services configure logging)
+    logging.disable(logging.INFO)
+    results = asyncio.run(run(args))
+    print(f"{args.documents} documents x {args.pages} pages, {args.words_per_page} words/page")
+    print_table(results)
+    if args.json:
+        write_report(args.json, "ingestion", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Compare two benchmark reports and flag regressions.
+
+Prints the relative change of throughput and latency percentiles per stage
+and exits with status 1 if any stage regressed by more than the threshold.
+
+Usage:
+    python benchmarks/compare.py baseline.json candidate.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+# Metric name -> whether higher is better
+METRICS = {
+    "pages_per_s": True,
+    "mb_per_s": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+}
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> list[str]:
+    """Print a comparison table; returns the regressions beyond ``threshold`` percent."""
+    before = {row["stage"]: row for row in baseline["results"]}
+    regressions = []
+    print(f"{baseline.get('commit')} -> {candidate.get('commit')}")
+    print(f"{'stage':<12} " + " ".join(f"{metric:>12}" for metric in METRICS))
+    for row in candidate["results"]:
+        old = before.get(row["stage"])
+        if old is None:
+            continue
+        cells = []
+        for metric, higher_is_better in METRICS.items():
+            if not old.get(metric):
+                cells.append(f"{'-':>12}")
+                continue
+            change = (row[metric] - old[metric]) / old[metric] * 100
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressions.append(f"{row['stage']} {metric} {change:+.1f}%")
+            cells.append(f"{change:>+11.1f}%")
+        print(f"{row['stage']:<12} " + " ".join(cells))
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    regressions = compare(baseline, candidate, args.threshold)
+    if regressions:
+        print("Regressions: " + ", ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Timing helpers shared by the benchmarks: concurrent runners, latency
+summaries and JSON reports that ``compare.py`` can diff between commits.
+"""
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def summarize(stage: str, latencies: list[float], elapsed: float, pages: int = 0, nbytes: int = 0,
+              concurrency: int = 1) -> dict:
+    """
+    Summarise one stage: operations, throughput and latency percentiles.
+
+    Args:
+        stage: Stage name
+        latencies: Seconds per operation
+        elapsed: Wall-clock seconds for all operations
+        pages: PDF pages processed, for pages/s
+        nbytes: Input bytes processed, for MB/s
+        concurrency: Operations in flight at once
+    """
+    samples = np.asarray(latencies) * 1000
+    return {
+        "stage": stage,
+        "operations": len(latencies),
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "ops_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "pages_per_s": pages / elapsed if elapsed else 0.0,
+        "mb_per_s": nbytes / elapsed / 1e6 if elapsed else 0.0,
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+    }
+
+
+def run_sync(operations: list[Callable[[], object]]) -> tuple[list[float], float]:
+    """Run operations one after another; returns per-operation and total seconds."""
+    latencies = []
+    started = time.perf_counter()
+    for operation in operations:
+        op_started = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - op_started)
+    return latencies, time.perf_counter() - started
+
+
+async def run_concurrent(operations: list[Callable[[], Awaitable[object]]],
+                         concurrency: int) -> tuple[list[float], float]:
+    """Run coroutine factories with at most ``concurrency`` in flight; returns per-operation and total seconds."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(operation):
+        async with semaphore:
+            op_started = time.perf_counter()
+            await operation()
+            return time.perf_counter() - op_started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(timed(operation) for operation in operations))
+    return list(latencies), time.perf_counter() - started
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_report(path: str, benchmark: str, parameters: dict, results: list[dict]) -> None:
+    """Write results with the commit and environment they were measured on."""
+    report = {
+        "benchmark": benchmark,
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parameters": parameters,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def print_table(results: list[dict]) -> None:
+    print(f"{'stage':<12} {'ops':>6} {'conc':>5} {'pages/s':>9} {'MB/s':>8} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for row in results:
+        print(f"{row['stage']:<12} {row['operations']:>6} {row['concurrency']:>5} {row['pages_per_s']:>9.1f} "
+              f"{row['mb_per_s']:>8.2f} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}")
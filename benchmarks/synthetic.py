@@ -0,0 +1,90 @@
+"""
+Offline generator of synthetic PDFs with a controlled page count and text density.
+
+Text is drawn from a fixed pseudo-word vocabulary with a Zipf-like
+frequency, so documents look like prose to the chunker and the keyword
+index while staying fully reproducible from a seed.
+"""
+import random
+import string
+
+FONT_SIZE = 9
+LEADING = 11
+CHARS_PER_LINE = 100
+LINES_PER_PAGE = 68
+MAX_WORDS_PER_PAGE = 700
+
+
+def _vocabulary(size: int = 2000, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 11))) for _ in range(size)]
+
+
+_VOCABULARY = _vocabulary()
+_WEIGHTS = [1.0 / rank for rank in range(1, len(_VOCABULARY) + 1)]
+
+
+def synthetic_text(words: int, rng: random.Random) -> list[str]:
+    """Return ``words`` pseudo-words as lines of at most ``CHARS_PER_LINE`` characters."""
+    lines, line = [], []
+    length = 0
+    for i, word in enumerate(rng.choices(_VOCABULARY, weights=_WEIGHTS, k=words)):
+        if i % 15 == 14:
+            word += "."
+        if length + len(word) + 1 > CHARS_PER_LINE:
+            lines.append(" ".join(line))
+            line, length = [], 0
+        line.append(word)
+        length += len(word) + 1
+    if line:
+        lines.append(" ".join(line))
+    return lines
+
+
+def synthetic_pdf(pages: int, words_per_page: int = 400, seed: int = 0) -> bytes:
+    """
+    Build a text-only PDF of ``pages`` pages with ``words_per_page`` words each.
+
+    Different seeds give different bytes, so repeated uploads are not
+    deduplicated by content hash.
+    """
+    if not 0 < words_per_page <= MAX_WORDS_PER_PAGE:
+        raise ValueError(f"words_per_page must be between 1 and {MAX_WORDS_PER_PAGE}")
+    rng = random.Random(seed)
+    objects: list = []
+
+    def add(body) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = add(None)
+    page_ids = []
+    for _ in range(pages):
+        ops = ["BT", f"/F1 {FONT_SIZE} Tf", f"{LEADING} TL", "40 760 Td"]
+        ops.extend(f"({line}) Tj T*" for line in synthetic_text(words_per_page, rng)[:LINES_PER_PAGE])
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, content_id, font_id)
+        ))
+
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref
+    )
+    return bytes(out)
@@ -0,0 +1,218 @@
+"""
+Admission control for API Gateway.
+
+Under overload it is better to turn some requests away at once than to
+accept everything and let every request time out together. Three limits
+apply, each answering with ``Retry-After`` so clients back off:
+
+* a token bucket per API key (``rate_per_second`` refill, ``burst``
+  capacity) for every authenticated request -> 429;
+* a cap on concurrent uploads per API key, so one client's burst of uploads
+  cannot fill the ingestion service -> 429;
+* a global cap on requests in flight. Requests over it wait in a short,
+  bounded queue for a slot and are rejected when the queue is full or the
+  wait times out -> 503.
+
+Slots are held until the response has been sent, including streamed
+bodies. Limits are per gateway process.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+from prometheus_client import Counter, Gauge
+
+from auth import ApiKey
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "gateway_admission_in_flight",
+    "Requests admitted by the global limiter that have not finished",
+)
+ADMISSION_QUEUED = Gauge(
+    "gateway_admission_queued",
+    "Requests waiting for a slot in the global limiter",
+)
+ADMISSION_UPLOADS_IN_FLIGHT = Gauge(
+    "gateway_admission_uploads_in_flight",
+    "Uploads in progress, by API key",
+    ["api_key"],
+)
+ADMISSION_TOKENS = Gauge(
+    "gateway_admission_rate_limit_tokens",
+    "Tokens left in an API key's rate limit bucket when last checked",
+    ["api_key"],
+)
+ADMISSION_REJECTIONS = Counter(
+    "gateway_admission_rejections_total",
+    "Requests rejected by admission control, by reason and API key",
+    ["reason", "api_key"],
+)
+
+
+class TokenBucket:
+    """
+    Token bucket holding up to ``burst`` tokens, refilled at ``rate`` per second.
+
+    Example:
+        >>> bucket = TokenBucket(rate=1.0, burst=2, now=0.0)
+        >>> bucket.take(now=0.0), bucket.take(now=0.0), bucket.take(now=0.0)
+        (0.0, 0.0, 1.0)
+    """
+
+    def __init__(self, rate: float, burst: int, now: float | None = None):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic() if now is None else now
+
+    def take(self, now: float | None = None) -> float:
+        """Take a token; return 0 on success, else seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class ConcurrencyLimiter:
+    """
+    At most ``limit`` holders at once, with up to ``max_queued`` waiting
+    ``max_wait`` seconds each for a slot (first come, first served).
+
+    Args:
+        limit: Concurrent holders; 0 disables the limit
+        max_queued: Waiters allowed beyond the limit; others are refused at once
+        max_wait: Seconds a waiter may wait for a slot
+    """
+
+    def __init__(self, limit: int, max_queued: int, max_wait: float):
+        self.limit = limit
+        self.max_queued = max_queued
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> bool:
+        """Take a slot; False if none became free in time or the queue is full."""
+        if self.limit <= 0 or (self.in_flight < self.limit and not self._waiters):
+            self.in_flight += 1
+            return True
+        if len(self._waiters) >= self.max_queued or self.max_wait <= 0:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUED.set(len(self._waiters))
+        try:
+            # A released slot is handed straight to the waiter (see ``release``)
+            await asyncio.wait([waiter], timeout=self.max_wait)
+        except asyncio.CancelledError:
+            if waiter.done():
+                self.release()
+            raise
+        finally:
+            if not waiter.done():
+                self._waiters.remove(waiter)
+                waiter.cancel()
+            ADMISSION_QUEUED.set(len(self._waiters))
+        return not waiter.cancelled()
+
+    def release(self) -> None:
+        if self._waiters:
+            # The slot passes to the next waiter; in_flight is unchanged
+            self._waiters.popleft().set_result(None)
+        else:
+            self.in_flight -= 1
+
+
+class AdmissionController:
+    """
+    Admission limits of one gateway process.
+
+    Args:
+        max_in_flight: Requests handled at once across all keys (0 = unlimited)
+        max_queued: Requests that may wait for a slot once ``max_in_flight`` is reached
+        queue_timeout: Seconds a queued request waits before it is rejected
+        retry_after: ``Retry-After`` seconds sent with 503 and upload-cap 429s
+    """
+
+    def __init__(self, max_in_flight: int, max_queued: int, queue_timeout: float, retry_after: int = 1):
+        self.retry_after = retry_after
+        self._global = ConcurrencyLimiter(max_in_flight, max_queued, queue_timeout)
+        self._buckets: dict[str, TokenBucket] = {}
+        self._uploads: dict[str, int] = {}
+
+    def _reject(self, status_code: int, reason: str, client: ApiKey, detail: str, retry_after: float) -> None:
+        ADMISSION_REJECTIONS.labels(reason=reason, api_key=client.name).inc()
+        logger.warning("Request rejected (%s) for %s", reason, client.name)
+        raise HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+    def check_rate(self, client: ApiKey) -> None:
+        """
+        Charge one request to ``client``'s token bucket.
+
+        Raises:
+            HTTPException: 429 with ``Retry-After`` when the bucket is empty
+        """
+        if client.rate_per_second <= 0:
+            return
+        bucket = self._buckets.get(client.name)
+        if bucket is None:
+            bucket = self._buckets[client.name] = TokenBucket(client.rate_per_second, client.burst)
+        wait = bucket.take()
+        ADMISSION_TOKENS.labels(api_key=client.name).set(bucket.tokens)
+        if wait > 0:
+            self._reject(429, "rate_limit", client, "Rate limit exceeded. Please slow down.", wait)
+
+    @asynccontextmanager
+    async def request(self, client: ApiKey) -> AsyncIterator[None]:
+        """
+        Hold a global in-flight slot, waiting briefly in the queue if needed.
+
+        Raises:
+            HTTPException: 503 with ``Retry-After`` if no slot became free
+        """
+        if not await self._global.acquire():
+            self._reject(503, "overloaded", client, "Service is overloaded. Please retry later.", self.retry_after)
+        ADMISSION_IN_FLIGHT.set(self._global.in_flight)
+        try:
+            yield
+        finally:
+            self._global.release()
+            ADMISSION_IN_FLIGHT.set(self._global.in_flight)
+
+    @asynccontextmanager
+    async def upload(self, client: ApiKey) -> AsyncIterator[None]:
+        """
+        Hold one of ``client``'s concurrent upload slots.
+
+        Raises:
+            HTTPException: 429 with ``Retry-After`` when all are in use
+        """
+        uploads = self._uploads.get(client.name, 0)
+        if 0 < client.max_concurrent_uploads <= uploads:
+            self._reject(
+                429, "concurrent_uploads", client,
+                f"Too many uploads in progress for this API key (limit {client.max_concurrent_uploads}).",
+                self.retry_after
+            )
+        self._uploads[client.name] = uploads + 1
+        ADMISSION_UPLOADS_IN_FLIGHT.labels(api_key=client.name).set(uploads + 1)
+        try:
+            yield
+        finally:
+            self._uploads[client.name] -= 1
+            ADMISSION_UPLOADS_IN_FLIGHT.labels(api_key=client.name).set(self._uploads[client.name])
@@ -1,6 +1,15 @@
 """
 Authentication middleware for API Gateway.
+
+Clients are identified by API key. ``API_KEYS`` lists one entry per client,
+comma-separated, as ``name:key[:rate[:burst[:uploads]]]``: requests per
+second, token bucket size and concurrent uploads for that key (see
+``admission``). Omitted limits use the ``DEFAULT_*`` settings below. Without
+``API_KEYS``, the single ``API_KEY`` is accepted under the name ``default``.
 """
+from dataclasses import dataclass
+from typing import Optional
+
 from fastapi import Request, HTTPException, status
 from fastapi.security import APIKeyHeader
 import os
@@ -10,6 +19,12 @@ logger = logging.getLogger(__name__)
 
 # Get API key from environment
 API_KEY = os.getenv("API_KEY", "dev-key-change-in-production")
+API_KEYS = os.getenv("API_KEYS", "")
+
+# Limits for keys that do not set their own; 0 = unlimited
+DEFAULT_RATE_LIMIT_PER_SECOND = float(os.getenv("DEFAULT_RATE_LIMIT_PER_SECOND", "20"))
+DEFAULT_RATE_LIMIT_BURST = int(os.getenv("DEFAULT_RATE_LIMIT_BURST", "40"))
+DEFAULT_MAX_CONCURRENT_UPLOADS = int(os.getenv("DEFAULT_MAX_CONCURRENT_UPLOADS", "4"))
 
 # Define the header scheme
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
@@ -24,6 +39,48 @@ PUBLIC_ENDPOINTS = {
 }
 
 
+@dataclass(frozen=True)
+class ApiKey:
+    """A client's API key and its admission limits (0 = unlimited)."""
+    name: str
+    key: str
+    rate_per_second: float = DEFAULT_RATE_LIMIT_PER_SECOND
+    burst: int = DEFAULT_RATE_LIMIT_BURST
+    max_concurrent_uploads: int = DEFAULT_MAX_CONCURRENT_UPLOADS
+
+
+def parse_api_keys(spec: str, fallback_key: str = "") -> dict[str, ApiKey]:
+    """
+    Parse ``API_KEYS`` into a mapping of key to ``ApiKey``.
+
+    Example:
+        >>> keys = parse_api_keys("lab:s3cret:5:10:2, ci:t0ken")
+        >>> keys["s3cret"].max_concurrent_uploads, keys["t0ken"].name
+        (2, 'ci')
+
+    Raises:
+        ValueError: If an entry is malformed
+    """
+    keys = {}
+    for entry in filter(None, (item.strip() for item in spec.split(","))):
+        fields = entry.split(":")
+        if len(fields) < 2 or len(fields) > 5 or not fields[0] or not fields[1]:
+            raise ValueError(f"API_KEYS entry must be name:key[:rate[:burst[:uploads]]], got {fields[0]!r}")
+        limits = {}
+        for field_name, value, cast in zip(
+            ("rate_per_second", "burst", "max_concurrent_uploads"), fields[2:], (float, int, int)
+        ):
+            if value:
+                limits[field_name] = cast(value)
+        keys[fields[1]] = ApiKey(name=fields[0], key=fields[1], **limits)
+    if not keys and fallback_key:
+        keys[fallback_key] = ApiKey(name="default", key=fallback_key)
+    return keys
+
+
+api_keys = parse_api_keys(API_KEYS, API_KEY)
+
+
 def is_public_endpoint(path: str) -> bool:
     """Check if endpoint is public and doesn't require authentication."""
     # Check exact match
@@ -37,37 +94,42 @@ def is_public_endpoint(path: str) -> bool:
     return False
 
 
-async def verify_api_key(request: Request) -> None:
+async def verify_api_key(request: Request) -> Optional[ApiKey]:
     """
     Verify API key from request header.
 
     Args:
         request: FastAPI request object
 
+    Returns:
+        The client's ``ApiKey``, or None for public endpoints
+
     Raises:
         HTTPException: If API key is missing or invalid
     """
     # Skip authentication for public endpoints
     if is_public_endpoint(request.url.path):
-        logger.debug(f"Skipping auth for public endpoint: {request.url.path}")
-        return
+        logger.debug("Skipping auth for public endpoint: %s", request.url.path)
+        return None
 
     # Get API key from header
     api_key = request.headers.get("X-API-Key")
 
     if not api_key:
-        logger.warning(f"Missing API key for {request.url.path}")
+        logger.warning("Missing API key for %s", request.url.path)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="API key required. Include 'X-API-Key' header.",
             headers={"WWW-Authenticate": "ApiKey"},
         )
 
-    if api_key != API_KEY:
-        logger.warning(f"Invalid API key attempt for {request.url.path}")
+    client = api_keys.get(api_key)
+    if client is None:
+        logger.warning("Invalid API key attempt for %s", request.url.path)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid API key",
         )
 
-    logger.debug(f"API key verified for {request.url.path}")
+    logger.debug("API key verified for %s: %s", request.url.path, client.name)
+    return client
@@ -0,0 +1,387 @@
+"""
+Client-side load balancing across ingestion service replicas.
+
+The gateway keeps addressing the ingestion service as ``INGESTION_SERVICE_URL``;
+``BalancingTransport`` sends each such request to one of the replicas in
+``INGESTION_SERVICE_URLS`` instead:
+
+* **Power of two choices**: two available replicas are drawn at random and
+  the one with fewer outstanding requests (sent, body not yet closed) wins.
+  This avoids both herding on one "least loaded" replica and the imbalance
+  of random choice, so throughput grows with the number of replicas.
+* **Circuit breaker** per replica: after ``failure_threshold`` consecutive
+  failures (connection errors and timeouts, pool timeouts, 5xx responses)
+  the replica is ejected for ``open_seconds``, then a single trial request
+  decides whether it returns. A 503 is the replica shedding load, and a
+  read timeout usually a slow document, so neither counts as a failure.
+* **Active health checks**: ``GET /health`` on every replica each
+  ``health_interval`` seconds. ``unhealthy_threshold`` failed checks in a
+  row eject the replica; a passing check lets an ejected one take a trial
+  request.
+* **Retries** on another replica, for requests that never reached a replica
+  (connection refused) and for idempotent methods that failed or got
+  502/503/504. Retries are limited by a budget relative to recent traffic so
+  they cannot multiply load during an outage.
+* **Job affinity**: async jobs live in the memory of the replica that
+  accepted them, so ``pin`` records which replica to ask about a job.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+import httpx
+from prometheus_client import Counter, Gauge
+
+from upstream import TrackedStream
+
+logger = logging.getLogger(__name__)
+
+REPLICA_AVAILABLE = Gauge(
+    "gateway_ingestion_replica_available",
+    "Whether an ingestion replica receives requests (circuit closed or half-open and healthy)",
+    ["replica"],
+)
+REPLICA_OUTSTANDING = Gauge(
+    "gateway_ingestion_replica_outstanding_requests",
+    "Requests sent to an ingestion replica whose response body has not been closed",
+    ["replica"],
+)
+CIRCUIT_OPENED = Counter(
+    "gateway_ingestion_circuit_opened_total",
+    "Times an ingestion replica was ejected, by reason",
+    ["replica", "reason"],
+)
+INGESTION_RETRIES = Counter(
+    "gateway_ingestion_retries_total",
+    "Ingestion requests retried on another replica, or not retried because the budget was spent",
+    ["outcome"],
+)
+
+# Request extension naming the replica (base URL) to use, bypassing the balancer;
+# responses carry the replica that served them under the same key
+REPLICA_EXTENSION = "ingestion_replica"
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {502, 503, 504}
+# Transport errors that count against a replica's circuit breaker
+FAILURE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class Replica:
+    """One ingestion service replica and its circuit breaker."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.origin = httpx.URL(self.url)
+        self.outstanding = 0
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.failed_checks = 0
+
+    def available(self, now: float, open_seconds: float) -> bool:
+        if self.state == OPEN and now - self.opened_at >= open_seconds:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            return not self.trial_in_flight
+        return self.state == CLOSED
+
+
+class RetryBudget:
+    """
+    Allow retries up to ``ratio`` of the requests of the last ``window``
+    seconds, plus ``min_retries`` per window so quiet periods can still retry.
+
+    Example:
+        >>> budget = RetryBudget(ratio=0.5, min_retries=0, window=10)
+        >>> for _ in range(4):
+        ...     budget.record_request(now=0.0)
+        >>> [budget.try_retry(now=1.0) for _ in range(3)]
+        [True, True, False]
+    """
+
+    def __init__(self, ratio: float, min_retries: int, window: float = 10.0):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._requests: deque[float] = deque()
+        self._retries: deque[float] = deque()
+
+    def _trim(self, now: float) -> None:
+        for events in (self._requests, self._retries):
+            while events and events[0] <= now - self.window:
+                events.popleft()
+
+    def record_request(self, now: Optional[float] = None) -> None:
+        self._requests.append(time.monotonic() if now is None else now)
+
+    def try_retry(self, now: Optional[float] = None) -> bool:
+        """Spend one retry from the budget; False if it is exhausted."""
+        now = time.monotonic() if now is None else now
+        self._trim(now)
+        if len(self._retries) >= self.min_retries + self.ratio * len(self._requests):
+            return False
+        self._retries.append(now)
+        return True
+
+
+class LoadBalancer:
+    """
+    Replica selection, circuit breaking and health checks for the ingestion service.
+
+    Args:
+        virtual_url: Base URL the gateway uses for ingestion requests; only
+            requests to this origin are balanced
+        urls: Base URLs of the replicas
+        failure_threshold: Consecutive failures that eject a replica
+        open_seconds: Time an ejected replica waits for its trial request
+        health_interval: Seconds between health check rounds (0 disables them)
+        health_timeout: Timeout of one health check
+        unhealthy_threshold: Consecutive failed health checks that eject a replica
+        max_retries: Extra attempts per request
+        retry_budget: Limit on retries across all requests
+        max_pinned_jobs: Job-to-replica entries kept, oldest dropped first
+    """
+
+    def __init__(self, virtual_url: str, urls: list[str], failure_threshold: int = 5, open_seconds: float = 30.0,
+                 health_interval: float = 5.0, health_timeout: float = 2.0, unhealthy_threshold: int = 2,
+                 max_retries: int = 2,
+                 retry_budget: Optional[RetryBudget] = None, max_pinned_jobs: int = 10000):
+        if not urls:
+            raise ValueError("At least one ingestion replica URL is required")
+        self.virtual_origin = httpx.URL(virtual_url)
+        self.replicas = [Replica(url) for url in urls]
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.unhealthy_threshold = unhealthy_threshold
+        self.max_retries = max_retries
+        self.retry_budget = retry_budget or RetryBudget(ratio=0.2, min_retries=10)
+        self.max_pinned_jobs = max_pinned_jobs
+        self._jobs: OrderedDict[str, str] = OrderedDict()
+        self._health_task: Optional[asyncio.Task] = None
+        for replica in self.replicas:
+            REPLICA_AVAILABLE.labels(replica=replica.url).set(1)
+            REPLICA_OUTSTANDING.labels(replica=replica.url).set(0)
+
+    @property
+    def urls(self) -> list[str]:
+        return [replica.url for replica in self.replicas]
+
+    def handles(self, url: httpx.URL) -> bool:
+        """Whether a request URL addresses the balanced service."""
+        origin = self.virtual_origin
+        return (url.scheme, url.host, url.port) == (origin.scheme, origin.host, origin.port)
+
+    def replica(self, url: str) -> Replica:
+        """The replica with base URL ``url``; unknown URLs get a replica outside the pool."""
+        url = url.rstrip("/")
+        return next((replica for replica in self.replicas if replica.url == url), None) or Replica(url)
+
+    def choose(self, exclude: set[str] = frozenset()) -> Optional[Replica]:
+        """Pick a replica by power of two choices; None if none is available."""
+        now = time.monotonic()
+        candidates = [
+            replica for replica in self.replicas
+            if replica.url not in exclude and replica.available(now, self.open_seconds)
+        ]
+        if not candidates:
+            return None
+        if len(candidates) > 1:
+            first, second = random.sample(candidates, 2)
+            chosen = first if first.outstanding <= second.outstanding else second
+        else:
+            chosen = candidates[0]
+        if chosen.state == HALF_OPEN:
+            chosen.trial_in_flight = True
+        return chosen
+
+    def _set_available(self, replica: Replica) -> None:
+        if replica in self.replicas:
+            REPLICA_AVAILABLE.labels(replica=replica.url).set(int(replica.state != OPEN))
+
+    def _open(self, replica: Replica, reason: str) -> None:
+        if replica.state != OPEN:
+            logger.warning("Ejecting ingestion replica %s: %s", replica.url, reason)
+            CIRCUIT_OPENED.labels(replica=replica.url, reason=reason).inc()
+        replica.state = OPEN
+        replica.opened_at = time.monotonic()
+        replica.trial_in_flight = False
+        self._set_available(replica)
+
+    def record_success(self, replica: Replica) -> None:
+        if replica.state != CLOSED:
+            logger.info("Ingestion replica %s is back", replica.url)
+        replica.state = CLOSED
+        replica.failures = 0
+        replica.trial_in_flight = False
+        self._set_available(replica)
+
+    def record_failure(self, replica: Replica) -> None:
+        replica.failures += 1
+        if replica.state == HALF_OPEN or replica.failures >= self.failure_threshold:
+            self._open(replica, "errors")
+
+    def started(self, replica: Replica) -> None:
+        replica.outstanding += 1
+        REPLICA_OUTSTANDING.labels(replica=replica.url).set(replica.outstanding)
+
+    def finished(self, replica: Replica) -> None:
+        replica.outstanding -= 1
+        REPLICA_OUTSTANDING.labels(replica=replica.url).set(replica.outstanding)
+
+    def pin(self, job_id: str, url: str) -> None:
+        """Remember the replica holding an async job."""
+        self._jobs[job_id] = url
+        self._jobs.move_to_end(job_id)
+        while len(self._jobs) > self.max_pinned_jobs:
+            self._jobs.popitem(last=False)
+
+    def pinned(self, job_id: str) -> Optional[str]:
+        return self._jobs.get(job_id)
+
+    async def check_health(self, client: httpx.AsyncClient) -> None:
+        """Run one round of health checks against every replica."""
+        async def check(replica: Replica) -> None:
+            try:
+                response = await client.get(f"{replica.url}/health", timeout=self.health_timeout)
+                healthy = response.status_code == 200
+            except httpx.HTTPError:
+                healthy = False
+            if not healthy:
+                replica.failed_checks += 1
+                if replica.failed_checks >= self.unhealthy_threshold:
+                    self._open(replica, "health_check")
+                return
+            replica.failed_checks = 0
+            if replica.state == OPEN:
+                # Let the next request through as a trial instead of waiting out open_seconds
+                replica.state = HALF_OPEN
+                self._set_available(replica)
+
+        await asyncio.gather(*(check(replica) for replica in self.replicas))
+
+    async def _health_loop(self) -> None:
+        async with httpx.AsyncClient() as client:
+            while True:
+                try:
+                    await self.check_health(client)
+                except Exception:
+                    # A bug in one round must not end health checking for good
+                    logger.exception("Ingestion health check round failed")
+                await asyncio.sleep(self.health_interval)
+
+    def start(self) -> None:
+        """Start background health checks, if enabled."""
+        if self.health_interval > 0 and self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+
+
+class BalancingTransport(httpx.AsyncBaseTransport):
+    """
+    Transport sending requests for the balanced service to its replicas.
+
+    Requests to other origins (the embeddings service shares the client) go
+    straight to the wrapped transport. Other attributes are those of the
+    wrapped transport.
+
+    Raises:
+        httpx.ConnectError: If no replica is available
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, balancer: LoadBalancer):
+        self._wrapped = transport
+        self.balancer = balancer
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        balancer = self.balancer
+        if not balancer.handles(request.url):
+            return await self._wrapped.handle_async_request(request)
+
+        pinned = request.extensions.get(REPLICA_EXTENSION)
+        idempotent = request.method in IDEMPOTENT_METHODS
+        balancer.retry_budget.record_request()
+        tried: set[str] = set()
+        while True:
+            replica = balancer.replica(pinned) if pinned else balancer.choose(exclude=tried)
+            if replica is None:
+                raise httpx.ConnectError("No ingestion replica available", request=request)
+            tried.add(replica.url)
+            request.url = request.url.copy_with(
+                scheme=replica.origin.scheme, host=replica.origin.host, port=replica.origin.port
+            )
+            request.headers["Host"] = request.url.netloc.decode("ascii")
+
+            balancer.started(replica)
+            try:
+                response = await self._wrapped.handle_async_request(request)
+            except httpx.TransportError as e:
+                balancer.finished(replica)
+                if isinstance(e, FAILURE_ERRORS):
+                    balancer.record_failure(replica)
+                else:
+                    # e.g. a read timeout on a slow document: no verdict on the replica
+                    replica.trial_in_flight = False
+                # A failed connection means the request was never sent, so it can go elsewhere
+                unsent = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                if not pinned and (unsent or idempotent) and self._may_retry(tried):
+                    logger.warning("Retrying ingestion request on another replica: %s: %s", replica.url, e)
+                    continue
+                raise
+            except BaseException:
+                # Cancelled: no verdict on the replica, but free its trial slot
+                balancer.finished(replica)
+                replica.trial_in_flight = False
+                raise
+
+            if response.status_code == 503:
+                # Overloaded or draining, but up: no verdict on the replica, free its trial slot
+                replica.trial_in_flight = False
+            elif response.status_code >= 500:
+                balancer.record_failure(replica)
+            else:
+                balancer.record_success(replica)
+            if (not pinned and idempotent and response.status_code in RETRY_STATUSES
+                    and self._may_retry(tried)):
+                await response.aclose()
+                balancer.finished(replica)
+                continue
+
+            return httpx.Response(
+                status_code=response.status_code,
+                headers=response.headers,
+                stream=TrackedStream(response.stream, lambda replica=replica: balancer.finished(replica)),
+                extensions={**response.extensions, REPLICA_EXTENSION: replica.url},
+            )
+
+    def _may_retry(self, tried: set[str]) -> bool:
+        balancer = self.balancer
+        if len(tried) > balancer.max_retries or len(tried) >= len(balancer.replicas):
+            return False
+        if not balancer.retry_budget.try_retry():
+            INGESTION_RETRIES.labels(outcome="budget_exhausted").inc()
+            logger.warning("Ingestion retry budget exhausted")
+            return False
+        INGESTION_RETRIES.labels(outcome="retried").inc()
+        return True
+
+    async def aclose(self) -> None:
+        await self._wrapped.aclose()
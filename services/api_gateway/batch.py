@@ -0,0 +1,274 @@
+"""
+Batch uploads for API Gateway.
+
+A batch is a multipart body with any number of ``files`` parts, each a PDF
+or a zip archive of PDFs. Parts are spooled to temporary files (kept in
+memory while small) as they arrive, and each PDF is queued for ingestion as
+soon as it has been received, so forwarding overlaps with the rest of the
+upload. Zip members are read through ``zipfile`` a chunk at a time; the
+archive is never extracted as a whole.
+
+Files are forwarded concurrently, bounded by a semaphore, and their results
+are streamed back as NDJSON in completion order, so a batch takes about as
+long as its slowest files rather than the sum of all of them.
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+import zipfile
+import zlib
+from functools import partial
+from typing import IO, AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+from fastapi import HTTPException
+from prometheus_client import Counter
+
+from streaming import MultipartStream, prefetch, validate_pdf_stream
+
+logger = logging.getLogger(__name__)
+
+BATCH_FILES = Counter(
+    "gateway_batch_files_total",
+    "Files submitted through batch uploads, by outcome",
+    ["status"],
+)
+
+FILE_FIELDS = ("files", "file")
+ARCHIVE_EXTENSIONS = {".zip"}
+
+# Parts smaller than this stay in memory, larger ones are moved to disk
+SPOOL_MEMORY_BYTES = 1024 * 1024
+# Received bytes are written to the spool in blocks of this size, in a worker thread
+SPOOL_WRITE_BYTES = 1024 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+
+# Errors raised by zipfile while opening or decompressing a member
+# (RuntimeError: encrypted member, NotImplementedError: unsupported compression)
+_ARCHIVE_READ_ERRORS = (zipfile.BadZipFile, zlib.error, RuntimeError, NotImplementedError, EOFError)
+
+BATCH_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files"],
+                    "properties": {
+                        "files": {
+                            "type": "array",
+                            "items": {"type": "string", "format": "binary"},
+                            "description": "PDF files and/or zip archives of PDF files",
+                        }
+                    },
+                }
+            }
+        },
+    }
+}
+
+# Uploads one validated PDF to the ingestion service and returns its summary
+Forward = Callable[[str, AsyncIterator[bytes]], Awaitable[dict]]
+
+
+async def _read_chunks(name: str, opener: Callable[[], IO[bytes]]) -> AsyncIterator[bytes]:
+    """Read a spooled file or archive member off the event loop, a chunk at a time."""
+    try:
+        fileobj = await asyncio.to_thread(opener)
+        try:
+            while chunk := await asyncio.to_thread(fileobj.read, READ_CHUNK_SIZE):
+                yield chunk
+        finally:
+            fileobj.close()
+    except _ARCHIVE_READ_ERRORS as e:
+        logger.warning("Could not read %s: %s", name, e)
+        raise HTTPException(status_code=400, detail=f"Could not read file from archive: {e}")
+
+
+def _rewind(spool: IO[bytes]) -> IO[bytes]:
+    spool.seek(0)
+    return spool
+
+
+class BatchUpload:
+    """
+    One ``/upload/batch`` request: receives its files and ingests them.
+
+    Args:
+        forward: Coroutine that uploads one PDF to the ingestion service
+        concurrency: Maximum files forwarded at the same time
+        max_files: Maximum PDFs forwarded per batch, counting archive members
+        max_file_size: Maximum size of one PDF in bytes
+        max_archive_size: Maximum size of one zip archive in bytes
+        allowed_extensions: Extensions accepted for individual files
+    """
+
+    def __init__(self, forward: Forward, concurrency: int, max_files: int, max_file_size: int,
+                 max_archive_size: int, allowed_extensions: Iterable[str] = (".pdf",)):
+        self.forward = forward
+        self.max_files = max_files
+        self.max_file_size = max_file_size
+        self.max_archive_size = max_archive_size
+        self.allowed_extensions = set(allowed_extensions)
+        self.total = 0
+        self._submitted = 0
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._results: asyncio.Queue = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        self._files: list = []
+        self._closed = False
+        self._started = time.perf_counter()
+
+    async def receive(self, upload: MultipartStream) -> None:
+        """
+        Read every file part of the body, starting ingestion as files arrive.
+
+        Raises:
+            HTTPException: 400 if the body is malformed or contains no files
+        """
+        while (part := await upload.next_part()) is not None:
+            if part.field_name not in FILE_FIELDS or part.filename is None:
+                continue
+            extension = os.path.splitext(part.filename)[1].lower()
+            if extension in ARCHIVE_EXTENSIONS:
+                spool = await self._spool(upload, self.max_archive_size)
+                if spool is None:
+                    self._fail(part.filename, 413, f"Archive too large. Maximum size: "
+                                                   f"{self.max_archive_size / 1024 / 1024:.1f}MB")
+                else:
+                    self._add_archive(part.filename, spool)
+            elif extension in self.allowed_extensions:
+                # Oversized files are rejected when forwarded, by validate_pdf_stream
+                spool = await self._spool(upload, self.max_file_size)
+                self._submit(part.filename, part.filename, partial(_rewind, spool) if spool is not None else None)
+            else:
+                async for _ in upload.iter_data():
+                    pass
+                self._fail(part.filename, 400, f"Only PDF files and zip archives are allowed. Got: {extension}")
+
+        if self.total == 0:
+            raise HTTPException(status_code=400, detail="Missing 'files' file field")
+        logger.info("Batch received: %d files", self.total)
+
+    async def _spool(self, upload: MultipartStream, max_size: int) -> Optional[IO[bytes]]:
+        """Copy the current part to a temporary file; None if it exceeds ``max_size``."""
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+        self._files.append(spool)
+        size = 0
+        buffer = bytearray()
+        async for chunk in upload.iter_data():
+            size += len(chunk)
+            if size > max_size:
+                buffer.clear()
+                continue
+            buffer += chunk
+            if len(buffer) >= SPOOL_WRITE_BYTES:
+                await asyncio.to_thread(spool.write, bytes(buffer))
+                buffer.clear()
+        if size > max_size:
+            spool.close()
+            return None
+        if buffer:
+            await asyncio.to_thread(spool.write, bytes(buffer))
+        return spool
+
+    def _add_archive(self, archive_name: str, spool: IO[bytes]) -> None:
+        """Queue every PDF in a zip archive; members are decompressed as they are forwarded."""
+        try:
+            archive = zipfile.ZipFile(spool)
+        except zipfile.BadZipFile:
+            logger.warning("Batch archive is not a valid zip file: %s", archive_name)
+            self._fail(archive_name, 400, "File is not a valid zip archive")
+            return
+        self._files.append(archive)
+
+        for info in archive.infolist():
+            if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                continue
+            extension = os.path.splitext(info.filename)[1].lower()
+            if extension not in self.allowed_extensions:
+                self._fail(info.filename, 400, f"Only PDF files are allowed. Got: {extension}", archive_name)
+            elif info.file_size > self.max_file_size:
+                self._fail(info.filename, 413, f"File too large. Maximum size: "
+                                               f"{self.max_file_size / 1024 / 1024:.1f}MB", archive_name)
+            else:
+                self._submit(info.filename, os.path.basename(info.filename),
+                             partial(archive.open, info), archive_name)
+
+    def _record(self, name: str, archive: Optional[str]) -> dict:
+        record = {"type": "result", "index": self.total, "filename": name}
+        if archive is not None:
+            record["archive"] = archive
+        self.total += 1
+        return record
+
+    def _fail(self, name: str, status_code: int, detail: str, archive: Optional[str] = None) -> None:
+        record = self._record(name, archive)
+        record.update(status="failed", status_code=status_code, detail=detail)
+        BATCH_FILES.labels(status="failed").inc()
+        self._results.put_nowait(record)
+
+    def _submit(self, name: str, upload_name: str, opener: Optional[Callable[[], IO[bytes]]],
+                archive: Optional[str] = None) -> None:
+        if opener is None:
+            self._fail(name, 413, f"File too large. Maximum size: {self.max_file_size / 1024 / 1024:.1f}MB", archive)
+        elif self._submitted >= self.max_files:
+            self._fail(name, 413, f"Batch is limited to {self.max_files} files", archive)
+        else:
+            self._submitted += 1
+            record = self._record(name, archive)
+            self._tasks.append(asyncio.create_task(self._ingest(record, upload_name, opener)))
+
+    async def _ingest(self, record: dict, upload_name: str, opener: Callable[[], IO[bytes]]) -> None:
+        try:
+            async with self._semaphore:
+                # Reject empty and non-PDF files before contacting the ingestion service
+                chunks = await prefetch(validate_pdf_stream(_read_chunks(record["filename"], opener),
+                                                            self.max_file_size))
+                result = await self.forward(upload_name, chunks)
+            record.update(status="succeeded", **result)
+        except HTTPException as e:
+            record.update(status="failed", status_code=e.status_code, detail=e.detail)
+        except Exception as e:
+            logger.error("Batch upload of %s failed: %s", record["filename"], e, exc_info=True)
+            record.update(status="failed", status_code=500, detail="An unexpected error occurred.")
+        BATCH_FILES.labels(status=record["status"]).inc()
+        self._results.put_nowait(record)
+
+    async def results(self) -> AsyncIterator[bytes]:
+        """
+        Yield one NDJSON ``result`` record per file as it completes, then a ``summary``.
+
+        Files still in progress are cancelled if the client goes away.
+        """
+        succeeded = 0
+        try:
+            for _ in range(self.total):
+                record = await self._results.get()
+                succeeded += record["status"] == "succeeded"
+                yield json.dumps(record).encode() + b"\n"
+            duration = time.perf_counter() - self._started
+            logger.info("Batch finished: %d/%d files succeeded in %.3fs", succeeded, self.total, duration)
+            yield json.dumps({
+                "type": "summary",
+                "total": self.total,
+                "succeeded": succeeded,
+                "failed": self.total - succeeded,
+                "duration_seconds": round(duration, 3),
+            }).encode() + b"\n"
+        finally:
+            await self.aclose()
+
+    async def aclose(self) -> None:
+        """Cancel unfinished uploads and delete the spooled files."""
+        if self._closed:
+            return
+        self._closed = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for fileobj in self._files:
+            fileobj.close()
@@ -0,0 +1,144 @@
+"""
+Structured, non-blocking logging for API Gateway.
+
+* The request ID lives in a ``contextvars.ContextVar``: each request (and
+  the tasks it spawns) sees its own value, with no process-global state to
+  swap per request.
+* Records are emitted as one JSON object per line (``LOG_FORMAT=json``) or
+  as plain text.
+* The root logger only puts records on a queue; a ``QueueListener`` thread
+  formats and writes them, so log I/O never blocks the event loop. The
+  gateway's lifespan starts it (``configure_logging``) and stops it
+  (``stop_logging``); importing the gateway leaves logging untouched.
+* High-volume loggers can be sampled. The decision is a hash of the request
+  ID, so all sampled lines of a request are kept or dropped together, and
+  warnings and errors are always kept.
+
+Log calls should use %-style arguments (``logger.info("x=%s", x)``) so
+nothing is formatted for disabled levels.
+"""
+import copy
+import json
+import logging
+import queue
+import sys
+import zlib
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] - %(message)s"
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed via ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+class RequestContextFilter(logging.Filter):
+    """Add the current request ID to records logged while a request is handled."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_id = request_id_var.get()
+        if request_id is not None:
+            record.request_id = request_id
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a fraction of a logger's records below WARNING.
+
+    Args:
+        rate: Fraction of requests whose records are kept (0.0 - 1.0)
+    """
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.threshold = int(max(0.0, min(rate, 1.0)) * 0xFFFFFFFF)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.threshold >= 0xFFFFFFFF:
+            return True
+        request_id = request_id_var.get()
+        if request_id is None:
+            return True
+        return zlib.crc32(request_id.encode()) <= self.threshold
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects, including ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Rendered by the queue handler before the record crossed threads
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _ContextQueueHandler(QueueHandler):
+    """Queue handler that leaves formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the message and traceback now (arguments may change later),
+        # but leave formatting the full line to the listener thread
+        prepared = copy.copy(record)
+        prepared.request_id = getattr(record, "request_id", "-")
+        prepared.msg = record.getMessage()
+        prepared.args = None
+        if record.exc_info:
+            prepared.exc_text = logging.Formatter().formatException(record.exc_info)
+            prepared.exc_info = None
+        return prepared
+
+
+def configure_logging(level: int = logging.INFO, fmt: str = "json") -> QueueListener:
+    """
+    Route the root logger through a queue to a writer thread for ``sys.stdout``
+    (as it is at the time of the call).
+
+    Calling it again replaces the previous configuration.
+
+    Args:
+        level: Root log level
+        fmt: ``"json"`` or ``"text"``
+    """
+    global _listener
+    stop_logging()
+
+    root = logging.getLogger()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _ContextQueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """Detach the queue from the root logger, flush queued records and stop the writer thread."""
+    global _listener
+    root = logging.getLogger()
+    root.handlers = [handler for handler in root.handlers if not isinstance(handler, _ContextQueueHandler)]
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
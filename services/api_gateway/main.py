@@ -1,22 +1,82 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Response
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 import httpx
+import json
 import os
 import logging
 import uuid
 import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Literal, Optional
 from prometheus_fastapi_instrumentator import Instrumentator
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
+from admission import AdmissionController
 from auth import verify_api_key
-
-# Configure structured logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] - %(message)s'
+from balancer import REPLICA_EXTENSION, LoadBalancer, RetryBudget
+from resumable import CreateUploadRequest, ResumableUploadStore, parse_content_range
+from batch import BATCH_UPLOAD_OPENAPI, BatchUpload
+from log_context import RequestContextFilter, SamplingFilter, configure_logging, request_id_var, stop_logging
+from query_cache import QueryCache
+from streaming import (
+    UPLOAD_OPENAPI,
+    MultipartEncoder,
+    MultipartStream,
+    prefetch,
+    validate_pdf_stream,
 )
+from upstream import create_embeddings_client, create_ingestion_client, get_embeddings_client, get_ingestion_client
+
+# Structured logging through a background writer thread
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))  # fraction of requests with access lines logged
+
 logger = logging.getLogger(__name__)
+# Per-request start/finish lines, the bulk of the log volume under load
+access_logger = logging.getLogger("api_gateway.access")
+access_logger.addFilter(SamplingFilter(LOG_SAMPLE_RATE))
+# Tag access lines at the logger, so every handler sees the request ID
+access_logger.addFilter(RequestContextFilter())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the log writer thread, own one pooled, keep-alive client to each
+    of the ingestion and embeddings services per process, health check the
+    ingestion replicas, and delete unfinished resumable uploads on shutdown.
+    """
+    configure_logging(level=getattr(logging, LOG_LEVEL, logging.INFO), fmt=LOG_FORMAT)
+    app.state.ingestion_client = create_ingestion_client(ingestion_balancer)
+    app.state.embeddings_client = create_embeddings_client()
+    ingestion_balancer.start()
+    yield
+    await ingestion_balancer.stop()
+    await app.state.ingestion_client.aclose()
+    await app.state.embeddings_client.aclose()
+    resumable_uploads.close()
+    stop_logging()
+
 
-app = FastAPI(title="API Gateway", version="0.1.0")
+async def admit_request(request: Request) -> AsyncIterator[None]:
+    """Hold a global in-flight slot for an authenticated request until its response is sent."""
+    client = request.state.api_key
+    if client is None:
+        yield
+        return
+    async with admission.request(client):
+        yield
+
+
+async def admit_upload(request: Request) -> AsyncIterator[None]:
+    """Hold one of the API key's concurrent upload slots for an upload forwarded to ingestion."""
+    async with admission.upload(request.state.api_key):
+        yield
+
+
+app = FastAPI(title="API Gateway", version="0.1.0", lifespan=lifespan, dependencies=[Depends(admit_request)])
 
 # Initialize Prometheus metrics
 instrumentator = Instrumentator(
@@ -34,58 +94,134 @@ instrumentator = Instrumentator(
 instrumentator.instrument(app).expose(app, endpoint="/metrics", include_in_schema=False)
 
 INGESTION_SERVICE_URL = os.getenv("INGESTION_SERVICE_URL", "http://localhost:8001")
+# Ingestion replicas, comma-separated; requests to INGESTION_SERVICE_URL are balanced across them
+INGESTION_SERVICE_URLS = [
+    url.strip() for url in os.getenv("INGESTION_SERVICE_URLS", "").split(",") if url.strip()
+] or [INGESTION_SERVICE_URL]
+INGESTION_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("INGESTION_CIRCUIT_FAILURE_THRESHOLD", "5"))
+INGESTION_CIRCUIT_OPEN_SECONDS = float(os.getenv("INGESTION_CIRCUIT_OPEN_SECONDS", "30"))
+INGESTION_HEALTH_CHECK_INTERVAL = float(os.getenv("INGESTION_HEALTH_CHECK_INTERVAL", "5"))  # 0 disables
+INGESTION_HEALTH_CHECK_TIMEOUT = float(os.getenv("INGESTION_HEALTH_CHECK_TIMEOUT", "2"))
+INGESTION_UNHEALTHY_THRESHOLD = int(os.getenv("INGESTION_UNHEALTHY_THRESHOLD", "2"))  # failed checks in a row
+INGESTION_MAX_RETRIES = int(os.getenv("INGESTION_MAX_RETRIES", "2"))
+INGESTION_RETRY_BUDGET_RATIO = float(os.getenv("INGESTION_RETRY_BUDGET_RATIO", "0.2"))  # of recent requests
+INGESTION_RETRY_BUDGET_MIN = int(os.getenv("INGESTION_RETRY_BUDGET_MIN", "10"))  # retries per 10s regardless
+EMBEDDINGS_SERVICE_URL = os.getenv("EMBEDDINGS_SERVICE_URL", "http://localhost:8003")
 
 # File upload limits
 MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", 50 * 1024 * 1024))  # 50MB default
 ALLOWED_EXTENSIONS = {".pdf"}
 
+# Resumable uploads (/uploads), spooled to disk in parts
+RESUMABLE_MAX_FILE_SIZE = int(os.getenv("RESUMABLE_MAX_FILE_SIZE", 2 * 1024 * 1024 * 1024))  # 2GB default
+RESUMABLE_UPLOAD_DIR = os.getenv("RESUMABLE_UPLOAD_DIR", "")  # empty = system temp directory
+RESUMABLE_SESSION_TTL_SECONDS = float(os.getenv("RESUMABLE_SESSION_TTL_SECONDS", 24 * 3600))
+RESUMABLE_MAX_SESSIONS = int(os.getenv("RESUMABLE_MAX_SESSIONS", "100"))
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Batch uploads
+BATCH_UPLOAD_CONCURRENCY = int(os.getenv("BATCH_UPLOAD_CONCURRENCY", "4"))  # files forwarded at once per batch
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+BATCH_MAX_ARCHIVE_SIZE = int(os.getenv("BATCH_MAX_ARCHIVE_SIZE", 512 * 1024 * 1024))  # 512MB default
+
+# Admission control (see admission.py); per-key rate limits and upload caps are set in API_KEYS
+MAX_IN_FLIGHT_REQUESTS = int(os.getenv("MAX_IN_FLIGHT_REQUESTS", "64"))  # 0 = unlimited
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "32"))  # requests waiting for a slot
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "0.5"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+
+# Sent with every upstream call so a request can be traced across services
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Search response cache, invalidated whenever the embeddings service's corpus version changes
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", 32 * 1024 * 1024))  # 0 disables caching
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "300"))
+QUERY_CACHE_VERSION_TTL_SECONDS = float(os.getenv("QUERY_CACHE_VERSION_TTL_SECONDS", "0"))  # 0 = every search
+
+query_cache = QueryCache(
+    max_bytes=QUERY_CACHE_MAX_BYTES,
+    ttl_seconds=QUERY_CACHE_TTL_SECONDS,
+    version_ttl_seconds=QUERY_CACHE_VERSION_TTL_SECONDS,
+)
+
+ingestion_balancer = LoadBalancer(
+    INGESTION_SERVICE_URL,
+    INGESTION_SERVICE_URLS,
+    failure_threshold=INGESTION_CIRCUIT_FAILURE_THRESHOLD,
+    open_seconds=INGESTION_CIRCUIT_OPEN_SECONDS,
+    health_interval=INGESTION_HEALTH_CHECK_INTERVAL,
+    health_timeout=INGESTION_HEALTH_CHECK_TIMEOUT,
+    unhealthy_threshold=INGESTION_UNHEALTHY_THRESHOLD,
+    max_retries=INGESTION_MAX_RETRIES,
+    retry_budget=RetryBudget(ratio=INGESTION_RETRY_BUDGET_RATIO, min_retries=INGESTION_RETRY_BUDGET_MIN),
+)
+# Used by get_ingestion_client when the lifespan did not create the client
+app.state.ingestion_balancer = ingestion_balancer
+
+admission = AdmissionController(
+    max_in_flight=MAX_IN_FLIGHT_REQUESTS,
+    max_queued=ADMISSION_QUEUE_SIZE,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    retry_after=ADMISSION_RETRY_AFTER_SECONDS,
+)
+
+resumable_uploads = ResumableUploadStore(
+    directory=RESUMABLE_UPLOAD_DIR or None,
+    max_size=RESUMABLE_MAX_FILE_SIZE,
+    ttl_seconds=RESUMABLE_SESSION_TTL_SECONDS,
+    max_sessions=RESUMABLE_MAX_SESSIONS,
+)
+
 
 @app.middleware("http")
 async def authenticate_and_log(request: Request, call_next):
-    """Authenticate requests and log with timing and request ID for tracing."""
+    """
+    Authenticate and rate limit requests, and log with timing and request ID
+    for tracing.
+    """
     request_id = str(uuid.uuid4())
     request.state.request_id = request_id
-
-    # Add request_id to logging context
-    old_factory = logging.getLogRecordFactory()
-
-    def record_factory(*args, **kwargs):
-        record = old_factory(*args, **kwargs)
-        record.request_id = request_id
-        return record
-
-    logging.setLogRecordFactory(record_factory)
+    # Seen by every log call made while handling this request, including in
+    # tasks it spawns; other requests are unaffected
+    token = request_id_var.set(request_id)
 
     start_time = time.time()
 
-    logger.info(f"Request started: {request.method} {request.url.path}")
+    access_logger.info("Request started: %s %s", request.method, request.url.path)
 
     try:
-        # Verify API key before processing request
-        await verify_api_key(request)
-
-        response = await call_next(request)
+        try:
+            # Verify API key and charge its rate limit before processing request
+            request.state.api_key = await verify_api_key(request)
+            if request.state.api_key is not None:
+                admission.check_rate(request.state.api_key)
+        except HTTPException as e:
+            # Raised outside any route, so not handled by FastAPI
+            response = JSONResponse(status_code=e.status_code, content={"detail": e.detail}, headers=e.headers)
+        else:
+            response = await call_next(request)
         process_time = time.time() - start_time
 
-        logger.info(
-            f"Request completed: {request.method} {request.url.path} "
-            f"status={response.status_code} duration={process_time:.3f}s"
+        access_logger.info(
+            "Request completed: %s %s status=%d duration=%.3fs",
+            request.method, request.url.path, response.status_code, process_time
         )
 
-        response.headers["X-Request-ID"] = request_id
+        response.headers[REQUEST_ID_HEADER] = request_id
         response.headers["X-Process-Time"] = str(process_time)
 
         return response
     except Exception as e:
         process_time = time.time() - start_time
         logger.error(
-            f"Request failed: {request.method} {request.url.path} "
-            f"error={str(e)} duration={process_time:.3f}s",
+            "Request failed: %s %s error=%s duration=%.3fs",
+            request.method, request.url.path, e, process_time,
             exc_info=True
         )
         raise
     finally:
-        logging.setLogRecordFactory(old_factory)
+        request_id_var.reset(token)
 
 @app.get("/metrics")
 async def metrics():
@@ -107,114 +243,472 @@ async def info():
     return {
         "name": "Research Copilot",
         "version": "0.1.0",
-        "ingestion_service": INGESTION_SERVICE_URL
+        "ingestion_service": INGESTION_SERVICE_URL,
+        "ingestion_replicas": ingestion_balancer.urls,
+        "embeddings_service": EMBEDDINGS_SERVICE_URL
     }
 
 
-def validate_file(file: UploadFile, content: bytes) -> None:
+def validate_filename(filename: str) -> None:
     """
-    Validate uploaded file.
+    Validate the name of an uploaded file.
+
+    Size and content checks happen while the body streams through, see
+    ``streaming.validate_pdf_stream``.
 
     Args:
-        file: The uploaded file
-        content: File content in bytes
+        filename: Filename from the multipart part headers
 
     Raises:
         HTTPException: If validation fails
     """
-    # Check file extension
-    if not file.filename:
+    if not filename:
         logger.warning("Upload attempt with no filename")
         raise HTTPException(status_code=400, detail="Filename is required")
 
-    file_ext = os.path.splitext(file.filename)[1].lower()
+    file_ext = os.path.splitext(filename)[1].lower()
     if file_ext not in ALLOWED_EXTENSIONS:
-        logger.warning(f"Upload attempt with invalid extension: {file_ext}")
+        logger.warning("Upload attempt with invalid extension: %s", file_ext)
         raise HTTPException(
             status_code=400,
             detail=f"Only PDF files are allowed. Got: {file_ext}"
         )
 
-    # Check file size
-    file_size = len(content)
-    if file_size > MAX_FILE_SIZE:
-        logger.warning(f"Upload attempt with oversized file: {file_size} bytes")
+
+def raise_for_upstream_status(response: httpx.Response) -> None:
+    """
+    Translate an ingestion service error response into an HTTPException.
+
+    Overload responses (429/503) keep their status and ``Retry-After`` so
+    clients can back off instead of seeing a generic failure.
+    """
+    if response.status_code in (429, 503):
+        logger.warning("Ingestion service busy: status=%d", response.status_code)
+        headers = {}
+        if "retry-after" in response.headers:
+            headers["Retry-After"] = response.headers["retry-after"]
         raise HTTPException(
-            status_code=413,
-            detail=f"File too large. Maximum size: {MAX_FILE_SIZE / 1024 / 1024:.1f}MB"
+            status_code=response.status_code,
+            detail="Ingestion service is busy. Please retry later.",
+            headers=headers or None
         )
 
-    if file_size == 0:
-        logger.warning("Upload attempt with empty file")
-        raise HTTPException(status_code=400, detail="File is empty")
+    logger.error("Ingestion service error: status=%d detail=%s", response.status_code, response.text)
+    raise HTTPException(
+        status_code=response.status_code,
+        detail="PDF processing failed. Please check the file and try again."
+    )
+
 
-    logger.info(f"File validation passed: {file.filename} ({file_size} bytes)")
+# Extraction backends of the ingestion service, see its extractors.py
+ExtractorMode = Literal["layout", "fast", "auto"]
 
 
-@app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
+def upstream_params(extractor: Optional[str]) -> dict:
+    """Query parameters for ``/process_pdf`` passed through from the client."""
+    return {"extractor": extractor} if extractor else {}
+
+
+async def forward_upload(request: Request, filename: str, content_type: Optional[str],
+                         chunks: AsyncIterator[bytes], async_mode: bool,
+                         extractor: Optional[str] = None):
+    """
+    Forward a validated PDF to the ingestion service and return the response
+    for the client, in the mode the client asked for (JSON, NDJSON stream or
+    queued job). ``extractor`` selects the ingestion service's extraction
+    backend; None leaves its default.
+
+    Raises:
+        HTTPException: If the ingestion service fails or cannot be reached
+    """
+    body = MultipartEncoder("file", filename, content_type, chunks)
+
+    # Forward to ingestion service over the shared connection pool
+    client = get_ingestion_client(request.app)
+    stream_response = not async_mode and NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+    headers = {"Content-Type": body.content_type, REQUEST_ID_HEADER: request.state.request_id}
+    if stream_response:
+        headers["Accept"] = NDJSON_MEDIA_TYPE
+    params = upstream_params(extractor)
+    if async_mode:
+        params["async"] = "true"
+    try:
+        logger.info("Forwarding to ingestion service: %s", INGESTION_SERVICE_URL)
+        upstream_request = client.build_request(
+            "POST",
+            f"{INGESTION_SERVICE_URL}/process_pdf",
+            content=body,
+            params=params,
+            headers=headers
+        )
+        response = await client.send(upstream_request, stream=stream_response)
+
+        if stream_response:
+            if response.status_code == 200:
+                logger.info("Streaming chunks for upload: %s", filename)
+                return StreamingResponse(
+                    response.aiter_raw(),
+                    media_type=NDJSON_MEDIA_TYPE,
+                    background=BackgroundTask(response.aclose)
+                )
+            await response.aread()
+            await response.aclose()
+
+        if async_mode and response.status_code == 202:
+            job = response.json()
+            # The job lives in the memory of the replica that accepted it
+            if REPLICA_EXTENSION in response.extensions:
+                ingestion_balancer.pin(job["job_id"], response.extensions[REPLICA_EXTENSION])
+            logger.info("Upload queued: %s - job %s", filename, job["job_id"])
+            return JSONResponse(status_code=202, content=job)
+
+        if response.status_code != 200:
+            raise_for_upstream_status(response)
+
+        result = response.json()
+        logger.info("Upload successful: %s - %d chunks created", filename, result.get("total_chunks", 0))
+        return result
+
+    except httpx.TimeoutException:
+        logger.error("Timeout connecting to ingestion service: %s", INGESTION_SERVICE_URL)
+        raise HTTPException(
+            status_code=504,
+            detail="Processing timeout. The file may be too large or complex."
+        )
+
+    except httpx.RequestError as e:
+        logger.error("Connection error to ingestion service: %s", e)
+        raise HTTPException(
+            status_code=503,
+            detail="Service temporarily unavailable. Please try again later."
+        )
+
+
+@app.post("/upload", openapi_extra=UPLOAD_OPENAPI, dependencies=[Depends(admit_upload)])
+async def upload_file(request: Request, async_mode: bool = Query(False, alias="async"),
+                      extractor: Optional[ExtractorMode] = Query(None)):
     """
     Accept a file upload and forward it to the ingestion service for processing.
     Returns extracted text chunks from the PDF.
-    """
-    logger.info(f"Upload started: {file.filename}")
 
-    try:
-        # Read file content
-        content = await file.read()
+    The multipart body is streamed through to the ingestion service without
+    being buffered, so memory use per upload is constant.
 
-        # Validate file
-        validate_file(file, content)
+    With ``?async=true`` the file is queued for background processing and
+    ``202 Accepted`` is returned with a job id; poll ``/jobs/{job_id}`` for
+    progress and the result.
 
-        # Forward to ingestion service
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                files = {"file": (file.filename, content, file.content_type)}
+    With ``Accept: application/x-ndjson`` chunks are streamed back as the
+    ingestion service produces them, without being buffered by the gateway.
 
-                logger.info(f"Forwarding to ingestion service: {INGESTION_SERVICE_URL}")
-                response = await client.post(
-                    f"{INGESTION_SERVICE_URL}/process_pdf",
-                    files=files
-                )
+    ``?extractor=layout|fast|auto`` picks the text extraction backend;
+    ``fast`` is much quicker for born-digital PDFs.
 
-                if response.status_code != 200:
-                    logger.error(
-                        f"Ingestion service error: status={response.status_code} "
-                        f"detail={response.text}"
-                    )
-                    raise HTTPException(
-                        status_code=response.status_code,
-                        detail="PDF processing failed. Please check the file and try again."
-                    )
-
-                result = response.json()
-                logger.info(
-                    f"Upload successful: {file.filename} - "
-                    f"{result.get('total_chunks', 0)} chunks created"
-                )
-                return result
+    Cached search results are invalidated once the new chunks have been
+    indexed by the embeddings service (see ``/search``).
 
-            except httpx.TimeoutException:
-                logger.error(f"Timeout connecting to ingestion service: {INGESTION_SERVICE_URL}")
-                raise HTTPException(
-                    status_code=504,
-                    detail="Processing timeout. The file may be too large or complex."
-                )
+    Files above ``MAX_FILE_SIZE`` can be sent in parts with ``/uploads``.
+    """
+    try:
+        upload = MultipartStream(request)
+        part = await upload.find_file("file")
+        logger.info("Upload started: %s", part.filename)
+        validate_filename(part.filename)
 
-            except httpx.RequestError as e:
-                logger.error(f"Connection error to ingestion service: {str(e)}")
-                raise HTTPException(
-                    status_code=503,
-                    detail="Service temporarily unavailable. Please try again later."
-                )
+        # Reject empty and non-PDF files before contacting the ingestion service
+        chunks = await prefetch(validate_pdf_stream(upload.iter_data(), MAX_FILE_SIZE))
+        return await forward_upload(request, part.filename, part.content_type, chunks, async_mode, extractor)
 
     except HTTPException:
-        # Re-raise HTTPExceptions (already logged)
+        # Re-raise HTTPExceptions (already logged), including size and
+        # signature violations detected while the body was streaming
         raise
     except Exception as e:
         # Catch any unexpected errors
-        logger.error(f"Unexpected error during upload: {str(e)}", exc_info=True)
+        logger.error("Unexpected error during upload: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail="An unexpected error occurred. Please contact support."
         )
+
+
+@app.post("/uploads", status_code=201)
+async def create_upload(body: CreateUploadRequest, response: Response):
+    """
+    Start a resumable upload of ``size`` bytes.
+
+    Send the file in parts with ``PUT /uploads/{upload_id}``, then call
+    ``POST /uploads/{upload_id}/complete``. The size limit is
+    ``RESUMABLE_MAX_FILE_SIZE`` rather than ``MAX_FILE_SIZE``.
+    """
+    validate_filename(body.filename)
+    session = resumable_uploads.create(body.filename, body.size, body.sha256)
+    logger.info("Resumable upload started: %s (%d bytes) - %s", body.filename, body.size, session.id)
+    response.headers["Location"] = f"/uploads/{session.id}"
+    return session.status()
+
+
+@app.put("/uploads/{upload_id}")
+async def upload_part(upload_id: str, request: Request):
+    """
+    Append a byte range (``Content-Range: bytes start-end/size``) to an upload.
+
+    The range must start at or before the received offset; bytes already
+    received are skipped. Bytes that arrive before a dropped connection are
+    kept, so a retry only needs to send what is missing. Returns the new
+    offset.
+    """
+    session = resumable_uploads.get(upload_id)
+    start, end = parse_content_range(request.headers.get("content-range"), session.size)
+    await resumable_uploads.write(session, start, end, request.stream())
+    return session.status()
+
+
+@app.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str):
+    """Report how many bytes of an upload were received; resume from ``offset``."""
+    return resumable_uploads.get(upload_id).status()
+
+
+@app.delete("/uploads/{upload_id}", status_code=204)
+async def cancel_upload(upload_id: str):
+    """Abandon an upload and delete the received bytes."""
+    resumable_uploads.discard(resumable_uploads.get(upload_id))
+    return Response(status_code=204)
+
+
+@app.post("/uploads/{upload_id}/complete", dependencies=[Depends(admit_upload)])
+async def complete_upload(upload_id: str, request: Request, async_mode: bool = Query(False, alias="async"),
+                          extractor: Optional[ExtractorMode] = Query(None)):
+    """
+    Forward a fully received upload to the ingestion service.
+
+    Supports the same ``?async=true``, ``?extractor=`` and NDJSON modes as
+    ``/upload``. The file is streamed from disk. If the ingestion service
+    fails, the upload is kept so completion can be retried without sending
+    the file again.
+    """
+    session = resumable_uploads.get(upload_id)
+    if session.lock.locked():
+        raise HTTPException(status_code=409, detail="Another request is writing to or completing this upload")
+    async with session.lock:
+        # A completion that held the lock first has forwarded and discarded the session
+        if resumable_uploads.get(upload_id) is not session:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        digest = resumable_uploads.verify(session)
+        logger.info("Resumable upload complete: %s sha256=%s", session.filename, digest)
+        result = await forward_upload(
+            request, session.filename, "application/pdf", resumable_uploads.iter_file(session), async_mode,
+            extractor
+        )
+        resumable_uploads.discard(session)
+    return result
+
+
+async def forward_batch_file(client: httpx.AsyncClient, filename: str, chunks, request_id: str,
+                             extractor: Optional[str] = None) -> dict:
+    """
+    Ingest one file of a batch upload.
+
+    Returns the document summary without its chunks.
+
+    Raises:
+        HTTPException: With the status to report for this file
+    """
+    body = MultipartEncoder("file", filename, "application/pdf", chunks)
+    try:
+        response = await client.post(
+            f"{INGESTION_SERVICE_URL}/process_pdf",
+            content=body,
+            params=upstream_params(extractor),
+            headers={"Content-Type": body.content_type, REQUEST_ID_HEADER: request_id}
+        )
+    except httpx.TimeoutException:
+        logger.error("Timeout processing batch file %s", filename)
+        raise HTTPException(
+            status_code=504,
+            detail="Processing timeout. The file may be too large or complex."
+        )
+    except httpx.RequestError as e:
+        logger.error("Connection error to ingestion service: %s", e)
+        raise HTTPException(
+            status_code=503,
+            detail="Service temporarily unavailable. Please try again later."
+        )
+
+    if response.status_code != 200:
+        raise_for_upstream_status(response)
+    result = response.json()
+    return {
+        "document_id": result.get("document_id"),
+        "total_pages": result.get("total_pages"),
+        "total_chunks": result.get("total_chunks", 0),
+        "deduplicated": result.get("deduplicated", False),
+    }
+
+
+@app.post("/upload/batch", openapi_extra=BATCH_UPLOAD_OPENAPI)
+async def upload_batch(request: Request, extractor: Optional[ExtractorMode] = Query(None)):
+    """
+    Upload many PDFs at once, as separate ``files`` parts and/or zip archives.
+
+    Each file is forwarded to the ingestion service as soon as it has been
+    received, with at most ``BATCH_UPLOAD_CONCURRENCY`` in flight. The
+    response is NDJSON: one ``result`` record per file in completion order
+    (``index`` is its position in the batch), then a ``summary`` record.
+    Invalid files are reported in their result record and do not fail the
+    rest of the batch. ``?extractor=`` applies to every file, as for
+    ``/upload``; ``fast`` suits bulk backfills of born-digital PDFs.
+
+    Each file being forwarded holds one of the API key's concurrent upload
+    slots, and no more files are forwarded at once than the key has slots.
+    A file that finds every slot taken by other requests fails with 429.
+    """
+    client = get_ingestion_client(request.app)
+    request_id = request.state.request_id
+    api_key = request.state.api_key
+
+    async def forward(filename: str, chunks) -> dict:
+        async with admission.upload(api_key):
+            return await forward_batch_file(client, filename, chunks, request_id, extractor)
+
+    concurrency = BATCH_UPLOAD_CONCURRENCY
+    if api_key.max_concurrent_uploads > 0:
+        concurrency = min(concurrency, api_key.max_concurrent_uploads)
+    batch = BatchUpload(
+        forward,
+        concurrency=concurrency,
+        max_files=BATCH_MAX_FILES,
+        max_file_size=MAX_FILE_SIZE,
+        max_archive_size=BATCH_MAX_ARCHIVE_SIZE,
+        allowed_extensions=ALLOWED_EXTENSIONS,
+    )
+    try:
+        await batch.receive(MultipartStream(request))
+    except BaseException:
+        await batch.aclose()
+        raise
+    return StreamingResponse(
+        batch.results(),
+        media_type=NDJSON_MEDIA_TYPE,
+        background=BackgroundTask(batch.aclose)
+    )
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, request: Request):
+    """
+    Report the state of an asynchronous upload.
+
+    Proxies the ingestion service's job status, including page progress and
+    the processing result once the job has succeeded. Jobs are asked of the
+    replica that accepted them; jobs this process did not see queued (e.g.
+    after a restart) are looked for on every replica.
+    """
+    client = get_ingestion_client(request.app)
+    pinned = ingestion_balancer.pinned(job_id)
+    for replica in [pinned] if pinned else ingestion_balancer.urls:
+        try:
+            response = await client.get(
+                f"{INGESTION_SERVICE_URL}/jobs/{job_id}",
+                headers={REQUEST_ID_HEADER: request.state.request_id},
+                extensions={REPLICA_EXTENSION: replica}
+            )
+        except httpx.RequestError as e:
+            logger.error("Connection error to ingestion service: %s", e)
+            raise HTTPException(
+                status_code=503,
+                detail="Service temporarily unavailable. Please try again later."
+            )
+        if response.status_code != 404:
+            if not pinned:
+                ingestion_balancer.pin(job_id, replica)
+            break
+
+    if response.status_code == 404:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if response.status_code != 200:
+        raise_for_upstream_status(response)
+    return response.json()
+
+
+async def fetch_corpus_version(client: httpx.AsyncClient, request_id: str) -> int:
+    """
+    Ask the embeddings service for its corpus version (see query_cache.py).
+
+    Raises:
+        HTTPException: If the embeddings service fails or cannot be reached
+    """
+    try:
+        response = await client.get(
+            f"{EMBEDDINGS_SERVICE_URL}/corpus_version", headers={REQUEST_ID_HEADER: request_id}
+        )
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        logger.error("Could not get the corpus version from the embeddings service: %s", e)
+        raise HTTPException(
+            status_code=503,
+            detail="Service temporarily unavailable. Please try again later."
+        )
+    return response.json()["version"]
+
+
+async def forward_search(client: httpx.AsyncClient, body: bytes, request_id: str) -> tuple[int, bytes]:
+    """Send a search to the embeddings service; returns ``(status_code, body)`` of a 200 or 422 response."""
+    try:
+        response = await client.post(
+            f"{EMBEDDINGS_SERVICE_URL}/search",
+            content=body,
+            headers={"Content-Type": "application/json", REQUEST_ID_HEADER: request_id}
+        )
+    except httpx.TimeoutException:
+        logger.error("Timeout connecting to embeddings service: %s", EMBEDDINGS_SERVICE_URL)
+        raise HTTPException(status_code=504, detail="Search timed out. Please try again.")
+    except httpx.RequestError as e:
+        logger.error("Connection error to embeddings service: %s", e)
+        raise HTTPException(
+            status_code=503,
+            detail="Service temporarily unavailable. Please try again later."
+        )
+
+    if response.status_code not in (200, 422):
+        # 422: invalid search request, the validation details are passed through
+        logger.error("Embeddings service error: status=%d detail=%s", response.status_code, response.text)
+        raise HTTPException(status_code=502, detail="Search failed. Please try again later.")
+    return response.status_code, response.content
+
+
+@app.post("/search")
+async def search(request: Request):
+    """
+    Semantic search over ingested documents.
+
+    Forwards ``{"query": ..., "k": ..., "document_ids": [...]}`` to the
+    embeddings service and returns the matching chunks with their scores.
+
+    Results are cached per normalised query, parameters and corpus version;
+    identical concurrent searches share one upstream call. ``X-Cache``
+    reports ``hit``, ``coalesced`` or ``miss``.
+    """
+    client = get_embeddings_client(request.app)
+    body = await request.body()
+    try:
+        params = json.loads(body)
+    except ValueError:
+        params = None
+    if not isinstance(params, dict):
+        # Not cacheable; the embeddings service reports the validation error
+        status_code, content = await forward_search(client, body, request.state.request_id)
+        return Response(content=content, status_code=status_code, media_type="application/json")
+
+    await query_cache.refresh_version(lambda: fetch_corpus_version(client, request.state.request_id))
+    key = query_cache.key("/search", params)
+    (status_code, content), outcome = await query_cache.get_or_compute(
+        key, lambda: forward_search(client, body, request.state.request_id)
+    )
+    return Response(
+        content=content,
+        status_code=status_code,
+        media_type="application/json",
+        headers={"X-Cache": outcome}
+    )
@@ -0,0 +1,216 @@
+"""
+Response cache for search queries.
+
+Users repeat the same searches, e.g. a team asking the same questions of a
+shared reading list, and each one costs a query embedding and a retrieval
+pass. Successful responses are cached under a hash of the normalised query,
+its parameters and the corpus version. The embeddings service publishes
+the version and changes it each time a document's chunks have been indexed
+and are searchable. By default it is read before every cached search (one
+small request, far cheaper than embedding the query), and a new version
+clears the cache, so results computed before the corpus changed are never
+served afterwards. ``version_ttl_seconds`` can trade that guarantee for
+fewer version requests.
+
+Entries expire after a TTL and the least recently used ones are evicted
+once the byte budget is exceeded. Concurrent identical misses are coalesced:
+the first request computes the response and the others await its result
+(single-flight). If that first request is cancelled, a waiting one takes
+over the computation.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+QUERY_CACHE_REQUESTS = Counter(
+    "gateway_query_cache_requests_total",
+    "Query cache lookups by outcome",
+    ["result"],
+)
+QUERY_CACHE_BYTES = Gauge("gateway_query_cache_bytes", "Bytes of responses held in the query cache")
+CORPUS_VERSION = Gauge("gateway_corpus_version", "Corpus version used in query cache keys")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class _Abandoned(Exception):
+    """Set on an in-flight result whose computing request was cancelled."""
+
+
+def normalize_query(query: str) -> str:
+    """Normalise Unicode (NFKC) and collapse whitespace; case is kept as it can matter for exact terms."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", query)).strip()
+
+
+def query_key(route: str, params: dict, version: int) -> str:
+    """
+    Return the cache key of a request to ``route`` with JSON ``params``.
+
+    Example:
+        >>> query_key("/search", {"query": " BRCA1  repair", "k": 5}, 1) == \\
+        ...     query_key("/search", {"k": 5, "query": "BRCA1 repair"}, 1)
+        True
+    """
+    params = dict(params)
+    if isinstance(params.get("query"), str):
+        params["query"] = normalize_query(params["query"])
+    canonical = json.dumps([route, version, params], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class QueryCache:
+    """
+    TTL + LRU cache of response bodies under a byte budget, with single-flight misses.
+
+    Args:
+        max_bytes: Byte budget of cached bodies; 0 disables caching (identical
+            concurrent misses are still coalesced)
+        ttl_seconds: Seconds an entry may be served for
+        version_ttl_seconds: Seconds the corpus version is trusted before it
+            is fetched again; 0 fetches it for every lookup, anything else
+            allows results up to that old after the corpus changed
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, ttl_seconds: float = 300.0,
+                 version_ttl_seconds: float = 0.0):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.version_ttl_seconds = version_ttl_seconds
+        self.version: Optional[int] = None
+        self._version_checked_at = float("-inf")
+        self._version_lock = asyncio.Lock()
+        self._entries: OrderedDict[str, tuple[float, int, bytes]] = OrderedDict()
+        self._bytes = 0
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def set_version(self, version: int) -> None:
+        """Record the current corpus version, invalidating every cached response if it changed."""
+        if version == self.version:
+            return
+        self.version = version
+        self._entries.clear()
+        self._bytes = 0
+        CORPUS_VERSION.set(version)
+        QUERY_CACHE_BYTES.set(0)
+        logger.info("Corpus version is now %d; query cache cleared", version)
+
+    async def refresh_version(self, fetch: Callable[[], Awaitable[int]]) -> None:
+        """
+        Update the corpus version with ``fetch`` unless it was checked within
+        ``version_ttl_seconds``. With a TTL, concurrent callers share one
+        fetch; without one, each caller fetches, so none can miss a change
+        made before it arrived. Errors raised by ``fetch`` propagate.
+        """
+        if self.version_ttl_seconds <= 0:
+            self.set_version(await fetch())
+            return
+        if time.monotonic() - self._version_checked_at < self.version_ttl_seconds:
+            return
+        async with self._version_lock:
+            if time.monotonic() - self._version_checked_at < self.version_ttl_seconds:
+                return
+            self.set_version(await fetch())
+            self._version_checked_at = time.monotonic()
+
+    def key(self, route: str, params: dict) -> str:
+        return query_key(route, params, self.version)
+
+    def get(self, key: str):
+        """Return the cached ``(status_code, body)`` of a key, or None if absent or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, status_code, body = entry
+        if expires_at <= time.monotonic():
+            self._evict(key)
+            return None
+        self._entries.move_to_end(key)
+        return status_code, body
+
+    def put(self, key: str, status_code: int, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, status_code, body)
+        self._bytes += len(body)
+        while self._bytes > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+        QUERY_CACHE_BYTES.set(self._bytes)
+
+    def _evict(self, key: str) -> None:
+        _, _, body = self._entries.pop(key)
+        self._bytes -= len(body)
+        QUERY_CACHE_BYTES.set(self._bytes)
+
+    async def get_or_compute(self, key: str,
+                             compute: Callable[[], Awaitable[tuple[int, bytes]]]) -> tuple[tuple[int, bytes], str]:
+        """
+        Return the response for ``key``, computing it at most once at a time.
+
+        ``compute`` returns ``(status_code, body)``; only 200 responses are
+        cached. Errors raised by ``compute`` propagate to every waiting
+        request and are not cached. If the computing request is cancelled,
+        the waiting ones start over and one of them computes the response.
+
+        Returns:
+            The response and how it was obtained: ``"hit"``, ``"coalesced"`` or ``"miss"``
+        """
+        while True:
+            cached = self.get(key)
+            if cached is not None:
+                QUERY_CACHE_REQUESTS.labels(result="hit").inc()
+                return cached, "hit"
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            try:
+                # shield: a cancelled waiter must not cancel the shared computation
+                result = await asyncio.shield(inflight)
+            except _Abandoned:
+                continue
+            QUERY_CACHE_REQUESTS.labels(result="coalesced").inc()
+            return result, "coalesced"
+
+        QUERY_CACHE_REQUESTS.labels(result="miss").inc()
+        version = self.version
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            # Waiters must not be cancelled with this request; they retry instead
+            future.set_exception(_Abandoned())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            # A response computed while the corpus changed may already be stale
+            if result[0] == 200 and self.version == version:
+                self.put(key, *result)
+            return result, "miss"
+        finally:
+            del self._inflight[key]
@@ -0,0 +1,297 @@
+"""
+Resumable uploads for API Gateway.
+
+Large files are sent in parts over several requests:
+
+1. ``POST /uploads`` with the filename and total size creates a session.
+2. ``PUT /uploads/{id}`` with ``Content-Range: bytes start-end/size`` appends
+   a byte range. Bytes that arrive before a dropped connection are kept.
+3. ``GET /uploads/{id}`` reports the received offset, where a client resumes.
+4. ``POST /uploads/{id}/complete`` forwards the file to ingestion.
+
+Parts are appended to a file on disk and hashed as they arrive, so memory use
+does not depend on the file size, and the finished file is streamed to the
+ingestion service from disk. Sessions live in the memory of the gateway
+process that created them and expire after a period of inactivity.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException
+from prometheus_client import Counter, Gauge
+from pydantic import BaseModel, Field
+
+from streaming import PDF_MAGIC
+
+logger = logging.getLogger(__name__)
+
+RESUMABLE_SESSIONS = Gauge(
+    "gateway_resumable_upload_sessions",
+    "Resumable upload sessions in progress",
+)
+RESUMABLE_BYTES = Counter(
+    "gateway_resumable_upload_bytes_total",
+    "Bytes received for resumable uploads",
+)
+
+# Received bytes are written to disk in blocks of this size
+WRITE_BLOCK_SIZE = 1024 * 1024
+READ_CHUNK_SIZE = 256 * 1024
+
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+
+
+class CreateUploadRequest(BaseModel):
+    """Body of ``POST /uploads``."""
+    filename: str
+    size: int = Field(gt=0, description="Total file size in bytes")
+    sha256: Optional[str] = Field(
+        None, pattern=r"^[0-9a-fA-F]{64}$", description="Checked against the received file on completion"
+    )
+
+
+@dataclass
+class UploadSession:
+    """State of one resumable upload."""
+    id: str
+    filename: str
+    size: int
+    path: str
+    expected_sha256: Optional[str] = None
+    offset: int = 0
+    head: bytes = b""
+    updated_at: float = field(default_factory=time.monotonic)
+    hasher: "hashlib._Hash" = field(default_factory=hashlib.sha256, repr=False)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+    @property
+    def complete(self) -> bool:
+        return self.offset == self.size
+
+    def status(self) -> dict:
+        return {
+            "upload_id": self.id,
+            "filename": self.filename,
+            "size": self.size,
+            "offset": self.offset,
+            "complete": self.complete,
+        }
+
+
+def parse_content_range(header: Optional[str], size: int) -> tuple[int, int]:
+    """
+    Parse ``Content-Range: bytes start-end/total`` into an end-exclusive range.
+
+    Raises:
+        HTTPException: 400 if the header is missing, malformed or does not
+            fit the declared file size
+    """
+    match = _CONTENT_RANGE.match((header or "").strip())
+    if match is None:
+        raise HTTPException(status_code=400, detail="Content-Range header 'bytes start-end/size' is required")
+    start, end = int(match.group(1)), int(match.group(2)) + 1
+    total = match.group(3)
+    if end <= start or end > size or (total != "*" and int(total) != size):
+        raise HTTPException(status_code=400, detail=f"Content-Range does not fit an upload of {size} bytes")
+    return start, end
+
+
+class ResumableUploadStore:
+    """
+    Resumable upload sessions of this process, spooled under a private directory.
+
+    Args:
+        directory: Parent directory for spooled parts (system temp dir if None)
+        max_size: Maximum file size in bytes
+        ttl_seconds: Idle time after which a session is discarded
+        max_sessions: Maximum sessions in progress at once
+    """
+
+    def __init__(self, directory: Optional[str], max_size: int, ttl_seconds: float, max_sessions: int):
+        self.parent = directory
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._directory: Optional[str] = None
+        self._sessions: dict[str, UploadSession] = {}
+
+    def _spool_directory(self) -> str:
+        # Created on first use so importing the gateway has no side effects
+        if self._directory is None:
+            if self.parent:
+                os.makedirs(self.parent, exist_ok=True)
+            self._directory = tempfile.mkdtemp(prefix="uploads-", dir=self.parent or None)
+        return self._directory
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        for session in list(self._sessions.values()):
+            if session.updated_at < cutoff and not session.lock.locked():
+                logger.info("Resumable upload expired: %s", session.id)
+                self.discard(session)
+
+    def create(self, filename: str, size: int, sha256: Optional[str] = None) -> UploadSession:
+        """
+        Start a session with an empty spool file.
+
+        Raises:
+            HTTPException: 413 above the size limit, 503 when too many
+                sessions are in progress
+        """
+        if size > self.max_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File too large. Maximum size: {self.max_size / 1024 / 1024:.1f}MB"
+            )
+        self._expire()
+        if len(self._sessions) >= self.max_sessions:
+            logger.warning("Resumable upload refused: %d sessions in progress", len(self._sessions))
+            raise HTTPException(
+                status_code=503,
+                detail="Too many uploads in progress. Please retry later.",
+                headers={"Retry-After": "60"}
+            )
+
+        upload_id = uuid.uuid4().hex
+        path = os.path.join(self._spool_directory(), f"{upload_id}.part")
+        open(path, "wb").close()
+        session = UploadSession(
+            id=upload_id, filename=filename, size=size, path=path,
+            expected_sha256=sha256.lower() if sha256 else None
+        )
+        self._sessions[upload_id] = session
+        RESUMABLE_SESSIONS.set(len(self._sessions))
+        return session
+
+    def get(self, upload_id: str) -> UploadSession:
+        """
+        Raises:
+            HTTPException: 404 for unknown or expired sessions
+        """
+        session = self._sessions.get(upload_id)
+        if session is None or session.updated_at < time.monotonic() - self.ttl_seconds:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        return session
+
+    def discard(self, session: UploadSession) -> None:
+        """Forget a session and delete its spool file."""
+        if self._sessions.pop(session.id, None) is not None:
+            RESUMABLE_SESSIONS.set(len(self._sessions))
+        try:
+            os.remove(session.path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _open_at(path: str, offset: int):
+        fileobj = open(path, "r+b")
+        # Drop bytes of a write that failed part-way
+        fileobj.truncate(offset)
+        fileobj.seek(offset)
+        return fileobj
+
+    @staticmethod
+    def _append(fileobj, session: UploadSession, data: bytes) -> None:
+        fileobj.write(data)
+        session.hasher.update(data)
+        if len(session.head) < len(PDF_MAGIC):
+            session.head = (session.head + data[:len(PDF_MAGIC)])[:len(PDF_MAGIC)]
+        session.offset += len(data)
+
+    async def write(self, session: UploadSession, start: int, end: int,
+                    chunks: AsyncIterator[bytes]) -> int:
+        """
+        Append the bytes of ``[start, end)`` that have not been received yet.
+
+        Ranges may overlap what was already received (a retried part); the
+        overlap is skipped. Whatever arrives before the body ends or the
+        connection drops is kept, and the new offset is returned.
+
+        Raises:
+            HTTPException: 409 if the range starts past the received offset or
+                another request is writing to the session, 400 if the body
+                overruns its range or the file is not a PDF
+        """
+        if session.lock.locked():
+            raise HTTPException(status_code=409, detail="Another request is writing to this upload")
+        async with session.lock:
+            if start > session.offset:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Range starts at {start} but only {session.offset} bytes were received"
+                )
+            received = session.offset
+            buffer = bytearray()
+            position = start
+            fileobj = await asyncio.to_thread(self._open_at, session.path, session.offset)
+            try:
+                async for chunk in chunks:
+                    if position + len(chunk) > end:
+                        raise HTTPException(status_code=400, detail="Body is longer than its Content-Range")
+                    written_to = session.offset + len(buffer)
+                    if position + len(chunk) > written_to:
+                        buffer += chunk[max(0, written_to - position):]
+                    position += len(chunk)
+                    if len(buffer) >= WRITE_BLOCK_SIZE:
+                        await asyncio.to_thread(self._append, fileobj, session, bytes(buffer))
+                        buffer.clear()
+            finally:
+                if buffer:
+                    await asyncio.to_thread(self._append, fileobj, session, bytes(buffer))
+                await asyncio.to_thread(fileobj.close)
+                session.updated_at = time.monotonic()
+                RESUMABLE_BYTES.inc(session.offset - received)
+
+            if len(session.head) >= len(PDF_MAGIC) and not session.head.startswith(PDF_MAGIC):
+                logger.warning("Resumable upload rejected: missing PDF signature")
+                self.discard(session)
+                raise HTTPException(status_code=400, detail="File is not a valid PDF")
+            return session.offset
+
+    def verify(self, session: UploadSession) -> str:
+        """
+        Check that a session is ready to be forwarded and return its SHA-256.
+
+        Call with ``session.lock`` held, so no part is written meanwhile.
+
+        Raises:
+            HTTPException: 409 while bytes are missing, 400 (and the session is
+                discarded) if the content does not match the declared checksum
+        """
+        if not session.complete:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload incomplete: {session.offset} of {session.size} bytes received"
+            )
+        digest = session.hasher.hexdigest()
+        if session.expected_sha256 and digest != session.expected_sha256:
+            logger.warning("Resumable upload %s failed checksum verification", session.id)
+            self.discard(session)
+            raise HTTPException(status_code=400, detail="Checksum mismatch. Please upload the file again.")
+        return digest
+
+    async def iter_file(self, session: UploadSession) -> AsyncIterator[bytes]:
+        """Stream a spooled file from disk without blocking the event loop."""
+        fileobj = await asyncio.to_thread(open, session.path, "rb")
+        try:
+            while chunk := await asyncio.to_thread(fileobj.read, READ_CHUNK_SIZE):
+                yield chunk
+        finally:
+            fileobj.close()
+
+    def close(self) -> None:
+        """Discard all sessions and remove the spool directory."""
+        self._sessions.clear()
+        RESUMABLE_SESSIONS.set(0)
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
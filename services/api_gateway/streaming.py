@@ -0,0 +1,262 @@
+"""
+Streaming upload helpers for API Gateway.
+
+Uploads are parsed straight from the request body and forwarded to the
+ingestion service chunk by chunk, so the gateway never holds a whole file in
+memory. Validation (size limit, PDF signature) happens incrementally while
+the bytes flow through.
+"""
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+import logging
+import uuid
+
+from fastapi import HTTPException, Request
+from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+PDF_MAGIC = b"%PDF-"
+
+# OpenAPI description of a single-file multipart upload, used by routes that
+# read the body themselves instead of declaring an ``UploadFile`` parameter
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
+@dataclass
+class StreamedPart:
+    """Headers of a multipart part whose body is still being streamed."""
+    field_name: str
+    filename: Optional[str]
+    content_type: Optional[str]
+
+
+class MultipartStream:
+    """
+    Incremental multipart/form-data reader.
+
+    Parts are returned one at a time by ``next_part()`` and their bodies are
+    read with ``iter_data()``. Only one network chunk is buffered at a time,
+    so memory use does not depend on the size of the upload.
+
+    Args:
+        request: Incoming request with a multipart/form-data body
+    """
+
+    def __init__(self, request: Request):
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+        self._body = request.stream()
+        self._events: deque = deque()
+        self._finished = False
+        self._in_part = False
+        self._header_name = b""
+        self._header_value = b""
+        self._headers: dict[bytes, bytes] = {}
+
+        self._parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+
+    # Parser callbacks only queue events; all I/O happens in the async methods
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        self._events.append(("data", data[start:end]))
+
+    def _on_part_end(self) -> None:
+        self._events.append(("end", None))
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        filename = options.get(b"filename")
+        content_type = self._headers.get(b"content-type")
+        self._events.append(("part", StreamedPart(
+            field_name=options.get(b"name", b"").decode("utf-8", "replace"),
+            filename=filename.decode("utf-8", "replace") if filename is not None else None,
+            content_type=content_type.decode("latin-1") if content_type else None,
+        )))
+
+    async def _next_event(self) -> Optional[tuple]:
+        while not self._events:
+            if self._finished:
+                return None
+            try:
+                chunk = await self._body.__anext__()
+            except StopAsyncIteration:
+                self._parser.finalize()
+                self._finished = True
+                continue
+            try:
+                self._parser.write(chunk)
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}")
+        return self._events.popleft()
+
+    async def next_part(self) -> Optional[StreamedPart]:
+        """Skip the rest of the current part and return the next one, if any."""
+        while True:
+            event = await self._next_event()
+            if event is None:
+                return None
+            kind, value = event
+            if kind == "part":
+                self._in_part = True
+                return value
+            if kind == "end":
+                self._in_part = False
+
+    async def iter_data(self) -> AsyncIterator[bytes]:
+        """Yield the body of the current part as it arrives."""
+        while self._in_part:
+            event = await self._next_event()
+            if event is None:
+                raise HTTPException(status_code=400, detail="Upload ended unexpectedly")
+            kind, value = event
+            if kind == "end":
+                self._in_part = False
+            elif kind == "data" and value:
+                yield value
+
+    async def find_file(self, field_name: str = "file") -> StreamedPart:
+        """
+        Advance to the first file part named ``field_name``.
+
+        Raises:
+            HTTPException: If the body contains no such file
+        """
+        while True:
+            part = await self.next_part()
+            if part is None:
+                raise HTTPException(status_code=400, detail=f"Missing '{field_name}' file field")
+            if part.field_name == field_name and part.filename is not None:
+                return part
+
+
+async def validate_pdf_stream(chunks: AsyncIterator[bytes], max_size: int) -> AsyncIterator[bytes]:
+    """
+    Pass chunks through while enforcing the size limit and PDF signature.
+
+    Nothing is yielded until the first bytes have been checked against the
+    PDF magic number, so an invalid file is rejected before it is forwarded.
+
+    Raises:
+        HTTPException: 400 for empty or non-PDF content, 413 as soon as the
+            running size crosses ``max_size``
+    """
+    head = b""
+    size = 0
+
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_size:
+            logger.warning("Upload rejected: exceeded %d bytes", max_size)
+            raise HTTPException(
+                status_code=413,
+                detail=f"File too large. Maximum size: {max_size / 1024 / 1024:.1f}MB"
+            )
+
+        if head is not None:
+            head += chunk
+            if len(head) < len(PDF_MAGIC):
+                continue
+            if not head.startswith(PDF_MAGIC):
+                logger.warning("Upload rejected: missing PDF signature")
+                raise HTTPException(status_code=400, detail="File is not a valid PDF")
+            chunk, head = head, None
+
+        yield chunk
+
+    if size == 0:
+        logger.warning("Upload attempt with empty file")
+        raise HTTPException(status_code=400, detail="File is empty")
+    if head is not None:
+        logger.warning("Upload rejected: missing PDF signature")
+        raise HTTPException(status_code=400, detail="File is not a valid PDF")
+
+
+async def prefetch(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Pull the first chunk now and return an iterator that replays it.
+
+    Lets validation of the first bytes fail before an upstream request is
+    opened.
+    """
+    first = await chunks.__anext__()
+
+    async def replay() -> AsyncIterator[bytes]:
+        yield first
+        async for chunk in chunks:
+            yield chunk
+
+    return replay()
+
+
+def _quote(value: str) -> str:
+    """Escape a value for a Content-Disposition parameter (HTML5 rules)."""
+    return value.replace("\\", "\\\\").replace('"', "%22").replace("\r", "%0D").replace("\n", "%0A")
+
+
+class MultipartEncoder:
+    """
+    Streams a single-file multipart/form-data body.
+
+    Args:
+        field_name: Form field name of the file
+        filename: Filename sent to the upstream service
+        content_type: Content type of the file part
+        chunks: File body
+    """
+
+    def __init__(self, field_name: str, filename: str, content_type: Optional[str],
+                 chunks: AsyncIterator[bytes]):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self._head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{_quote(field_name)}"; filename="{_quote(filename)}"\r\n'
+            f"Content-Type: {content_type or 'application/octet-stream'}\r\n\r\n"
+        ).encode("utf-8")
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode("ascii")
+        self._chunks = chunks
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        yield self._head
+        async for chunk in self._chunks:
+            yield chunk
+        yield self._tail
@@ -0,0 +1,247 @@
+"""
+Shared HTTP clients for calls from API Gateway to the ingestion and
+embeddings services.
+
+One ``httpx.AsyncClient`` per upstream service is created per application
+(see the lifespan in ``main.py``) so connections are pooled and kept alive
+across requests instead of being set up for every upload or search. Both
+transports record upstream latency and in-flight requests for Prometheus.
+The ingestion client also spreads requests over replicas when given a
+``balancer.LoadBalancer``, and its pool is the one reported by
+``PoolMetricsCollector``.
+"""
+import logging
+import os
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+
+import httpx
+from fastapi import FastAPI
+from prometheus_client import REGISTRY, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+
+if TYPE_CHECKING:
+    from balancer import LoadBalancer
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    "gateway_upstream_request_seconds",
+    "Time from sending an upstream request to receiving its response headers",
+    ["upstream", "endpoint", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "gateway_upstream_requests_in_flight",
+    "Upstream requests sent whose response body has not been fully read yet",
+    ["upstream"],
+)
+
+# Connection pool limits
+INGESTION_MAX_CONNECTIONS = int(os.getenv("INGESTION_MAX_CONNECTIONS", "100"))
+INGESTION_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("INGESTION_MAX_KEEPALIVE_CONNECTIONS", "20"))
+INGESTION_KEEPALIVE_EXPIRY = float(os.getenv("INGESTION_KEEPALIVE_EXPIRY", "30"))
+
+# Timeouts in seconds
+INGESTION_CONNECT_TIMEOUT = float(os.getenv("INGESTION_CONNECT_TIMEOUT", "5"))
+INGESTION_READ_TIMEOUT = float(os.getenv("INGESTION_READ_TIMEOUT", "30"))
+INGESTION_WRITE_TIMEOUT = float(os.getenv("INGESTION_WRITE_TIMEOUT", "30"))
+INGESTION_POOL_TIMEOUT = float(os.getenv("INGESTION_POOL_TIMEOUT", "5"))
+
+# Embeddings service (searches and corpus versions)
+EMBEDDINGS_MAX_CONNECTIONS = int(os.getenv("EMBEDDINGS_MAX_CONNECTIONS", "100"))
+EMBEDDINGS_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("EMBEDDINGS_MAX_KEEPALIVE_CONNECTIONS", "20"))
+EMBEDDINGS_CONNECT_TIMEOUT = float(os.getenv("EMBEDDINGS_CONNECT_TIMEOUT", "5"))
+EMBEDDINGS_READ_TIMEOUT = float(os.getenv("EMBEDDINGS_READ_TIMEOUT", "30"))
+
+# HTTP/2 needs the optional "h2" package (pip install httpx[http2])
+INGESTION_HTTP2 = os.getenv("INGESTION_HTTP2", "false").lower() in ("1", "true", "yes")
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class PoolMetricsCollector:
+    """
+    Prometheus collector reporting connection pool utilisation at scrape time.
+
+    httpx does not publish pool statistics, so they are read from the
+    underlying httpcore pool when available.
+    """
+
+    def __init__(self):
+        self.client: Optional[httpx.AsyncClient] = None
+
+    def collect(self):
+        total = GaugeMetricFamily(
+            "gateway_upstream_pool_connections",
+            "Open connections in the ingestion client pool",
+            labels=["state"],
+        )
+        queued = GaugeMetricFamily(
+            "gateway_upstream_pool_queued_requests",
+            "Requests waiting for a free connection in the ingestion client pool",
+        )
+        limit = GaugeMetricFamily(
+            "gateway_upstream_pool_max_connections",
+            "Configured maximum connections in the ingestion client pool",
+            value=INGESTION_MAX_CONNECTIONS,
+        )
+
+        pool = getattr(getattr(self.client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        idle = sum(1 for conn in connections if conn.is_idle())
+        total.add_metric(["active"], len(connections) - idle)
+        total.add_metric(["idle"], idle)
+        queued.add_metric([], sum(1 for req in getattr(pool, "_requests", []) if req.is_queued()))
+
+        yield total
+        yield queued
+        yield limit
+
+
+class TrackedStream(httpx.AsyncByteStream):
+    """Response body that marks its request as finished once closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._on_close is not None:
+                self._on_close()
+                self._on_close = None
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    Transport recording upstream latency and in-flight requests.
+
+    Latency is measured to the response headers, so streamed responses are
+    not charged for the time the client takes to consume them; a request
+    counts as in flight until its body is closed. Other attributes (such as
+    the connection pool) are those of the wrapped transport.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._wrapped = transport
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        upstream = request.url.netloc.decode("ascii")
+        # First path segment only: job ids and similar must not become labels
+        endpoint = "/" + request.url.path.lstrip("/").split("/", 1)[0]
+        in_flight = UPSTREAM_IN_FLIGHT.labels(upstream=upstream)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            response = await self._wrapped.handle_async_request(request)
+        except BaseException:
+            UPSTREAM_REQUEST_SECONDS.labels(upstream, endpoint, "error").observe(time.perf_counter() - started)
+            in_flight.dec()
+            raise
+        UPSTREAM_REQUEST_SECONDS.labels(upstream, endpoint, str(response.status_code)).observe(
+            time.perf_counter() - started
+        )
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=TrackedStream(response.stream, in_flight.dec),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._wrapped.aclose()
+
+
+pool_metrics = PoolMetricsCollector()
+REGISTRY.register(pool_metrics)
+
+
+def create_ingestion_client(balancer: Optional["LoadBalancer"] = None) -> httpx.AsyncClient:
+    """
+    Create the pooled, keep-alive client used for ingestion service calls.
+
+    With a ``balancer``, requests to its virtual URL go to its replicas.
+    """
+    http2 = INGESTION_HTTP2
+    if http2 and not _http2_available():
+        logger.warning("INGESTION_HTTP2 is enabled but the 'h2' package is missing; using HTTP/1.1")
+        http2 = False
+
+    transport = httpx.AsyncHTTPTransport(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=INGESTION_MAX_CONNECTIONS,
+            max_keepalive_connections=INGESTION_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=INGESTION_KEEPALIVE_EXPIRY,
+        ),
+    )
+    transport = InstrumentedTransport(transport)
+    if balancer is not None:
+        from balancer import BalancingTransport
+
+        transport = BalancingTransport(transport, balancer)
+    client = httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(
+            connect=INGESTION_CONNECT_TIMEOUT,
+            read=INGESTION_READ_TIMEOUT,
+            write=INGESTION_WRITE_TIMEOUT,
+            pool=INGESTION_POOL_TIMEOUT,
+        ),
+    )
+    pool_metrics.client = client
+    return client
+
+
+def get_ingestion_client(app: FastAPI) -> httpx.AsyncClient:
+    """
+    Return the application's shared ingestion client.
+
+    The client is normally created by the lifespan handler; it is created on
+    first use if the lifespan did not run (e.g. in tests).
+    """
+    client = getattr(app.state, "ingestion_client", None)
+    if client is None or client.is_closed:
+        client = app.state.ingestion_client = create_ingestion_client(
+            getattr(app.state, "ingestion_balancer", None)
+        )
+    return client
+
+
+def create_embeddings_client() -> httpx.AsyncClient:
+    """Create the pooled, keep-alive client used for embeddings service calls."""
+    transport = httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=EMBEDDINGS_MAX_CONNECTIONS,
+            max_keepalive_connections=EMBEDDINGS_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=INGESTION_KEEPALIVE_EXPIRY,
+        ),
+    )
+    return httpx.AsyncClient(
+        transport=InstrumentedTransport(transport),
+        timeout=httpx.Timeout(EMBEDDINGS_READ_TIMEOUT, connect=EMBEDDINGS_CONNECT_TIMEOUT),
+    )
+
+
+def get_embeddings_client(app: FastAPI) -> httpx.AsyncClient:
+    """Return the application's shared embeddings client, created on first use like the ingestion one."""
+    client = getattr(app.state, "embeddings_client", None)
+    if client is None or client.is_closed:
+        client = app.state.embeddings_client = create_embeddings_client()
+    return client
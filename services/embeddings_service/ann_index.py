@@ -0,0 +1,290 @@
+"""
+Approximate nearest-neighbour search with an inverted file (IVF) index.
+
+Vectors are clustered with spherical k-means into ``nlist`` cells; each cell
+keeps the vectors assigned to its centroid. A query only scores the vectors
+of its ``nprobe`` closest cells, so search cost grows with
+``nprobe / nlist`` of the corpus instead of all of it. ``nprobe`` trades
+recall for latency and can be chosen per query.
+
+The index is derived from the vector store: it covers the store's first
+``ntotal`` rows and is brought up to date by adding the rows appended since.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+from typing import Iterable, Optional
+
+import numpy as np
+
+from vector_store import SearchHit, normalize_rows
+
+logger = logging.getLogger(__name__)
+
+_ASSIGN_BLOCK = 1 << 15
+
+
+class _InvertedList:
+    """
+    Growable vectors and ``(document_id, ordinal)`` ids of one cell.
+
+    Searches run while a sync thread appends, so the buffers and the row
+    count are published together as one tuple, after the new rows are
+    written. Rows below a published size are never modified afterwards.
+    """
+
+    __slots__ = ("_view",)
+
+    def __init__(self, vectors: np.ndarray, ids: np.ndarray):
+        self._view = (vectors, ids, len(vectors))
+
+    @property
+    def size(self) -> int:
+        return self._view[2]
+
+    def snapshot(self) -> tuple[np.ndarray, np.ndarray]:
+        """The cell's vectors and ids as of now; later appends do not change them."""
+        vectors, ids, size = self._view
+        return vectors[:size], ids[:size]
+
+    def append(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        """Append rows; there must be one appending thread at a time."""
+        buffer_vectors, buffer_ids, size = self._view
+        needed = size + len(vectors)
+        if needed > len(buffer_vectors) or not buffer_vectors.flags.writeable:
+            # Amortised doubling; also copies lists that are still memory-mapped
+            capacity = max(needed, 2 * len(buffer_vectors), 16)
+            grown_vectors = np.empty((capacity, buffer_vectors.shape[1]), dtype=buffer_vectors.dtype)
+            grown_ids = np.empty((capacity, 2), dtype=np.int64)
+            grown_vectors[:size] = buffer_vectors[:size]
+            grown_ids[:size] = buffer_ids[:size]
+            buffer_vectors, buffer_ids = grown_vectors, grown_ids
+        buffer_vectors[size:needed] = vectors
+        buffer_ids[size:needed] = ids
+        self._view = (buffer_vectors, buffer_ids, needed)
+
+
+class IVFIndex:
+    """
+    Inverted file index over normalised vectors (inner product = cosine).
+
+    Args:
+        dimension: Vector size
+        nlist: Number of k-means cells
+        dtype: Storage type of the indexed vectors
+    """
+
+    def __init__(self, dimension: int, nlist: int = 1024, dtype: str = "float32"):
+        self.dimension = dimension
+        self.nlist = nlist
+        self.dtype = np.dtype(dtype)
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: list[_InvertedList] = []
+        self._ntotal = 0
+        self._add_lock = threading.Lock()
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def ntotal(self) -> int:
+        """
+        Number of indexed vectors.
+
+        Only updated once an ``add`` has finished, so the first ``ntotal``
+        rows added are always searchable; rows of an ``add`` still in
+        progress may or may not be.
+        """
+        return self._ntotal
+
+    def _assign(self, vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """Index of the closest centroid of each row, in blocks to bound memory."""
+        assignments = np.empty(len(vectors), dtype=np.intp)
+        for start in range(0, len(vectors), _ASSIGN_BLOCK):
+            block = np.asarray(vectors[start:start + _ASSIGN_BLOCK], dtype=np.float32)
+            assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        return assignments
+
+    def train(self, sample: np.ndarray, iterations: int = 10, seed: int = 0) -> None:
+        """
+        Learn the cell centroids with spherical k-means.
+
+        ``nlist`` is reduced if the sample has fewer vectors than cells. A
+        sample of 30-250 vectors per cell is usually enough.
+        """
+        sample = normalize_rows(sample)
+        if len(sample) == 0:
+            raise ValueError("Cannot train an IVF index without vectors")
+        rng = np.random.default_rng(seed)
+        self.nlist = min(self.nlist, len(sample))
+        centroids = sample[rng.choice(len(sample), self.nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = self._assign(sample, centroids)
+            order = np.argsort(assignments, kind="stable")
+            counts = np.bincount(assignments, minlength=self.nlist)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            sums = np.zeros_like(centroids)
+            occupied = counts > 0
+            sums[occupied] = np.add.reduceat(sample[order], starts[occupied], axis=0)
+            # Re-seed empty cells with random sample vectors
+            empty = np.flatnonzero(~occupied)
+            if len(empty):
+                sums[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+            centroids = normalize_rows(sums)
+
+        self.centroids = centroids
+        self._lists = [
+            _InvertedList(np.empty((0, self.dimension), dtype=self.dtype), np.empty((0, 2), dtype=np.int64))
+            for _ in range(self.nlist)
+        ]
+        self._ntotal = 0
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        """
+        Add normalised vectors and their ``(document_id, ordinal)`` ids.
+
+        Vectors are appended to the cell of their nearest centroid; the
+        centroids themselves are not retrained. Safe to call while other
+        threads search.
+        """
+        if not self.trained:
+            raise RuntimeError("IVF index must be trained before vectors are added")
+        assignments = self._assign(vectors, self.centroids)
+        vectors = np.asarray(vectors, dtype=self.dtype)
+        ids = np.asarray(ids, dtype=np.int64)
+        order = np.argsort(assignments, kind="stable")
+        cells, starts = np.unique(assignments[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        with self._add_lock:
+            for cell, start, end in zip(cells, starts, ends):
+                rows = order[start:end]
+                self._lists[cell].append(vectors[rows], ids[rows])
+            self._ntotal += len(vectors)
+
+    def search(self, queries: np.ndarray, k: int = 10, nprobe: int = 8,
+               document_ids: Optional[Iterable[int]] = None) -> list[list[SearchHit]]:
+        """
+        Approximate cosine search for a batch of queries.
+
+        Queries probing the same cell are scored together with one matmul.
+
+        Args:
+            queries: ``(dimension,)`` or ``(q, dimension)`` query vectors
+            k: Results per query
+            nprobe: Cells searched per query; higher is slower but more exact
+            document_ids: Only return chunks of these documents
+
+        Returns:
+            One list of up to ``k`` hits per query, best first
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        num_queries = len(queries)
+        if not self.trained:
+            return [[] for _ in range(num_queries)]
+        nprobe = max(1, min(nprobe, self.nlist))
+        allowed = None if document_ids is None else np.fromiter(document_ids, dtype=np.int64)
+
+        centroid_scores = queries @ self.centroids.T
+        if nprobe < self.nlist:
+            probes = np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.broadcast_to(np.arange(self.nlist), (num_queries, self.nlist))
+
+        # Group queries by the cells they probe
+        cell_of_probe = probes.ravel()
+        query_of_probe = np.repeat(np.arange(num_queries), nprobe)
+        order = np.argsort(cell_of_probe, kind="stable")
+        cells, starts = np.unique(cell_of_probe[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+
+        candidate_scores: list[list[np.ndarray]] = [[] for _ in range(num_queries)]
+        candidate_ids: list[list[np.ndarray]] = [[] for _ in range(num_queries)]
+        for cell, start, end in zip(cells, starts, ends):
+            vectors, ids = self._lists[cell].snapshot()
+            if len(ids) == 0:
+                continue
+            if allowed is not None:
+                mask = np.isin(ids[:, 0], allowed)
+                if not mask.any():
+                    continue
+                vectors, ids = vectors[mask], ids[mask]
+
+            probing = query_of_probe[order[start:end]]
+            scores = np.asarray(vectors, dtype=np.float32) @ queries[probing].T  # (rows, probing)
+            for column, q in enumerate(probing):
+                column_scores = scores[:, column]
+                if len(column_scores) > k:
+                    top = np.argpartition(-column_scores, k - 1)[:k]
+                    candidate_scores[q].append(column_scores[top])
+                    candidate_ids[q].append(ids[top])
+                else:
+                    candidate_scores[q].append(column_scores)
+                    candidate_ids[q].append(ids)
+
+        results = []
+        for q in range(num_queries):
+            if not candidate_scores[q]:
+                results.append([])
+                continue
+            scores = np.concatenate(candidate_scores[q])
+            ids = np.concatenate(candidate_ids[q])
+            top = np.argsort(-scores, kind="stable")[:k]
+            results.append([SearchHit(int(ids[i, 0]), int(ids[i, 1]), float(scores[i])) for i in top])
+        return results
+
+    def save(self, path: str) -> None:
+        """
+        Write the index to a directory of ``.npy`` files.
+
+        The directory is replaced as a whole, so a crash never leaves a
+        half-written index behind.
+        """
+        if not self.trained:
+            raise RuntimeError("Cannot save an untrained IVF index")
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        with self._add_lock:
+            snapshots = [inverted.snapshot() for inverted in self._lists]
+            ntotal = self._ntotal
+        sizes = np.array([len(ids) for _, ids in snapshots], dtype=np.int64)
+        np.save(os.path.join(tmp_path, "centroids.npy"), self.centroids)
+        np.save(os.path.join(tmp_path, "offsets.npy"), np.concatenate([[0], np.cumsum(sizes)]))
+        np.save(os.path.join(tmp_path, "vectors.npy"), np.concatenate([vectors for vectors, _ in snapshots]))
+        np.save(os.path.join(tmp_path, "ids.npy"), np.concatenate([ids for _, ids in snapshots]))
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump({"dimension": self.dimension, "nlist": self.nlist, "dtype": self.dtype.name}, f)
+
+        old_path = path + ".old"
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        logger.info("Saved IVF index with %d vectors in %d cells to %s", ntotal, self.nlist, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """
+        Open an index written by ``save``.
+
+        Cell contents are memory-mapped; a cell is copied to memory only when
+        vectors are added to it.
+        """
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        index = cls(meta["dimension"], nlist=meta["nlist"], dtype=meta["dtype"])
+        index.centroids = np.load(os.path.join(path, "centroids.npy"))
+        offsets = np.load(os.path.join(path, "offsets.npy"))
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+        index._lists = [
+            _InvertedList(vectors[offsets[cell]:offsets[cell + 1]], ids[offsets[cell]:offsets[cell + 1]])
+            for cell in range(index.nlist)
+        ]
+        index._ntotal = int(offsets[-1])
+        return index
@@ -0,0 +1,126 @@
+"""
+Embedding backends.
+
+A backend turns a batch of texts into a ``(len(texts), dimension)`` float32
+matrix in one call. The micro-batcher only ever calls ``embed`` with whole
+batches, so backends should vectorise across the batch rather than loop
+over texts.
+"""
+import re
+import zlib
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+import numpy as np
+
+_TOKEN = re.compile(r"\w+")
+
+
+class EmbeddingBackend(ABC):
+    """Interface implemented by every embedding model."""
+
+    name: str
+    dimension: int
+
+    @abstractmethod
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """
+        Embed a batch of texts.
+
+        Returns:
+            float32 array of shape ``(len(texts), dimension)``
+        """
+
+
+@lru_cache(maxsize=1 << 16)
+def _hash_token(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8"))
+
+
+class HashingBackend(EmbeddingBackend):
+    """
+    Local, deterministic embeddings: feature hashing plus a random projection.
+
+    Lower-cased word unigrams and bigrams are hashed (signed) into
+    ``n_features`` buckets, term counts are damped with ``log1p`` and the
+    resulting sparse vectors are projected to ``dimension`` with a fixed
+    Gaussian matrix, then L2-normalised. Texts sharing vocabulary get high
+    cosine similarity; no network access or model download is needed.
+
+    Args:
+        dimension: Size of the output vectors
+        n_features: Number of hash buckets
+        seed: Seed of the projection matrix; the same seed always yields the
+            same vectors
+    """
+
+    def __init__(self, dimension: int = 384, n_features: int = 8192, seed: int = 0):
+        self.name = f"hashing-{dimension}"
+        self.dimension = dimension
+        self.n_features = n_features
+        rng = np.random.default_rng(seed)
+        self._projection = (rng.standard_normal((n_features, dimension)) / np.sqrt(dimension)).astype(np.float32)
+
+    def _features(self, texts: list[str]) -> np.ndarray:
+        rows, cols, signs = [], [], []
+        for row, text in enumerate(texts):
+            tokens = _TOKEN.findall(text.lower())
+            terms = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for term in terms:
+                h = _hash_token(term)
+                rows.append(row)
+                cols.append(h % self.n_features)
+                signs.append(1.0 if h & 0x80000000 else -1.0)
+
+        counts = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        np.add.at(counts, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)),
+                  np.asarray(signs, dtype=np.float32))
+        return np.sign(counts) * np.log1p(np.abs(counts))
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        vectors = self._features(texts) @ self._projection
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class OpenAIBackend(EmbeddingBackend):
+    """
+    Embeddings from the OpenAI API, one request per batch.
+
+    Args:
+        model: Embedding model name
+        dimension: Vector size produced by ``model``
+        api_key: API key; defaults to ``OPENAI_API_KEY``
+    """
+
+    def __init__(self, model: str = "text-embedding-3-small", dimension: int = 1536, api_key: str | None = None):
+        from openai import OpenAI
+
+        self.name = model
+        self.dimension = dimension
+        self._client = OpenAI(api_key=api_key)
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        response = self._client.embeddings.create(model=self.name, input=texts)
+        ordered = sorted(response.data, key=lambda item: item.index)
+        return np.asarray([item.embedding for item in ordered], dtype=np.float32)
+
+
+def create_backend(kind: str, dimension: int, model: str | None = None) -> EmbeddingBackend:
+    """
+    Build the backend selected by configuration.
+
+    Args:
+        kind: ``"hashing"`` (default, offline) or ``"openai"``
+        dimension: Output vector size
+        model: Model name for remote backends
+    """
+    if kind == "hashing":
+        return HashingBackend(dimension=dimension)
+    if kind == "openai":
+        return OpenAIBackend(model=model or "text-embedding-3-small", dimension=dimension)
+    raise ValueError(f"Unknown embedding backend: {kind}")
@@ -0,0 +1,169 @@
+"""
+Micro-batching of embedding requests.
+
+Concurrent ``/embed`` calls are collected for up to ``max_wait_ms`` or until
+``max_batch_size`` texts are waiting, then embedded with a single backend
+call. Batched matrix work is far cheaper per text than one call per chunk,
+and a remote backend sees one request instead of dozens.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+EMBED_BATCH_SIZE = Histogram(
+    "embeddings_batch_size",
+    "Texts embedded per backend call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+EMBED_BATCH_SECONDS = Histogram(
+    "embeddings_batch_seconds",
+    "Time spent in the embedding backend per batch",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EMBED_QUEUE_WAIT_SECONDS = Histogram(
+    "embeddings_queue_wait_seconds",
+    "Time a request waited before its batch was dispatched",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+EMBED_TEXTS = Counter("embeddings_texts_total", "Texts embedded")
+
+
+@dataclass
+class _Request:
+    texts: list[str]
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent embedding requests into batched backend calls.
+
+    Args:
+        embed_fn: Blocking function embedding a list of texts into a
+            ``(n, dimension)`` array; it runs in a worker thread
+        max_batch_size: Texts per backend call; larger requests are split
+        max_wait_ms: How long the first request of a batch waits for others
+        max_concurrency: Batches allowed to run at the same time
+    """
+
+    def __init__(self, embed_fn: Callable[[list[str]], np.ndarray], max_batch_size: int = 64,
+                 max_wait_ms: float = 5.0, max_concurrency: int = 1):
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be positive")
+        self.embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrency = max_concurrency
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._running: set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        """Start the dispatcher task on the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and self._loop is loop and not self._task.done():
+            return
+        self._loop = loop
+        self._running = set()
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._task = asyncio.create_task(self._dispatch(), name="embeddings-batcher")
+
+    async def stop(self) -> None:
+        """Stop dispatching; requests still waiting are cancelled."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        tasks = [self._task, *self._running]
+        await asyncio.gather(*tasks, return_exceptions=True)
+        while not self._queue.empty():
+            self._queue.get_nowait().future.cancel()
+        self._task = None
+        self._queue = None
+        self._running.clear()
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        """
+        Embed texts as part of the next batch.
+
+        Returns:
+            float32 array of shape ``(len(texts), dimension)`` in input order
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_Request(texts, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> list[_Request]:
+        """Wait for a first request, then gather more until the batch is full or the wait expires."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = loop.time() + self.max_wait
+        while size < self.max_batch_size:
+            if self._queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                request = self._queue.get_nowait()
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    async def _dispatch(self) -> None:
+        while True:
+            batch = await self._collect()
+            await self._slots.acquire()
+            task = asyncio.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: list[_Request]) -> None:
+        try:
+            # Requests whose caller went away are not embedded
+            batch = [request for request in batch if not request.future.done()]
+            texts = [text for request in batch for text in request.texts]
+            dispatched = time.perf_counter()
+            for request in batch:
+                EMBED_QUEUE_WAIT_SECONDS.observe(dispatched - request.enqueued_at)
+
+            try:
+                parts = []
+                for start in range(0, len(texts), self.max_batch_size):
+                    part = texts[start:start + self.max_batch_size]
+                    started = time.perf_counter()
+                    parts.append(await asyncio.to_thread(self.embed_fn, part))
+                    EMBED_BATCH_SECONDS.observe(time.perf_counter() - started)
+                    EMBED_BATCH_SIZE.observe(len(part))
+                vectors = np.vstack(parts) if parts else np.zeros((0, 0), dtype=np.float32)
+            except Exception as e:
+                logger.exception("Embedding batch of %d texts failed", len(texts))
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                return
+
+            EMBED_TEXTS.inc(len(texts))
+            offset = 0
+            for request in batch:
+                count = len(request.texts)
+                if not request.future.done():
+                    request.future.set_result(vectors[offset:offset + count])
+                offset += count
+        finally:
+            self._slots.release()
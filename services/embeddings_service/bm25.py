@@ -0,0 +1,367 @@
+"""
+BM25 keyword index over chunk text.
+
+Embedding search handles exact terms (gene names, equation labels,
+acronyms) poorly, so chunks are also indexed in an inverted index. The
+layout is log-structured:
+
+* Each ``add`` writes one immutable segment: a sorted term dictionary and,
+  per term, array-backed postings of chunk ids and term frequencies. Chunk
+  ids are delta-encoded, so postings are small on disk and in memory and are
+  only decoded for the terms a query touches.
+* Chunk ids are assigned in insertion order, so segments cover consecutive
+  id ranges. Size tiers are kept non-increasing from old to new segments (a
+  larger segment absorbs the smaller ones before it) and ``merge_factor``
+  neighbouring segments of one tier are merged into one, keeping the
+  segment count logarithmic in the corpus size for any mix of sizes.
+* Top-k search is term-at-a-time with MaxScore pruning: terms are processed
+  by decreasing score upper bound, and once the remaining terms cannot lift
+  an unseen chunk into the top k, they only update existing candidates.
+"""
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+from prometheus_client import Gauge
+
+from vector_store import SearchHit
+
+logger = logging.getLogger(__name__)
+
+BM25_SEGMENTS = Gauge("embeddings_bm25_segments", "Segments in the BM25 index")
+BM25_CHUNKS = Gauge("embeddings_bm25_chunks", "Chunks in the BM25 index")
+
+MANIFEST = "manifest.json"
+
+_TOKEN = re.compile(r"\w+(?:[-.]\w+)*")
+_PART = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lower-case terms of a text.
+
+    Hyphenated and dotted compounds (``IL-6``, ``eq.3``) are kept whole and
+    also split into their parts, so both spellings match.
+
+    Example:
+        >>> tokenize("IL-6 binds BRCA1")
+        ['il-6', 'il', '6', 'binds', 'brca1']
+    """
+    terms = []
+    for match in _TOKEN.finditer(text.lower()):
+        term = match.group()
+        terms.append(term)
+        if not term.isalnum() and "_" not in term:
+            terms.extend(_PART.findall(term))
+    return terms
+
+
+@dataclass
+class _Segment:
+    """Immutable postings for the chunk ids ``doc_start`` .. ``doc_start + doc_count - 1``."""
+    name: str
+    doc_start: int
+    doc_count: int
+    terms: np.ndarray        # sorted unicode array
+    offsets: np.ndarray      # postings of terms[i] are [offsets[i], offsets[i + 1])
+    deltas: np.ndarray       # uint32 chunk id gaps; the first of each term is relative to doc_start
+    tfs: np.ndarray          # uint16 term frequencies
+    max_tf: np.ndarray       # per-term maximum tf, for score upper bounds
+    min_length: np.ndarray   # per-term shortest chunk length, for score upper bounds
+
+    def postings(self, term: str) -> Optional[tuple[np.ndarray, np.ndarray, int, int]]:
+        """Decoded ``(chunk ids, tfs, max_tf, min_length)`` of a term, or None."""
+        i = int(np.searchsorted(self.terms, term))
+        if i == len(self.terms) or self.terms[i] != term:
+            return None
+        start, end = self.offsets[i], self.offsets[i + 1]
+        docs = np.cumsum(self.deltas[start:end], dtype=np.int64) + self.doc_start
+        return docs, self.tfs[start:end], int(self.max_tf[i]), int(self.min_length[i])
+
+
+def _build_segment(name: str, doc_start: int, token_lists: list[list[str]],
+                   lengths: np.ndarray) -> _Segment:
+    terms, docs, tfs = [], [], []
+    for local_id, tokens in enumerate(token_lists):
+        counts = Counter(tokens)
+        terms.extend(counts)
+        tfs.extend(counts.values())
+        docs.extend([local_id] * len(counts))
+    vocabulary, term_ids = np.unique(np.array(terms, dtype=str), return_inverse=True)
+    return _pack_segment(
+        name, doc_start, len(token_lists), vocabulary, term_ids,
+        np.array(docs, dtype=np.int64), np.array(tfs, dtype=np.int64), lengths
+    )
+
+
+def _pack_segment(name: str, doc_start: int, doc_count: int, vocabulary: np.ndarray, term_ids: np.ndarray,
+                  docs: np.ndarray, tfs: np.ndarray, lengths: np.ndarray) -> _Segment:
+    """
+    Pack flat postings into a segment.
+
+    ``vocabulary`` is sorted and ``term_ids`` index into it; ``docs`` are
+    chunk ids relative to ``doc_start`` and ``lengths`` the lengths of the
+    segment's chunks.
+    """
+    order = np.lexsort((docs, term_ids))
+    term_ids, docs = term_ids[order], docs[order]
+    tfs = np.minimum(tfs[order], np.iinfo(np.uint16).max).astype(np.uint16)
+
+    counts = np.bincount(term_ids, minlength=len(vocabulary))
+    present = counts > 0
+    vocabulary, counts = vocabulary[present], counts[present]
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(counts)
+    starts = offsets[:-1]
+
+    # Gaps between consecutive ids of a term; each term's first id is stored as is
+    deltas = np.diff(docs, prepend=0)
+    deltas[starts] = docs[starts]
+    return _Segment(
+        name, doc_start, doc_count, vocabulary, offsets, deltas.astype(np.uint32), tfs,
+        np.maximum.reduceat(tfs, starts) if len(starts) else np.empty(0, dtype=np.uint16),
+        np.minimum.reduceat(lengths[docs], starts) if len(starts) else np.empty(0, dtype=np.int32),
+    )
+
+
+def _decode_all(segment: _Segment) -> np.ndarray:
+    """Chunk ids (relative to ``doc_start``) of every posting of a segment, in storage order."""
+    counts = np.diff(segment.offsets)
+    starts = segment.offsets[:-1][counts > 0]
+    totals = np.cumsum(segment.deltas, dtype=np.int64)
+    # Restart the running sum at each term's first posting
+    before = totals[starts] - segment.deltas[starts]
+    return totals - np.repeat(before, counts[counts > 0])
+
+
+class BM25Index:
+    """
+    Log-structured BM25 index of chunks, persisted in a directory.
+
+    Args:
+        path: Directory holding the segment files and manifest
+        k1: BM25 term frequency saturation
+        b: BM25 length normalisation
+        merge_factor: Segments of one size tier merged together
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75, merge_factor: int = 10):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.merge_factor = merge_factor
+        self._segments: list[_Segment] = []
+        # Per chunk id: owning document, chunk ordinal and length in terms
+        self._document_ids = np.empty(0, dtype=np.int64)
+        self._ordinals = np.empty(0, dtype=np.int64)
+        self._lengths = np.empty(0, dtype=np.int32)
+        self._lock = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+        manifest_path = os.path.join(path, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                names = json.load(f)["segments"]
+            if names:
+                # Concatenated once: per segment would be quadratic in the segment count
+                document_ids, ordinals, lengths = zip(*(self._load_segment(name) for name in names))
+                self._document_ids = np.concatenate(document_ids)
+                self._ordinals = np.concatenate(ordinals)
+                self._lengths = np.concatenate(lengths)
+        self._update_metrics()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+    def _update_metrics(self) -> None:
+        BM25_SEGMENTS.set(len(self._segments))
+        BM25_CHUNKS.set(len(self))
+
+    def _load_segment(self, name: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Load a segment; return its per-chunk document ids, ordinals and lengths."""
+        with np.load(os.path.join(self.path, f"{name}.npz")) as data:
+            self._segments.append(_Segment(
+                name, int(data["doc_start"]), int(data["doc_count"]), data["terms"], data["offsets"],
+                data["deltas"], data["tfs"], data["max_tf"], data["min_length"]
+            ))
+            return data["document_ids"], data["ordinals"], data["lengths"]
+
+    def _write_segment(self, segment: _Segment) -> None:
+        doc_range = slice(segment.doc_start, segment.doc_start + segment.doc_count)
+        tmp_path = os.path.join(self.path, f"{segment.name}.tmp.npz")
+        np.savez_compressed(
+            tmp_path,
+            doc_start=segment.doc_start, doc_count=segment.doc_count, terms=segment.terms,
+            offsets=segment.offsets, deltas=segment.deltas, tfs=segment.tfs,
+            max_tf=segment.max_tf, min_length=segment.min_length,
+            document_ids=self._document_ids[doc_range], ordinals=self._ordinals[doc_range],
+            lengths=self._lengths[doc_range],
+        )
+        os.replace(tmp_path, os.path.join(self.path, f"{segment.name}.npz"))
+
+    def _write_manifest(self) -> None:
+        manifest_path = os.path.join(self.path, MANIFEST)
+        with open(manifest_path + ".tmp", "w") as f:
+            json.dump({"segments": [segment.name for segment in self._segments]}, f)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def add(self, document_id: int, ordinals: Iterable[int], texts: list[str]) -> None:
+        """Index the chunks of one document as a new segment."""
+        if not texts:
+            return
+        token_lists = [tokenize(text) for text in texts]
+        lengths = np.array([len(tokens) for tokens in token_lists], dtype=np.int32)
+        ordinals = np.fromiter(ordinals, dtype=np.int64, count=len(texts))
+
+        with self._lock:
+            doc_start = len(self)
+            name = f"seg-{doc_start:012d}-{len(texts)}"
+            segment = _build_segment(name, doc_start, token_lists, lengths)
+            self._document_ids = np.concatenate([self._document_ids, np.full(len(texts), document_id)])
+            self._ordinals = np.concatenate([self._ordinals, ordinals])
+            self._lengths = np.concatenate([self._lengths, lengths])
+            self._write_segment(segment)
+            self._segments = self._segments + [segment]
+            self._maybe_merge()
+            self._write_manifest()
+            self._update_metrics()
+
+    def _tier(self, segment: _Segment) -> int:
+        return int(math.log(max(segment.doc_count, 1), self.merge_factor))
+
+    def _maybe_merge(self) -> None:
+        """
+        Keep segment tiers non-increasing from oldest to newest, and merge
+        trailing runs of ``merge_factor`` segments of the same tier.
+
+        A new segment larger than the ones before it absorbs them, so at most
+        ``merge_factor - 1`` segments of each tier remain whatever the mix of
+        document sizes.
+        """
+        while len(self._segments) > 1:
+            last_tier = self._tier(self._segments[-1])
+            run = 1
+            while run < len(self._segments) and self._tier(self._segments[-run - 1]) < last_tier:
+                run += 1
+            if run == 1:
+                while run < len(self._segments) and self._tier(self._segments[-run - 1]) == last_tier:
+                    run += 1
+                if run < self.merge_factor:
+                    return
+                run = self.merge_factor
+            obsolete = self._segments[-run:]
+            merged = self._merge(obsolete)
+            self._write_segment(merged)
+            self._segments = self._segments[:-run] + [merged]
+            self._write_manifest()
+            for segment in obsolete:
+                os.remove(os.path.join(self.path, f"{segment.name}.npz"))
+            logger.info("Merged %d BM25 segments into %s", len(obsolete), merged.name)
+
+    def _merge(self, segments: list[_Segment]) -> _Segment:
+        """Combine consecutive segments; their id ranges are disjoint and ascending."""
+        doc_start = segments[0].doc_start
+        doc_count = sum(segment.doc_count for segment in segments)
+        vocabulary = np.unique(np.concatenate([segment.terms for segment in segments]))
+        term_ids, docs, tfs = [], [], []
+        for segment in segments:
+            local_terms = np.searchsorted(vocabulary, segment.terms)
+            term_ids.append(np.repeat(local_terms, np.diff(segment.offsets)))
+            docs.append(_decode_all(segment) + segment.doc_start - doc_start)
+            tfs.append(segment.tfs.astype(np.int64))
+        return _pack_segment(
+            f"seg-{doc_start:012d}-{doc_count}", doc_start, doc_count, vocabulary,
+            np.concatenate(term_ids), np.concatenate(docs), np.concatenate(tfs),
+            self._lengths[doc_start:doc_start + doc_count],
+        )
+
+    def search(self, query: str, k: int = 10, document_ids: Optional[Iterable[int]] = None) -> list[SearchHit]:
+        """
+        Return the ``k`` chunks scoring highest for a keyword query.
+
+        Args:
+            query: Free text; tokenised like the indexed chunks
+            k: Number of results
+            document_ids: Only return chunks of these documents
+
+        Returns:
+            Hits with BM25 scores, best first
+        """
+        segments = self._segments
+        total = sum(segment.doc_count for segment in segments)
+        if total == 0:
+            return []
+        lengths = self._lengths[:total]
+        average_length = max(float(lengths.mean()), 1.0)
+        allowed = None if document_ids is None else np.fromiter(document_ids, dtype=np.int64)
+
+        # Gather postings and a score upper bound for each distinct query term
+        terms = []
+        for term in dict.fromkeys(tokenize(query)):
+            parts = [p for p in (segment.postings(term) for segment in segments) if p is not None]
+            if not parts:
+                continue
+            docs = np.concatenate([p[0] for p in parts])
+            tfs = np.concatenate([p[1] for p in parts]).astype(np.float32)
+            idf = math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            max_tf = max(p[2] for p in parts)
+            min_length = min(p[3] for p in parts)
+            upper_bound = idf * max_tf * (self.k1 + 1) / (
+                max_tf + self.k1 * (1 - self.b + self.b * min_length / average_length)
+            )
+            terms.append((upper_bound, idf, docs, tfs))
+        if not terms:
+            return []
+
+        terms.sort(key=lambda term: term[0], reverse=True)
+        # remaining[i]: best score still obtainable from terms i, i + 1, ...
+        remaining = np.cumsum([term[0] for term in terms][::-1])[::-1].tolist() + [0.0]
+
+        candidates = np.empty(0, dtype=np.int64)
+        scores = np.empty(0, dtype=np.float32)
+        for i, (_, idf, docs, tfs) in enumerate(terms):
+            if allowed is not None:
+                mask = np.isin(self._document_ids[docs], allowed)
+                docs, tfs = docs[mask], tfs[mask]
+            norm = self.k1 * (1 - self.b + self.b * lengths[docs] / average_length)
+            contributions = (idf * tfs * (self.k1 + 1) / (tfs + norm)).astype(np.float32)
+
+            threshold = np.partition(scores, len(scores) - k)[len(scores) - k] if len(scores) >= k else 0.0
+            if len(scores) >= k and remaining[i] <= threshold:
+                # No unseen chunk can reach the top k: only update existing candidates
+                positions = np.searchsorted(candidates, docs)
+                positions[positions == len(candidates)] = 0
+                matched = candidates[positions] == docs
+                scores[positions[matched]] += contributions[matched]
+            elif len(candidates) == 0:
+                candidates, scores = docs, contributions
+            else:
+                merged, inverse = np.unique(np.concatenate([candidates, docs]), return_inverse=True)
+                scores = np.bincount(
+                    inverse, weights=np.concatenate([scores, contributions]), minlength=len(merged)
+                ).astype(np.float32)
+                candidates = merged
+
+            # Drop candidates that cannot reach the top k any more
+            if len(scores) > k:
+                threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+                keep = scores + remaining[i + 1] >= threshold
+                candidates, scores = candidates[keep], scores[keep]
+
+        top = np.argsort(-scores, kind="stable")[:k]
+        return [
+            SearchHit(int(self._document_ids[candidates[j]]), int(self._ordinals[candidates[j]]), float(scores[j]))
+            for j in top
+        ]
@@ -0,0 +1,177 @@
+"""
+Two-tier cache of computed embeddings.
+
+Overlapping chunks, re-uploads and boilerplate shared between documents
+produce the same text over and over. Vectors are cached under a hash of the
+normalised text and the model id: an in-memory LRU bounded by bytes sits in
+front of a SQLite file, so embedding cost scales with unique text and the
+cache survives restarts.
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+EMBED_CACHE_LOOKUPS = Counter(
+    "embeddings_cache_lookups_total",
+    "Embedding cache lookups by outcome",
+    ["result"],
+)
+EMBED_CACHE_HIT_RATIO = Gauge(
+    "embeddings_cache_hit_ratio",
+    "Fraction of embedding lookups served from the cache since start",
+)
+EMBED_CACHE_MEMORY_BYTES = Gauge(
+    "embeddings_cache_memory_bytes",
+    "Bytes of vectors resident in the in-memory embedding cache",
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+# SQLite limits the number of bound parameters per statement
+_SQLITE_BATCH = 500
+
+
+def normalize_text(text: str) -> str:
+    """Normalise Unicode (NFKC) and collapse whitespace so trivially different copies share a key."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def cache_key(text: str, model: str) -> str:
+    """
+    Return the cache key of a text embedded with ``model``.
+
+    Example:
+        >>> cache_key("Hello   world", "m") == cache_key("Hello world\\n", "m")
+        True
+    """
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    In-memory LRU of vectors backed by an optional SQLite store.
+
+    Args:
+        path: SQLite file for the persistent tier; empty or None keeps the
+            cache in memory only
+        max_bytes: Byte budget of the in-memory tier; 0 disables it
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._lookups = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._db.commit()
+
+    @property
+    def size_bytes(self) -> int:
+        """Bytes of vectors held in memory."""
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        if vector.nbytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        self._entries[key] = vector
+        self._bytes += vector.nbytes
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+        EMBED_CACHE_MEMORY_BYTES.set(self._bytes)
+
+    def _load(self, keys: list[str]) -> dict[str, np.ndarray]:
+        """Read vectors from the SQLite tier (runs in a worker thread)."""
+        found = {}
+        with self._db_lock:
+            for start in range(0, len(keys), _SQLITE_BATCH):
+                batch = keys[start:start + _SQLITE_BATCH]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({', '.join('?' * len(batch))})",
+                    batch
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype="<f4")
+        return found
+
+    def _store(self, items: dict[str, np.ndarray]) -> None:
+        """Write vectors to the SQLite tier (runs in a worker thread)."""
+        with self._db_lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, vector.astype("<f4").tobytes()) for key, vector in items.items()]
+            )
+            self._db.commit()
+
+    async def get_many(self, keys: list[str]) -> dict[str, np.ndarray]:
+        """
+        Look up a batch of keys.
+
+        Returns:
+            Vectors of the keys found in either tier; missing keys are absent
+        """
+        found = {}
+        for key in keys:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                found[key] = vector
+        memory_hits = sum(key in found for key in keys)
+
+        missing = list(dict.fromkeys(key for key in keys if key not in found))
+        if missing and self._db is not None:
+            loaded = await asyncio.to_thread(self._load, missing)
+            for key, vector in loaded.items():
+                self._remember(key, vector)
+            found.update(loaded)
+        disk_hits = sum(key in found for key in keys) - memory_hits
+        misses = len(keys) - memory_hits - disk_hits
+
+        EMBED_CACHE_LOOKUPS.labels(result="memory").inc(memory_hits)
+        EMBED_CACHE_LOOKUPS.labels(result="disk").inc(disk_hits)
+        EMBED_CACHE_LOOKUPS.labels(result="miss").inc(misses)
+        self._hits += memory_hits + disk_hits
+        self._lookups += len(keys)
+        if self._lookups:
+            EMBED_CACHE_HIT_RATIO.set(self._hits / self._lookups)
+        return found
+
+    async def put_many(self, items: dict[str, np.ndarray]) -> None:
+        """Add freshly computed vectors to both tiers."""
+        # Copy so cached rows do not keep whole batch arrays alive
+        items = {key: np.array(vector, dtype=np.float32) for key, vector in items.items()}
+        for key, vector in items.items():
+            self._remember(key, vector)
+        if items and self._db is not None:
+            await asyncio.to_thread(self._store, items)
+
+    def close(self) -> None:
+        """Close the SQLite store."""
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
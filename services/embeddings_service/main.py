@@ -1,13 +1,366 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Response
+from pydantic import BaseModel, Field
+from contextlib import asynccontextmanager
+from typing import Literal, Optional
+import asyncio
+import base64
+import logging
+import math
 import os
+import numpy as np
+from prometheus_fastapi_instrumentator import Instrumentator
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from starlette.datastructures import State
+
+from ann_index import IVFIndex
+from backends import create_backend
+from batcher import MicroBatcher
+from bm25 import BM25Index
+from embedding_cache import EmbeddingCache, cache_key
+from vector_store import SearchHit, VectorStore
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Embedding model
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "hashing")  # "hashing" (offline) or "openai"
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "384"))
+
+# Micro-batching
+EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "64"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", "1"))
+EMBED_MAX_TEXTS_PER_REQUEST = int(os.getenv("EMBED_MAX_TEXTS_PER_REQUEST", "2048"))
+
+# Embedding cache (in-memory LRU in front of a SQLite file; empty path = memory only)
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "./embedding_cache.db")
+EMBED_CACHE_MAX_BYTES = int(os.getenv("EMBED_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Vector store (memory-mapped segment files)
+VECTOR_STORE_PATH = os.getenv("VECTOR_STORE_PATH", "./vectors")
+VECTOR_STORE_DTYPE = os.getenv("VECTOR_STORE_DTYPE", "float32")  # "float32" or "float16"
+VECTOR_SEGMENT_ROWS = int(os.getenv("VECTOR_SEGMENT_ROWS", str(1 << 18)))
+SEARCH_MAX_K = int(os.getenv("SEARCH_MAX_K", "100"))
+
+# Approximate (IVF) index, built once the store holds ANN_MIN_VECTORS vectors
+ANN_INDEX_PATH = os.getenv("ANN_INDEX_PATH", os.path.join(VECTOR_STORE_PATH, "ivf"))
+ANN_MIN_VECTORS = int(os.getenv("ANN_MIN_VECTORS", "50000"))
+ANN_NLIST = int(os.getenv("ANN_NLIST", "0"))  # 0 = 4 * sqrt(vectors at build time)
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "16"))
+ANN_TRAIN_SAMPLES_PER_LIST = int(os.getenv("ANN_TRAIN_SAMPLES_PER_LIST", "64"))
+
+# Keyword (BM25) index and hybrid rank fusion
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", os.path.join(VECTOR_STORE_PATH, "bm25"))
+BM25_MERGE_FACTOR = int(os.getenv("BM25_MERGE_FACTOR", "10"))
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))  # results taken from each ranking
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+
+def load_ann_index(vector_store: VectorStore) -> Optional[IVFIndex]:
+    """Open the saved IVF index if it still matches the vector store."""
+    if not os.path.exists(ANN_INDEX_PATH):
+        return None
+    index = IVFIndex.load(ANN_INDEX_PATH)
+    if index.dimension != vector_store.dimension or index.ntotal > len(vector_store):
+        logger.warning("Ignoring IVF index at %s: it does not match the vector store", ANN_INDEX_PATH)
+        return None
+    return index
+
+
+def sync_ann_index(state: State) -> None:
+    """
+    Bring the IVF index up to date with the vector store (runs in a worker thread).
+
+    The index is trained the first time the store reaches ``ANN_MIN_VECTORS``
+    and afterwards receives the rows appended since it was last synced.
+    """
+    vector_store = state.vector_store
+    if state.ann_index is None:
+        total = len(vector_store)
+        if total < ANN_MIN_VECTORS:
+            return
+        nlist = ANN_NLIST or int(4 * math.sqrt(total))
+        index = IVFIndex(vector_store.dimension, nlist=nlist, dtype=VECTOR_STORE_DTYPE)
+        index.train(vector_store.sample(nlist * ANN_TRAIN_SAMPLES_PER_LIST))
+        for vectors, ids in vector_store.iter_rows():
+            index.add(vectors, ids)
+        index.save(ANN_INDEX_PATH)
+        state.ann_index = index
+        logger.info("Built IVF index with %d cells over %d vectors", index.nlist, index.ntotal)
+
+    ann_index = state.ann_index
+    while ann_index.ntotal < len(vector_store):
+        for vectors, ids in vector_store.iter_rows(ann_index.ntotal):
+            ann_index.add(vectors, ids)
+
+
+def schedule_ann_sync(state: State) -> None:
+    """Start syncing the IVF index in the background unless a sync is already running."""
+    if state.ann_sync_task is None or state.ann_sync_task.done():
+        state.ann_sync_task = asyncio.create_task(asyncio.to_thread(sync_ann_index, state))
+
+
+def search_vectors(state: State, query_vector: np.ndarray, k: int, document_ids: Optional[list[int]] = None,
+                   nprobe: Optional[int] = None, exact: bool = False) -> list[SearchHit]:
+    """
+    Find the ``k`` chunks closest to a query vector.
+
+    Uses the IVF index when one exists; rows appended since its last sync
+    are searched exactly and merged in, so new chunks are found immediately.
+    """
+    index = state.ann_index
+    vector_store = state.vector_store
+    if exact or index is None:
+        return vector_store.search(query_vector, k, document_ids)[0]
+
+    covered = index.ntotal
+    hits = index.search(query_vector, k, nprobe or ANN_NPROBE, document_ids)[0]
+    hits += vector_store.search(query_vector, k, document_ids, start=covered)[0]
+    # A row added during the search can show up in both result sets
+    unique = {(hit.document_id, hit.ordinal): hit for hit in hits}
+    return sorted(unique.values(), key=lambda hit: hit.score, reverse=True)[:k]
+
+
+def reciprocal_rank_fusion(rankings: list[list[SearchHit]], k: int, rrf_k: int = 60) -> list[SearchHit]:
+    """
+    Fuse ranked result lists by summing ``1 / (rrf_k + rank)`` per chunk.
+
+    Only ranks are used, so BM25 and cosine scores need no calibration.
+    """
+    fused: dict[tuple[int, int], float] = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            key = (hit.document_id, hit.ordinal)
+            fused[key] = fused.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    best = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+    return [SearchHit(document_id, ordinal, score) for (document_id, ordinal), score in best]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open the embedding backend, cache and indexes, and run the micro-batcher
+    and IVF index sync; persist and close the stores on shutdown.
+    """
+    state = app.state
+    state.backend = create_backend(EMBEDDING_BACKEND, EMBEDDING_DIMENSION, model=EMBEDDING_MODEL)
+    state.batcher = MicroBatcher(
+        state.backend.embed,
+        max_batch_size=EMBED_MAX_BATCH_SIZE,
+        max_wait_ms=EMBED_MAX_WAIT_MS,
+        max_concurrency=EMBED_MAX_CONCURRENCY,
+    )
+    state.embedding_cache = EmbeddingCache(EMBED_CACHE_PATH, max_bytes=EMBED_CACHE_MAX_BYTES)
+    state.vector_store = VectorStore(
+        VECTOR_STORE_PATH,
+        dimension=state.backend.dimension,
+        dtype=VECTOR_STORE_DTYPE,
+        segment_rows=VECTOR_SEGMENT_ROWS,
+    )
+    state.bm25_index = BM25Index(BM25_INDEX_PATH, merge_factor=BM25_MERGE_FACTOR)
+    state.ann_index = load_ann_index(state.vector_store)
+    state.ann_sync_task = None
+
+    state.batcher.start()
+    schedule_ann_sync(state)
+    yield
+    await state.batcher.stop()
+    if state.ann_sync_task is not None:
+        await state.ann_sync_task
+    if state.ann_index is not None:
+        await asyncio.to_thread(state.ann_index.save, ANN_INDEX_PATH)
+    state.embedding_cache.close()
+
+
+app = FastAPI(title="Embeddings Service", version="1.0.0", lifespan=lifespan)
+
+instrumentator = Instrumentator(
+    should_group_status_codes=False,
+    should_ignore_untemplated=True,
+    excluded_handlers=["/metrics"],
+)
+instrumentator.instrument(app)
+
+
+class EmbedRequest(BaseModel):
+    texts: list[str] = Field(..., min_length=1)
+    encoding_format: Literal["float", "base64"] = "float"
+
+
+class EmbedResponse(BaseModel):
+    model: str
+    dimension: int
+    # Lists of floats, or base64 of little-endian float32 vectors
+    embeddings: list[list[float]] | list[str]
+
+
+class IndexChunk(BaseModel):
+    ordinal: int
+    text: str
+
+
+class IndexRequest(BaseModel):
+    document_id: int
+    chunks: list[IndexChunk] = Field(..., min_length=1)
+
+
+class SearchRequest(BaseModel):
+    query: str = Field(..., min_length=1)
+    k: int = Field(10, ge=1)
+    document_ids: Optional[list[int]] = None
+    mode: Literal["vector", "keyword", "hybrid"] = "vector"
+    nprobe: Optional[int] = Field(None, ge=1)  # IVF cells searched; higher is slower but more exact
+    exact: bool = False
+
+
+class SearchResult(BaseModel):
+    document_id: int
+    ordinal: int
+    score: float
+
+
+class SearchResponse(BaseModel):
+    query: str
+    mode: str
+    results: list[SearchResult]
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint."""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
-app = FastAPI(title="Embeddings Service", version="1.0.0")
 
 @app.get("/health")
 async def health():
     """Health check"""
     return {"status": "ok", "service": "embeddings-service"}
 
+
+async def embed_texts(state: State, texts: list[str]) -> np.ndarray:
+    """
+    Embed texts through the embedding cache and micro-batcher.
+
+    Returns:
+        float32 array of shape ``(len(texts), dimension)``
+
+    Raises:
+        HTTPException: If the embedding backend fails
+    """
+    keys = [cache_key(text, state.backend.name) for text in texts]
+    found = await state.embedding_cache.get_many(keys)
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in found:
+            missing.setdefault(key, text)
+
+    if missing:
+        try:
+            computed = await state.batcher.embed(list(missing.values()))
+        except Exception as e:
+            logger.error("Embedding failed: %s", e)
+            raise HTTPException(status_code=502, detail="Embedding backend failed")
+        computed = dict(zip(missing, computed))
+        await state.embedding_cache.put_many(computed)
+        found.update(computed)
+
+    return np.vstack([found[key] for key in keys])
+
+
+@app.post("/embed", response_model=EmbedResponse)
+async def embed(body: EmbedRequest, request: Request):
+    """
+    Embed a list of texts.
+
+    Only texts missing from the embedding cache are sent to the model, each
+    distinct text once; concurrent requests are micro-batched into shared
+    backend calls. With ``encoding_format="base64"`` each vector is returned
+    as base64 of its little-endian float32 bytes, which is much smaller than
+    JSON floats.
+    """
+    if len(body.texts) > EMBED_MAX_TEXTS_PER_REQUEST:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {EMBED_MAX_TEXTS_PER_REQUEST} texts per request"
+        )
+
+    state = request.app.state
+    vectors = await embed_texts(state, body.texts)
+
+    if body.encoding_format == "base64":
+        embeddings = [base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii") for vector in vectors]
+    else:
+        embeddings = vectors.tolist()
+
+    return {"model": state.backend.name, "dimension": state.backend.dimension, "embeddings": embeddings}
+
+
+@app.post("/index")
+async def index_chunks(body: IndexRequest, request: Request):
+    """Embed a document's chunks into the vector store and add them to the keyword index."""
+    state = request.app.state
+    texts = [chunk.text for chunk in body.chunks]
+    ordinals = [chunk.ordinal for chunk in body.chunks]
+    vectors = await embed_texts(state, texts)
+    await asyncio.to_thread(state.vector_store.add, body.document_id, ordinals, vectors)
+    await asyncio.to_thread(state.bm25_index.add, body.document_id, ordinals, texts)
+    schedule_ann_sync(state)
+    logger.info("Indexed %d chunks of document %d", len(body.chunks), body.document_id)
+    return {"document_id": body.document_id, "indexed": len(body.chunks)}
+
+
+@app.get("/corpus_version")
+async def corpus_version(request: Request):
+    """
+    Version of the searchable corpus, for callers that cache search results.
+
+    It is the number of chunks in the keyword index, which ``/index``
+    updates last: the version changes once a document's chunks are in both
+    indexes, and persists across restarts.
+    """
+    return {"version": len(request.app.state.bm25_index)}
+
+
+@app.post("/search", response_model=SearchResponse)
+async def search(body: SearchRequest, request: Request):
+    """
+    Search indexed chunks.
+
+    ``mode="vector"`` ranks by cosine similarity of embeddings,
+    ``"keyword"`` by BM25 over the chunk text (best for exact terms such as
+    gene names or acronyms) and ``"hybrid"`` fuses both rankings with
+    reciprocal rank fusion. ``document_ids`` restricts the search to the
+    given documents. Large corpora are searched with the IVF index:
+    ``nprobe`` trades latency for recall and ``exact`` forces a full scan.
+    """
+    state = request.app.state
+    k = min(body.k, SEARCH_MAX_K)
+    candidates = max(k, HYBRID_CANDIDATES) if body.mode == "hybrid" else k
+
+    vector_hits = keyword_hits = None
+    if body.mode != "keyword":
+        query_vector = await embed_texts(state, [body.query])
+        vector_hits = await asyncio.to_thread(
+            search_vectors, state, query_vector, candidates, body.document_ids, body.nprobe, body.exact
+        )
+    if body.mode != "vector":
+        keyword_hits = await asyncio.to_thread(state.bm25_index.search, body.query, candidates, body.document_ids)
+
+    if body.mode == "hybrid":
+        hits = reciprocal_rank_fusion([vector_hits, keyword_hits], k, rrf_k=HYBRID_RRF_K)
+    else:
+        hits = vector_hits if body.mode == "vector" else keyword_hits
+
+    return {
+        "query": body.query,
+        "mode": body.mode,
+        "results": [
+            {"document_id": hit.document_id, "ordinal": hit.ordinal, "score": hit.score}
+            for hit in hits
+        ]
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8003)
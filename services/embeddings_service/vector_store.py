@@ -0,0 +1,234 @@
+"""
+Memory-mapped vector store for chunk embeddings.
+
+Vectors are L2-normalised and appended to fixed-capacity segment files of
+raw float32 (or float16) rows, with a sidecar of ``(document_id, ordinal)``
+pairs per row. A small JSON manifest records how many rows of each segment
+are committed, so a partially written append is never visible. Opening the
+store only maps the segment files: startup is instant, vectors stay in the
+page cache instead of the Python heap, and search streams over them in
+blocks with BLAS matmuls and ``argpartition``.
+"""
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+from prometheus_client import Gauge
+
+logger = logging.getLogger(__name__)
+
+VECTOR_STORE_ROWS = Gauge("embeddings_vector_store_rows", "Vectors stored in the vector store")
+
+MANIFEST = "manifest.json"
+DTYPES = ("float32", "float16")
+
+
+@dataclass
+class SearchHit:
+    """A single search result."""
+    document_id: int
+    ordinal: int
+    score: float
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so dot products are cosine similarities."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class VectorStore:
+    """
+    Append-only store of embeddings in memory-mapped segment files.
+
+    Args:
+        path: Directory holding the segments and manifest
+        dimension: Vector size; must match an existing store
+        dtype: ``"float32"`` or ``"float16"`` (half the disk and page cache)
+        segment_rows: Rows per segment file before a new one is started
+        block_rows: Rows scored per matmul during search, bounding the
+            temporary memory a search needs
+    """
+
+    def __init__(self, path: str, dimension: int, dtype: str = "float32",
+                 segment_rows: int = 1 << 18, block_rows: int = 1 << 15):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown vector dtype: {dtype}")
+        self.path = path
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        self.segment_rows = segment_rows
+        self.block_rows = block_rows
+        self._segments: list[dict] = []  # {"name", "count"} in append order
+        self._maps: dict[str, tuple[int, np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+        manifest_path = os.path.join(path, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest["dimension"] != dimension or manifest["dtype"] != dtype:
+                raise ValueError(
+                    f"Vector store at {path} holds {manifest['dtype']} vectors of dimension "
+                    f"{manifest['dimension']}, not {dtype} of dimension {dimension}"
+                )
+            self._segments = manifest["segments"]
+        VECTOR_STORE_ROWS.set(len(self))
+        logger.info("Opened vector store at %s with %d vectors", path, len(self))
+
+    def __len__(self) -> int:
+        return sum(segment["count"] for segment in self._segments)
+
+    def _files(self, name: str) -> tuple[str, str]:
+        return os.path.join(self.path, f"{name}.vec"), os.path.join(self.path, f"{name}.ids")
+
+    def _write_manifest(self) -> None:
+        manifest_path = os.path.join(self.path, MANIFEST)
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"dimension": self.dimension, "dtype": self.dtype.name, "segments": self._segments}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, manifest_path)
+
+    def add(self, document_id: int, ordinals: Iterable[int], vectors: np.ndarray) -> None:
+        """
+        Append the vectors of one document's chunks.
+
+        Args:
+            document_id: Document the chunks belong to
+            ordinals: Chunk ordinal of each row of ``vectors``
+            vectors: ``(n, dimension)`` array; normalised before storing
+        """
+        vectors = normalize_rows(vectors).astype(self.dtype)
+        ids = np.array([(document_id, ordinal) for ordinal in ordinals], dtype=np.int64).reshape(-1, 2)
+        if vectors.shape != (len(ids), self.dimension):
+            raise ValueError(f"Expected {len(ids)} vectors of dimension {self.dimension}, got {vectors.shape}")
+
+        with self._lock:
+            offset = 0
+            while offset < len(ids):
+                if not self._segments or self._segments[-1]["count"] >= self.segment_rows:
+                    self._segments.append({"name": f"seg-{len(self._segments):06d}", "count": 0})
+                segment = self._segments[-1]
+                take = min(self.segment_rows - segment["count"], len(ids) - offset)
+                vec_path, ids_path = self._files(segment["name"])
+                # Truncate anything beyond the committed rows left by an interrupted append
+                for file_path, data in ((vec_path, vectors), (ids_path, ids)):
+                    with open(file_path, "ab") as f:
+                        f.truncate(segment["count"] * data.itemsize * data.shape[1])
+                        f.write(data[offset:offset + take].tobytes())
+                        f.flush()
+                        os.fsync(f.fileno())
+                segment["count"] += take
+                offset += take
+            self._write_manifest()
+        VECTOR_STORE_ROWS.set(len(self))
+
+    def _snapshot(self) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Map the committed rows of every segment, reusing maps that are still current."""
+        with self._lock:
+            segments = [(segment["name"], segment["count"]) for segment in self._segments]
+        mapped = []
+        for name, count in segments:
+            if count == 0:
+                continue
+            cached = self._maps.get(name)
+            if cached is None or cached[0] != count:
+                vec_path, ids_path = self._files(name)
+                cached = (
+                    count,
+                    np.memmap(vec_path, dtype=self.dtype, mode="r", shape=(count, self.dimension)),
+                    np.memmap(ids_path, dtype=np.int64, mode="r", shape=(count, 2)),
+                )
+                self._maps[name] = cached
+            mapped.append(cached[1:])
+        return mapped
+
+    def iter_rows(self, start: int = 0) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """
+        Yield ``(vectors, ids)`` blocks of the committed rows from row ``start`` on.
+
+        Blocks are views of the memory maps of at most ``block_rows`` rows.
+        """
+        offset = 0
+        for vectors, ids in self._snapshot():
+            count = len(vectors)
+            first = max(start - offset, 0)
+            offset += count
+            for block_start in range(first, count, self.block_rows):
+                block_end = block_start + self.block_rows
+                yield vectors[block_start:block_end], ids[block_start:block_end]
+
+    def sample(self, count: int, seed: int = 0) -> np.ndarray:
+        """Return up to ``count`` stored vectors chosen uniformly at random, as float32."""
+        segments = self._snapshot()
+        total = sum(len(vectors) for vectors, _ in segments)
+        rows = np.sort(np.random.default_rng(seed).choice(total, size=min(count, total), replace=False))
+        picked = []
+        offset = 0
+        for vectors, _ in segments:
+            local = rows[(rows >= offset) & (rows < offset + len(vectors))] - offset
+            picked.append(np.asarray(vectors[local], dtype=np.float32))
+            offset += len(vectors)
+        return np.concatenate(picked) if picked else np.empty((0, self.dimension), dtype=np.float32)
+
+    def search(self, queries: np.ndarray, k: int = 10,
+               document_ids: Optional[Iterable[int]] = None, start: int = 0) -> list[list[SearchHit]]:
+        """
+        Brute-force cosine search for a batch of queries.
+
+        Args:
+            queries: ``(dimension,)`` or ``(q, dimension)`` query vectors
+            k: Results per query
+            document_ids: Only return chunks of these documents
+            start: Only search rows from this row on, e.g. rows not yet in an
+                approximate index
+
+        Returns:
+            One list of up to ``k`` hits per query, best first
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        num_queries = len(queries)
+        allowed = None if document_ids is None else np.fromiter(document_ids, dtype=np.int64)
+
+        best_scores = np.empty((0, num_queries), dtype=np.float32)
+        best_ids = np.empty((0, num_queries, 2), dtype=np.int64)
+        for block, block_ids in self.iter_rows(start):
+            if allowed is not None:
+                mask = np.isin(block_ids[:, 0], allowed)
+                if not mask.any():
+                    continue
+                block, block_ids = block[mask], block_ids[mask]
+
+            scores = np.asarray(block, dtype=np.float32) @ queries.T  # (rows, queries)
+            if len(scores) > k:
+                top = np.argpartition(-scores, k - 1, axis=0)[:k]
+                scores = np.take_along_axis(scores, top, axis=0)
+                candidate_ids = np.asarray(block_ids)[top]
+            else:
+                candidate_ids = np.broadcast_to(
+                    np.asarray(block_ids)[:, None, :], (len(scores), num_queries, 2)
+                )
+
+            best_scores = np.concatenate([best_scores, scores])
+            best_ids = np.concatenate([best_ids, candidate_ids])
+            if len(best_scores) > k:
+                top = np.argpartition(-best_scores, k - 1, axis=0)[:k]
+                best_scores = np.take_along_axis(best_scores, top, axis=0)
+                best_ids = np.take_along_axis(best_ids, top[:, :, None], axis=0)
+
+        order = np.argsort(-best_scores, axis=0, kind="stable")
+        results = []
+        for q in range(num_queries):
+            results.append([
+                SearchHit(int(best_ids[i, q, 0]), int(best_ids[i, q, 1]), float(best_scores[i, q]))
+                for i in order[:, q]
+            ])
+        return results
@@ -0,0 +1,68 @@
+"""
+Bulk persistence of document chunks.
+
+Documents can produce thousands of chunks, so they are written in a single
+round trip: PostgreSQL COPY when available, otherwise one executemany
+INSERT. Rows are never added one by one through the ORM.
+"""
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Chunk
+
+CHUNK_COLUMNS = ("document_id", "ordinal", "page_start", "page_end", "char_start", "char_end", "text")
+
+
+async def _copy_chunks(db: AsyncSession, rows: list[dict]) -> None:
+    """Write rows with PostgreSQL ``COPY ... FROM STDIN`` (asyncpg)."""
+    records = [
+        # PostgreSQL text columns cannot hold NUL characters
+        tuple(row[col].replace("\x00", "") if col == "text" else row[col] for col in CHUNK_COLUMNS)
+        for row in rows
+    ]
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        Chunk.__tablename__, records=records, columns=CHUNK_COLUMNS
+    )
+
+
+async def bulk_insert_chunks(db: AsyncSession, rows: list[dict]) -> None:
+    """
+    Insert chunk rows within the session's current transaction.
+
+    Args:
+        db: Database session; the caller commits
+        rows: Dicts with the keys in ``CHUNK_COLUMNS``
+    """
+    if not rows:
+        return
+
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql" and bind.dialect.driver == "asyncpg":
+        await _copy_chunks(db, rows)
+    else:
+        await db.execute(insert(Chunk), rows)
+
+
+async def load_chunks(db: AsyncSession, document_id: int, after: int = -1, limit: int | None = None) -> list:
+    """
+    Load stored chunks of a document in order.
+
+    Args:
+        db: Database session
+        document_id: Document to load chunks for
+        after: Only return chunks with an ordinal greater than this
+        limit: Maximum number of chunks to return
+
+    Returns:
+        Rows with the chunk columns, ordered by ordinal
+    """
+    query = (
+        select(*(getattr(Chunk, col) for col in CHUNK_COLUMNS))
+        .where(Chunk.document_id == document_id, Chunk.ordinal > after)
+        .order_by(Chunk.ordinal)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return (await db.execute(query)).all()
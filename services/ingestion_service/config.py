@@ -9,9 +9,52 @@ class Settings:
 
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./documents.db")
 
+    # Connection pool (PostgreSQL; SQLite uses the driver defaults)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a connection
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+    # SQLite pragmas applied to every connection
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
     # Chunking settings
     CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "1000"))
     CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "100"))
+    CHUNK_MODE: str = os.getenv("CHUNK_MODE", "chars")  # "chars" or "tokens" (sizes count words)
+    CHUNK_BOUNDARY: str = os.getenv("CHUNK_BOUNDARY", "none")  # "none", "whitespace" or "sentence"
+
+    # Extraction settings
+    EXTRACTION_EXECUTOR: str = os.getenv("EXTRACTION_EXECUTOR", "process")  # "process" or "thread"
+    EXTRACTION_WORKERS: int = int(os.getenv("EXTRACTION_WORKERS", "0"))  # 0 = one per CPU core
+    EXTRACTION_MIN_PAGES_PER_TASK: int = int(os.getenv("EXTRACTION_MIN_PAGES_PER_TASK", "4"))
+    # Backend: "layout" (pdfplumber), "fast" (PDFium text layer) or "auto"; see extractors.py
+    EXTRACTION_MODE: str = os.getenv("EXTRACTION_MODE", "layout")
+    EXTRACTION_AUTO_SAMPLE_PAGES: int = int(os.getenv("EXTRACTION_AUTO_SAMPLE_PAGES", "3"))
+    # Budgets; pages over them are skipped and reported (0 disables a limit)
+    EXTRACTION_PAGE_TIMEOUT: float = float(os.getenv("EXTRACTION_PAGE_TIMEOUT", "30"))  # process executor only
+    EXTRACTION_DOCUMENT_TIMEOUT: float = float(os.getenv("EXTRACTION_DOCUMENT_TIMEOUT", "600"))
+    EXTRACTION_WORKER_MEMORY_MB: int = int(os.getenv("EXTRACTION_WORKER_MEMORY_MB", "2048"))  # per process worker
+    EXTRACTION_MAX_TASKS_PER_CHILD: int = int(os.getenv("EXTRACTION_MAX_TASKS_PER_CHILD", "50"))
+
+    # Uploads are spooled here until processed (empty = system temp directory)
+    UPLOAD_SPOOL_DIR: str = os.getenv("UPLOAD_SPOOL_DIR", "")
+
+    # Deduplication cache (LRU, bounded by entries and approximate bytes)
+    DEDUP_CACHE_MAX_ENTRIES: int = int(os.getenv("DEDUP_CACHE_MAX_ENTRIES", "256"))
+    DEDUP_CACHE_MAX_BYTES: int = int(os.getenv("DEDUP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+    # Asynchronous ingestion jobs
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_QUEUE_SIZE: int = int(os.getenv("JOB_QUEUE_SIZE", "16"))
+    JOB_RESULT_TTL: int = int(os.getenv("JOB_RESULT_TTL", "3600"))  # seconds
+
+    # Vector indexing of new chunks (empty URL disables it)
+    EMBEDDINGS_SERVICE_URL: str = os.getenv("EMBEDDINGS_SERVICE_URL", "")
+    INDEXING_BATCH_SIZE: int = int(os.getenv("INDEXING_BATCH_SIZE", "256"))
 
     # Service info
     SERVICE_NAME: str = "ingestion-service"
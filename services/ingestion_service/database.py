@@ -1,27 +1,171 @@
 """
 Database setup and session management.
+
+Request handlers use the async engine (asyncpg for PostgreSQL, aiosqlite for
+SQLite) so database I/O never blocks the event loop. The synchronous engine
+is kept for schema creation and scripts.
 """
-from sqlalchemy import create_engine
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from prometheus_client import REGISTRY, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import MetaData, create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from config import settings
 
-# Create database engine
-if settings.DATABASE_URL.startswith("sqlite"):
+logger = logging.getLogger(__name__)
+
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "ingestion_db_pool_checkout_seconds",
+    "Time spent waiting for a database connection from the pool",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url: str) -> str:
+    """
+    Convert a database URL to its async driver equivalent.
+
+    Example:
+        >>> async_database_url("postgresql://user:pw@db/app")
+        'postgresql+asyncpg://user:pw@db/app'
+    """
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Apply WAL mode and related pragmas to every new SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+IS_SQLITE = settings.DATABASE_URL.startswith("sqlite")
+
+if IS_SQLITE:
+    pool_options = {}
+else:
+    pool_options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+# Create database engines
+if IS_SQLITE:
     engine = create_engine(
         settings.DATABASE_URL,
         connect_args={"check_same_thread": False}
     )
 else:
-    engine = create_engine(settings.DATABASE_URL)
+    engine = create_engine(settings.DATABASE_URL, pool_pre_ping=settings.DB_POOL_PRE_PING, **pool_options)
 
-# Session factory
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    **pool_options
+)
+
+if IS_SQLITE:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+# Session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 # Base class for models
 Base = declarative_base()
 
 
+def upgrade_schema(metadata: MetaData, bind: Engine) -> None:
+    """
+    Create missing tables, then add the columns and indexes that later
+    releases added to tables that already exist.
+
+    ``create_all`` never alters an existing table, so a database created by
+    an earlier release would otherwise lack e.g. ``documents.content_sha256``.
+    Added columns must be nullable; existing rows get NULL.
+    """
+    metadata.create_all(bind=bind)
+    inspector = inspect(bind)
+    quote = bind.dialect.identifier_preparer.quote
+    with bind.begin() as connection:
+        for table in metadata.sorted_tables:
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in columns:
+                    continue
+                if not column.nullable:
+                    raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{column.name} to existing rows")
+                column_type = column.type.compile(dialect=bind.dialect)
+                connection.execute(text(
+                    f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"
+                ))
+                logger.info("Added column %s.%s", table.name, column.name)
+
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(connection)
+                    logger.info("Created index %s", index.name)
+
+
+class PoolMetricsCollector:
+    """Prometheus collector reporting async engine pool usage at scrape time."""
+
+    def collect(self):
+        pool = async_engine.pool
+        gauge = GaugeMetricFamily(
+            "ingestion_db_pool_connections",
+            "Connections in the database pool",
+            labels=["state"],
+        )
+        for state in ("checkedout", "checkedin", "overflow"):
+            stat = getattr(pool, state, None)
+            if stat is not None:
+                gauge.add_metric([state], stat())
+        yield gauge
+
+
+REGISTRY.register(PoolMetricsCollector())
+
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[AsyncSession]:
+    """
+    Open an async session with a pooled connection already checked out.
+
+    The time spent waiting for the connection is recorded in
+    ``ingestion_db_pool_checkout_seconds``.
+    """
+    async with AsyncSessionLocal() as session:
+        started = time.perf_counter()
+        await session.connection()
+        DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
+        yield session
+
+
 def get_db():
     """
     Dependency for FastAPI routes to get database session.
@@ -36,3 +180,16 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """
+    Dependency for async FastAPI routes to get an async database session.
+
+    Usage:
+        @app.get("/items")
+        async def read_items(db: AsyncSession = Depends(get_async_db)):
+            return (await db.scalars(select(Item))).all()
+    """
+    async with session_scope() as session:
+        yield session
@@ -0,0 +1,128 @@
+"""
+Content-addressed deduplication of uploaded PDFs.
+
+Uploads are hashed with SHA-256 while they are spooled to disk, and
+processing results are cached by that hash so a repeated upload of the same
+bytes is answered without parsing the PDF again.
+"""
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import UploadFile
+from prometheus_client import Counter, Gauge
+
+DEDUP_CACHE_HITS = Counter(
+    "ingestion_dedup_cache_hits_total",
+    "Uploads answered from the deduplication cache without re-parsing",
+)
+DEDUP_CACHE_MISSES = Counter(
+    "ingestion_dedup_cache_misses_total",
+    "Uploads that were not found in the deduplication cache",
+)
+DEDUP_CACHE_EVICTIONS = Counter(
+    "ingestion_dedup_cache_evictions_total",
+    "Entries evicted from the deduplication cache",
+)
+DEDUP_CACHE_BYTES = Gauge(
+    "ingestion_dedup_cache_bytes",
+    "Approximate size of the results held in the deduplication cache",
+)
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+async def spool_and_hash(file: UploadFile, directory: str,
+                         chunk_size: int = READ_CHUNK_SIZE) -> tuple[str, str, int]:
+    """
+    Copy an upload to a file in ``directory`` in chunks, hashing it along the way.
+
+    The caller owns the file and must delete it once processing is done.
+
+    Returns:
+        Tuple of (file path, hex SHA-256 digest, size in bytes)
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(suffix=".pdf", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(chunk_size):
+                digest.update(chunk)
+                size += len(chunk)
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest(), size
+
+
+def _result_size(result: dict) -> int:
+    """Approximate memory footprint of a cached processing result."""
+    return sys.getsizeof(result) + sum(
+        sys.getsizeof(chunk["text"]) + 200 for chunk in result.get("chunks", [])
+    )
+
+
+class ChunkCache:
+    """
+    LRU cache of processing results keyed by content hash.
+
+    Entries are evicted least-recently-used first once either limit is
+    exceeded.
+
+    Args:
+        max_entries: Maximum number of cached documents
+        max_bytes: Maximum approximate size of all cached results
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[dict, int]] = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, content_hash: str) -> Optional[dict]:
+        """Return the cached result for a hash and mark it recently used."""
+        entry = self._entries.get(content_hash)
+        if entry is None:
+            DEDUP_CACHE_MISSES.inc()
+            return None
+        self._entries.move_to_end(content_hash)
+        DEDUP_CACHE_HITS.inc()
+        return entry[0]
+
+    def put(self, content_hash: str, result: dict) -> None:
+        """Cache a result, evicting old entries to stay within the limits."""
+        size = _result_size(result)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+
+        self.discard(content_hash)
+        self._entries[content_hash] = (result, size)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            DEDUP_CACHE_EVICTIONS.inc()
+
+        DEDUP_CACHE_BYTES.set(self._bytes)
+
+    def discard(self, content_hash: str) -> None:
+        """Remove a hash from the cache, if present."""
+        entry = self._entries.pop(content_hash, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+            DEDUP_CACHE_BYTES.set(self._bytes)
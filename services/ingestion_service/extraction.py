@@ -0,0 +1,414 @@
+"""
+Parallel PDF text extraction.
+
+pdfplumber is CPU-bound, pure-Python code. Running it inside an ``async def``
+handler blocks the event loop for the whole document, so extraction is
+delegated to a worker pool instead: a document's pages are split into
+contiguous ranges, each range is extracted by a separate worker and the
+results are reassembled in page order.
+
+Text is extracted by one of the backends in ``extractors`` (``layout``,
+``fast`` or ``auto``), chosen per executor and overridable per document.
+Workers open the spooled upload by path, so the file is never copied into
+every task. They load one page at a time and drop it as soon as its text is
+extracted. Memory therefore stays flat however long the document is. Extraction is also bounded:
+
+* each page gets ``page_timeout`` seconds (enforced with ``SIGALRM`` in
+  process workers) and the whole document a ``document_timeout`` deadline;
+* process workers run under an address-space limit and are replaced after
+  ``max_tasks_per_child`` tasks.
+
+A page that fails is retried with the backend's fallback extractor, and is
+skipped if that fails too. A page range whose worker process dies is tried
+once more on a fresh pool, and skipped if it kills that one as well.
+Skipped pages are reported instead of failing the document.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from extractors import AUTO, LAYOUT, MODES, Extractor, FastExtractor, choose_mode, open_extractor
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_QUEUE_DEPTH = Gauge(
+    "ingestion_extraction_queue_depth",
+    "Extraction tasks submitted to the worker pool that have not finished yet",
+)
+EXTRACTION_PAGE_SECONDS = Histogram(
+    "ingestion_extraction_page_seconds",
+    "Time spent extracting text from a single PDF page",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+EXTRACTION_DOCUMENTS = Counter(
+    "ingestion_extraction_documents_total",
+    "Documents extracted, by backend (after ``auto`` has picked one)",
+    ["mode"],
+)
+EXTRACTION_PAGE_FAILURES = Counter(
+    "ingestion_extraction_page_failures_total",
+    "Pages whose regular extraction failed, by outcome",
+    ["outcome"],
+)
+
+# Outcome of a page that produced text with the fallback extractor
+DEGRADED = "degraded"
+# Outcomes of pages that produced no text
+TIMEOUT = "timeout"
+DEADLINE = "deadline"
+MEMORY = "memory"
+ERROR = "error"
+CRASHED = "crashed"  # the worker process died
+
+
+class PageTimeout(Exception):
+    """Raised inside a worker when a page exceeds its time budget."""
+
+
+def _raise_page_timeout(signum, frame):
+    raise PageTimeout()
+
+
+@contextmanager
+def _time_limit(seconds: float) -> Iterator[None]:
+    """
+    Interrupt the enclosed code with ``PageTimeout`` after ``seconds``.
+
+    Signals can only be handled on the main thread, which is where process
+    pool workers run tasks; elsewhere (the thread executor) this is a no-op
+    and only the document deadline applies, checked between pages.
+    """
+    if seconds <= 0 or not hasattr(signal, "SIGALRM") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _raise_page_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _init_worker(memory_limit: int) -> None:
+    """Process pool initializer: cap the worker's address space at ``memory_limit`` bytes."""
+    if memory_limit <= 0:
+        return
+    import resource
+
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        memory_limit = min(memory_limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, hard))
+
+
+def inspect_document(path: str, mode: str = LAYOUT, sample_pages: int = 3) -> tuple[int, str]:
+    """
+    Count a PDF's pages and resolve ``auto`` to the backend to use for it.
+
+    Returns:
+        Tuple of (page count, ``layout`` or ``fast``)
+    """
+    if mode == AUTO:
+        with FastExtractor(path) as extractor:
+            return extractor.page_count(), choose_mode(extractor, sample_pages)
+    with open_extractor(mode, path) as extractor:
+        return extractor.page_count(), mode
+
+
+def _extract_page(extractor: Extractor, page_number: int, page, page_timeout: float) -> tuple[str, Optional[str]]:
+    """Return ``(text, outcome)`` for one page; ``outcome`` is None on success."""
+    try:
+        with _time_limit(page_timeout):
+            return extractor.extract(page), None
+    except PageTimeout:
+        return "", TIMEOUT
+    except MemoryError:
+        return "", MEMORY
+    except Exception as e:
+        logger.warning("Extracting page %d failed, retrying with the fallback extractor: %s", page_number, e)
+
+    try:
+        with _time_limit(page_timeout):
+            return extractor.fallback(page_number, page), DEGRADED
+    except PageTimeout:
+        return "", TIMEOUT
+    except MemoryError:
+        return "", MEMORY
+    except Exception as e:
+        logger.warning("Skipping page %d: %s", page_number, e)
+        return "", ERROR
+
+
+def extract_page_range(path: str, first: int, last: int, page_timeout: float = 0.0,
+                       deadline: Optional[float] = None,
+                       mode: str = LAYOUT) -> list[tuple[int, str, float, Optional[str]]]:
+    """
+    Extract text from pages ``first``..``last`` (1-based, inclusive).
+
+    Runs inside a worker, so it must stay a module-level function that can be
+    pickled by the process pool.
+
+    Args:
+        path: Path of the PDF file
+        first: First page number
+        last: Last page number
+        page_timeout: Seconds allowed per page (0 = no limit)
+        deadline: ``time.time()`` after which remaining pages are skipped
+        mode: Extraction backend, ``layout`` or ``fast`` (see ``extractors``)
+
+    Returns:
+        List of ``(page_number, text, seconds, outcome)`` tuples in page
+        order. ``outcome`` is None for a normally extracted page, otherwise
+        one of ``DEGRADED``, ``TIMEOUT``, ``DEADLINE``, ``MEMORY`` or ``ERROR``
+        (``CRASHED`` is only set by ``ExtractionExecutor``)
+    """
+    results = []
+    with open_extractor(mode, path) as extractor:
+        for page_number, page in extractor.iter_pages(first, last):
+            started = time.perf_counter()
+            try:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    text, outcome = "", DEADLINE
+                else:
+                    limit = min(page_timeout or remaining, remaining) if remaining is not None else page_timeout
+                    text, outcome = _extract_page(extractor, page_number, page, limit)
+                results.append((page_number, text, time.perf_counter() - started, outcome))
+            finally:
+                # Released exactly once, whatever happened to the page
+                extractor.release(page)
+    return results
+
+
+def split_page_ranges(total_pages: int, max_parts: int, min_pages: int = 1) -> list[tuple[int, int]]:
+    """
+    Split ``total_pages`` into at most ``max_parts`` contiguous, balanced ranges.
+
+    Each range holds at least ``min_pages`` pages (except when the document is
+    shorter than that), so small documents are not scattered across workers.
+
+    Example:
+        >>> split_page_ranges(10, 3)
+        [(1, 4), (5, 7), (8, 10)]
+    """
+    if total_pages <= 0:
+        return []
+
+    parts = max(1, min(max_parts, total_pages // max(min_pages, 1)))
+    base, extra = divmod(total_pages, parts)
+
+    ranges = []
+    first = 1
+    for i in range(parts):
+        size = base + (1 if i < extra else 0)
+        ranges.append((first, first + size - 1))
+        first += size
+    return ranges
+
+
+class ExtractionExecutor:
+    """
+    Runs PDF extraction on a lazily created worker pool.
+
+    Args:
+        kind: ``"process"`` for a process pool (default) or ``"thread"``
+        max_workers: Pool size; ``0`` or ``None`` uses every available core
+        min_pages_per_task: Smallest page range handed to a single worker
+        mode: Default extraction backend, ``layout``, ``fast`` or ``auto``
+        auto_sample_pages: Pages sampled to choose the backend in ``auto`` mode
+        page_timeout: Seconds allowed per page, 0 for no limit (process pool only)
+        document_timeout: Seconds allowed per document, 0 for no limit
+        worker_memory_limit: Address-space limit of each process worker in
+            bytes, 0 for no limit
+        max_tasks_per_child: Page ranges a process worker handles before it
+            is replaced, returning memory it fragmented; 0 to keep workers
+    """
+
+    def __init__(self, kind: str = "process", max_workers: int | None = None, min_pages_per_task: int = 4,
+                 mode: str = LAYOUT, auto_sample_pages: int = 3,
+                 page_timeout: float = 0.0, document_timeout: float = 0.0, worker_memory_limit: int = 0,
+                 max_tasks_per_child: int = 0):
+        if kind not in ("process", "thread"):
+            raise ValueError(f"Unknown extraction executor: {kind}")
+        if mode not in MODES:
+            raise ValueError(f"Unknown extraction mode: {mode}")
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_pages_per_task = min_pages_per_task
+        self.mode = mode
+        self.auto_sample_pages = auto_sample_pages
+        self.page_timeout = page_timeout
+        self.document_timeout = document_timeout
+        self.worker_memory_limit = worker_memory_limit
+        self.max_tasks_per_child = max_tasks_per_child
+        self._executor: Executor | None = None
+        self._pending = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of tasks submitted to the pool that have not finished yet."""
+        return self._pending
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                # Workers start from a small fork server rather than a fork of
+                # this process, so the memory limit only counts their own use
+                # (and max_tasks_per_child does not support "fork")
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(self.worker_memory_limit,),
+                    max_tasks_per_child=self.max_tasks_per_child or None,
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="extraction"
+                )
+            logger.info("Started %s extraction pool with %d workers", self.kind, self.max_workers)
+        return self._executor
+
+    async def _submit(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        EXTRACTION_QUEUE_DEPTH.inc()
+        try:
+            pool = self._pool()
+            return await loop.run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool next time.
+            # Other tasks of the same pool may already have replaced it.
+            if self._executor is pool:
+                logger.error("Extraction pool is broken, it will be recreated")
+                self._executor = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            self._pending -= 1
+            EXTRACTION_QUEUE_DEPTH.dec()
+
+    async def _extract_range_again(self, path: str, first: int, last: int, deadline: Optional[float],
+                                   mode: str) -> list[tuple[int, str, float, Optional[str]]]:
+        """
+        Extract a page range whose pool broke, on a fresh pool.
+
+        A dying worker fails every range in flight on its pool, not only its
+        own, so each gets a second attempt. A range that breaks the pool again
+        is reported as ``CRASHED`` instead of failing the document.
+        """
+        try:
+            return await self._submit(extract_page_range, path, first, last, self.page_timeout, deadline, mode)
+        except BrokenProcessPool:
+            logger.error("Pages %d-%d crashed the extraction worker twice", first, last)
+            return [(page_num, "", 0.0, CRASHED) for page_num in range(first, last + 1)]
+
+    async def iter_pages(self, path: str,
+                         on_progress: Optional[Callable[[int, int], None]] = None,
+                         eager: bool = False,
+                         on_skipped_page: Optional[Callable[[int, str], None]] = None,
+                         mode: Optional[str] = None) -> AsyncIterator[tuple[int, str]]:
+        """
+        Extract pages in parallel and yield them in page order.
+
+        All page ranges are submitted at once; pages are yielded as soon as
+        every earlier range has finished. Ranges that fail because a worker
+        died are extracted again, one at a time.
+
+        Args:
+            path: Path of the PDF file, which must exist until iteration ends
+            on_progress: Called with ``(pages_done, pages_total)`` each time a
+                page range finishes
+            eager: Put the first page in a range of its own so the first page
+                is available after a single page's extraction time
+            on_skipped_page: Called with ``(page_number, reason)`` for each
+                page that could not be extracted
+            mode: Extraction backend for this document instead of the
+                executor's default
+
+        Yields:
+            ``(page_number, text)`` tuples, skipping pages without any text
+        """
+        deadline = time.time() + self.document_timeout if self.document_timeout > 0 else None
+        mode = mode or self.mode
+        if mode not in MODES:
+            raise ValueError(f"Unknown extraction mode: {mode}")
+        total_pages, mode = await self._submit(inspect_document, path, mode, self.auto_sample_pages)
+        EXTRACTION_DOCUMENTS.labels(mode=mode).inc()
+        if eager and total_pages > 1:
+            ranges = [(1, 1)] + [
+                (first + 1, last + 1)
+                for first, last in split_page_ranges(total_pages - 1, self.max_workers, self.min_pages_per_task)
+            ]
+        else:
+            ranges = split_page_ranges(total_pages, self.max_workers, self.min_pages_per_task)
+
+        tasks = [
+            asyncio.ensure_future(
+                self._submit(extract_page_range, path, first, last, self.page_timeout, deadline, mode)
+            )
+            for first, last in ranges
+        ]
+        pages_done = 0
+        try:
+            for (first, last), task in zip(ranges, tasks):
+                try:
+                    batch = await task
+                except BrokenProcessPool:
+                    batch = await self._extract_range_again(path, first, last, deadline, mode)
+                pages_done += len(batch)
+                if on_progress is not None:
+                    on_progress(pages_done, total_pages)
+                for page_num, text, seconds, outcome in batch:
+                    EXTRACTION_PAGE_SECONDS.observe(seconds)
+                    if outcome is not None:
+                        EXTRACTION_PAGE_FAILURES.labels(outcome=outcome).inc()
+                        if outcome != DEGRADED:
+                            logger.warning("Skipped page %d: %s", page_num, outcome)
+                            if on_skipped_page is not None:
+                                on_skipped_page(page_num, outcome)
+                    if text:
+                        yield page_num, text
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def extract_pages(self, path: str,
+                            on_progress: Optional[Callable[[int, int], None]] = None,
+                            mode: Optional[str] = None) -> list[dict]:
+        """
+        Extract text from every page of a PDF in parallel.
+
+        Args:
+            path: Path of the PDF file
+            on_progress: Called with ``(pages_done, pages_total)`` each time a
+                page range finishes
+            mode: Extraction backend instead of the executor's default
+
+        Returns:
+            List of ``{"page": number, "text": text}`` dicts in page order,
+            skipping pages without any text
+        """
+        return [
+            {"page": page_num, "text": text}
+            async for page_num, text in self.iter_pages(path, on_progress=on_progress, mode=mode)
+        ]
+
+    def shutdown(self) -> None:
+        """Stop the worker pool, if it was started."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,80 @@
+"""
+Hand-off of new chunks to the embeddings service for vector indexing.
+
+Indexing runs in the background after a document is committed, so uploads
+never wait on embedding. Failures are logged and counted; the chunks remain
+in the database and can be re-indexed later.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+import httpx
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+INDEXING_REQUESTS = Counter(
+    "ingestion_indexing_requests_total",
+    "Chunk batches sent to the embeddings service for indexing",
+    ["status"],
+)
+
+
+class ChunkIndexer:
+    """
+    Sends stored chunks to the embeddings service's ``/index`` endpoint.
+
+    Args:
+        base_url: Embeddings service URL; empty disables indexing
+        batch_size: Chunks per ``/index`` request
+        timeout: Seconds per request
+    """
+
+    def __init__(self, base_url: str, batch_size: int = 256, timeout: float = 60.0):
+        self.base_url = base_url.rstrip("/")
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.base_url)
+
+    async def stop(self) -> None:
+        """Wait for in-flight indexing, then close the HTTP client."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def submit(self, document_id: int, rows: list[dict]) -> None:
+        """Index a document's chunk rows in the background."""
+        if not self.enabled or not rows:
+            return
+        task = asyncio.create_task(self.index(document_id, rows))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def index(self, document_id: int, rows: list[dict]) -> None:
+        """Send chunk rows to the embeddings service in batches."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            try:
+                response = await self._client.post(
+                    f"{self.base_url}/index",
+                    json={
+                        "document_id": document_id,
+                        "chunks": [{"ordinal": row["ordinal"], "text": row["text"]} for row in batch]
+                    }
+                )
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                INDEXING_REQUESTS.labels(status="error").inc()
+                logger.error("Indexing document %d failed: %s", document_id, e)
+                return
+            INDEXING_REQUESTS.labels(status="ok").inc()
@@ -0,0 +1,185 @@
+"""
+In-process job queue for asynchronous PDF ingestion.
+
+Uploads submitted in async mode are queued and processed by a fixed number
+of worker tasks. The queue is bounded: when it is full, new submissions are
+refused with a retry hint instead of piling up until clients time out.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Optional
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+JOBS_QUEUED = Gauge("ingestion_jobs_queued", "Ingestion jobs waiting for a worker")
+JOBS_RUNNING = Gauge("ingestion_jobs_running", "Ingestion jobs currently being processed")
+JOBS_FINISHED = Counter("ingestion_jobs_finished_total", "Finished ingestion jobs", ["status"])
+JOBS_REJECTED = Counter("ingestion_jobs_rejected_total", "Job submissions refused because the queue was full")
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """State of a single ingestion job."""
+    id: str
+    filename: str
+    status: JobStatus = JobStatus.QUEUED
+    pages_done: int = 0
+    pages_total: Optional[int] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    def update_progress(self, pages_done: int, pages_total: int) -> None:
+        self.pages_done = pages_done
+        self.pages_total = pages_total
+
+
+class QueueFullError(Exception):
+    """Raised when a job cannot be accepted because the queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Ingestion queue is full")
+        self.retry_after = retry_after
+
+
+# Called with the job and the payload given to submit(); returns the result
+JobHandler = Callable[[Job, Any], Awaitable[dict]]
+
+
+class JobQueue:
+    """
+    Bounded queue of ingestion jobs processed by a pool of worker tasks.
+
+    Args:
+        handler: Coroutine that processes one job and returns its result
+        workers: Number of jobs processed concurrently
+        max_queued: Jobs allowed to wait for a worker before submissions are refused
+        result_ttl: Seconds finished jobs are kept for status polling
+        max_history: Maximum number of finished jobs kept
+    """
+
+    def __init__(self, handler: JobHandler, workers: int = 2, max_queued: int = 16,
+                 result_ttl: float = 3600, max_history: int = 1000):
+        self.handler = handler
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.max_history = max_history
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._avg_seconds = 10.0  # Running estimate of job duration, for Retry-After
+
+    @property
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"ingestion-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks; queued jobs are dropped."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        JOBS_QUEUED.set(0)
+
+    def retry_after(self) -> int:
+        """Estimated seconds until a queue slot frees up."""
+        return max(1, round(self._avg_seconds * (self.depth + 1) / max(self.workers, 1)))
+
+    def submit(self, filename: str, payload: Any) -> Job:
+        """
+        Queue a job for processing.
+
+        Raises:
+            QueueFullError: If the queue is at capacity
+        """
+        self.start()
+        self._purge()
+
+        job = Job(id=uuid.uuid4().hex, filename=filename)
+        try:
+            self._queue.put_nowait((job, payload))
+        except asyncio.QueueFull:
+            JOBS_REJECTED.inc()
+            raise QueueFullError(retry_after=self.retry_after())
+
+        self._jobs[job.id] = job
+        JOBS_QUEUED.set(self.depth)
+        logger.info("Queued ingestion job %s for %s", job.id, filename)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by id, if it is still known."""
+        return self._jobs.get(job_id)
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based position of a queued job, or None once it has started."""
+        queued = [job.id for job in self._jobs.values() if job.status == JobStatus.QUEUED]
+        return queued.index(job_id) + 1 if job_id in queued else None
+
+    def _purge(self) -> None:
+        """Forget finished jobs that are too old or beyond the history limit."""
+        cutoff = time.time() - self.result_ttl
+        finished = [job for job in self._jobs.values() if job.finished]
+        excess = len(finished) - self.max_history
+        for job in finished:
+            if excess > 0 or job.finished_at < cutoff:
+                del self._jobs[job.id]
+                excess -= 1
+
+    async def _worker(self) -> None:
+        while True:
+            job, payload = await self._queue.get()
+            JOBS_QUEUED.set(self.depth)
+            JOBS_RUNNING.inc()
+            job.status = JobStatus.RUNNING
+            job.started_at = time.time()
+            try:
+                job.result = await self.handler(job, payload)
+                job.status = JobStatus.SUCCEEDED
+            except asyncio.CancelledError:
+                job.error = "Ingestion service shut down"
+                job.status = JobStatus.FAILED
+                raise
+            except Exception as e:
+                logger.exception("Ingestion job %s failed", job.id)
+                job.error = str(e)
+                job.status = JobStatus.FAILED
+            finally:
+                job.finished_at = time.time()
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (job.finished_at - job.started_at)
+                JOBS_RUNNING.dec()
+                JOBS_FINISHED.labels(status=job.status.value).inc()
+                self._queue.task_done()
@@ -1,25 +1,128 @@
 """
 Ingestion Service - PDF processing and text extraction.
 """
-from fastapi import FastAPI, UploadFile, File, HTTPException, Response
-import pdfplumber
-from io import BytesIO
+import base64
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Literal, Optional
+
+from fastapi import FastAPI, UploadFile, File, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from prometheus_fastapi_instrumentator import Instrumentator
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import Histogram, generate_latest, CONTENT_TYPE_LATEST
+from sqlalchemy import and_, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from chunk_store import bulk_insert_chunks, load_chunks
 from config import settings
-from database import Base, engine, SessionLocal
-from models import Document
-from schemas import HealthResponse, ProcessPDFResponse, DocumentListItem, ChunkResponse
-from utils import chunk_text
+from database import Base, async_engine, engine, session_scope, upgrade_schema
+from dedup import ChunkCache, spool_and_hash
+from extraction import ExtractionExecutor
+from indexing import ChunkIndexer
+from jobs import Job, JobQueue, QueueFullError
+from models import Chunk, Document
+from request_context import REQUEST_ID_HEADER, configure_logging, new_request_id, request_id_var
+from schemas import (
+    HealthResponse,
+    ProcessPDFResponse,
+    DocumentListItem,
+    DocumentChunksResponse,
+    JobAcceptedResponse,
+    JobStatusResponse,
+)
+from utils import SpanChunker
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Where the time of an upload goes; per-page extraction time is
+# ingestion_extraction_page_seconds (extraction.py)
+STAGE_SECONDS = Histogram(
+    "ingestion_stage_seconds",
+    "Time spent in each stage of processing an upload",
+    ["stage"],  # read, extract, chunk, commit, serialize
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+PDF_BYTES = Histogram(
+    "ingestion_pdf_bytes",
+    "Size of uploaded PDFs",
+    buckets=tuple(2 ** exponent for exponent in range(14, 27, 2)),  # 16KB .. 64MB
+)
+PDF_PAGES = Histogram(
+    "ingestion_pdf_pages",
+    "Pages per processed PDF",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+EXTRACTION_PAGES_PER_SECOND = Histogram(
+    "ingestion_extraction_pages_per_second",
+    "Extraction throughput of each processed PDF",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+CHUNKS_PER_DOCUMENT = Histogram(
+    "ingestion_chunks_per_document",
+    "Chunks produced per processed PDF",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+
+# Create database tables, and bring those of an earlier release up to date
+upgrade_schema(Base.metadata, engine)
+
+# PDF extraction runs on a worker pool so it never blocks the event loop
+extraction_executor = ExtractionExecutor(
+    kind=settings.EXTRACTION_EXECUTOR,
+    max_workers=settings.EXTRACTION_WORKERS,
+    min_pages_per_task=settings.EXTRACTION_MIN_PAGES_PER_TASK,
+    mode=settings.EXTRACTION_MODE,
+    auto_sample_pages=settings.EXTRACTION_AUTO_SAMPLE_PAGES,
+    page_timeout=settings.EXTRACTION_PAGE_TIMEOUT,
+    document_timeout=settings.EXTRACTION_DOCUMENT_TIMEOUT,
+    worker_memory_limit=settings.EXTRACTION_WORKER_MEMORY_MB * 1024 * 1024,
+    max_tasks_per_child=settings.EXTRACTION_MAX_TASKS_PER_CHILD,
+)
+
+# Uploads are spooled to files here and extraction workers read them by path,
+# so the service never holds a whole PDF in memory
+if settings.UPLOAD_SPOOL_DIR:
+    os.makedirs(settings.UPLOAD_SPOOL_DIR, exist_ok=True)
+upload_spool_dir = tempfile.mkdtemp(prefix="ingestion-uploads-", dir=settings.UPLOAD_SPOOL_DIR or None)
+
+# Results of recent uploads, keyed by SHA-256 of the file content
+chunk_cache = ChunkCache(
+    max_entries=settings.DEDUP_CACHE_MAX_ENTRIES,
+    max_bytes=settings.DEDUP_CACHE_MAX_BYTES,
+)
+
+# New documents are embedded and indexed by the embeddings service
+chunk_indexer = ChunkIndexer(settings.EMBEDDINGS_SERVICE_URL, batch_size=settings.INDEXING_BATCH_SIZE)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the ingestion job workers; on shutdown stop them, drain indexing and close the pools."""
+    job_queue.start()
+    yield
+    await job_queue.stop()
+    await chunk_indexer.stop()
+    extraction_executor.shutdown()
+    await async_engine.dispose()
+    # Uploads of jobs that never ran
+    for name in os.listdir(upload_spool_dir):
+        discard_upload(os.path.join(upload_spool_dir, name))
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.SERVICE_NAME,
-    version=settings.SERVICE_VERSION
+    version=settings.SERVICE_VERSION,
+    lifespan=lifespan
 )
 
 # Initialize Prometheus metrics
@@ -37,6 +140,19 @@ instrumentator = Instrumentator(
 instrumentator.instrument(app)
 
 
+@app.middleware("http")
+async def bind_request_id(request: Request, call_next):
+    """Log under the caller's ``X-Request-ID`` (or a new one) and echo it back."""
+    request_id = request.headers.get(REQUEST_ID_HEADER) or new_request_id()
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers[REQUEST_ID_HEADER] = request_id
+    return response
+
+
 @app.get("/metrics")
 async def metrics():
     """Prometheus metrics endpoint."""
@@ -49,35 +165,409 @@ async def health():
     return {"status": "ok", "service": settings.SERVICE_NAME}
 
 
+def as_naive_utc(value: datetime) -> datetime:
+    """Convert a datetime to naive UTC, the form ``uploaded_at`` is stored in."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def encode_cursor(uploaded_at: datetime, document_id: int) -> str:
+    """Encode the position after a listed document as an opaque cursor."""
+    raw = f"{uploaded_at.isoformat()}|{document_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        uploaded_at, document_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(uploaded_at), int(document_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @app.get("/documents", response_model=list[DocumentListItem])
-async def list_documents():
+async def list_documents(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    filename_prefix: Optional[str] = Query(None),
+    uploaded_after: Optional[datetime] = Query(None),
+    uploaded_before: Optional[datetime] = Query(None),
+):
+    """
+    List processed documents with metadata, newest first.
+
+    Results are paginated with a keyset cursor on ``(uploaded_at, id)``: when
+    more documents exist, the ``X-Next-Cursor`` response header holds the
+    cursor for the next page. Only the listed columns are loaded.
+    """
+    query = select(
+        Document.id,
+        Document.filename,
+        Document.total_pages,
+        Document.total_chunks,
+        Document.uploaded_at
+    )
+
+    if filename_prefix:
+        query = query.where(Document.filename.startswith(filename_prefix, autoescape=True))
+    if uploaded_after is not None:
+        query = query.where(Document.uploaded_at >= as_naive_utc(uploaded_after))
+    if uploaded_before is not None:
+        query = query.where(Document.uploaded_at < as_naive_utc(uploaded_before))
+    if cursor is not None:
+        last_uploaded_at, last_id = decode_cursor(cursor)
+        query = query.where(or_(
+            Document.uploaded_at < last_uploaded_at,
+            and_(Document.uploaded_at == last_uploaded_at, Document.id < last_id)
+        ))
+
+    # Fetch one extra row to learn whether another page exists
+    query = query.order_by(Document.uploaded_at.desc(), Document.id.desc()).limit(limit + 1)
+
+    async with session_scope() as db:
+        rows = (await db.execute(query)).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].uploaded_at, rows[-1].id)
+
+    return [
+        {
+            "id": row.id,
+            "filename": row.filename,
+            "total_pages": row.total_pages,
+            "total_chunks": row.total_chunks,
+            "uploaded_at": row.uploaded_at.isoformat()
+        }
+        for row in rows
+    ]
+
+
+@app.get("/documents/{document_id}/chunks", response_model=DocumentChunksResponse)
+async def get_document_chunks(document_id: int, after: int = Query(-1, ge=-1),
+                              limit: int = Query(500, ge=1, le=5000)):
     """
-    List all processed documents with metadata.
+    Return the stored chunks of a document in order.
+
+    Paginate by passing the returned ``next_after`` as ``after``.
     """
-    db = SessionLocal()
+    async with session_scope() as db:
+        doc = await db.get(Document, document_id)
+        if doc is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+        rows = await load_chunks(db, document_id, after=after, limit=limit)
+        return {
+            "document_id": document_id,
+            "total_chunks": doc.total_chunks,
+            "chunks": [row._asdict() for row in rows],
+            "next_after": rows[-1].ordinal if len(rows) == limit else None
+        }
+
+
+def chunk_record(row: dict) -> dict:
+    """Convert a chunk row into its ``ChunkResponse`` form."""
+    return {
+        "chunk_id": row["ordinal"],
+        "text": row["text"],
+        "char_count": len(row["text"]),
+        "page_start": row["page_start"],
+        "page_end": row["page_end"]
+    }
+
+
+def chunk_result(document_id: int, filename: str, total_pages: int, rows: list) -> dict:
+    """Build a ``ProcessPDFResponse`` body from chunk rows."""
+    return {
+        "document_id": document_id,
+        "filename": filename,
+        "total_pages": total_pages,
+        "total_chunks": len(rows),
+        "chunks": [chunk_record(row) for row in rows]
+    }
+
+
+async def load_stored_result(content_hash: str, filename: str) -> Optional[dict]:
+    """Rebuild the result of an earlier upload of the same content from the database."""
+    async with session_scope() as db:
+        doc = await db.scalar(select(Document).where(Document.content_sha256 == content_hash))
+        if doc is None:
+            return None
+        rows = [row._asdict() for row in await load_chunks(db, doc.id)]
+        if not rows and doc.total_chunks:
+            # Processed before chunks were persisted; the PDF must be parsed again
+            return None
+        return chunk_result(doc.id, filename, doc.total_pages, rows)
+
+
+async def save_document(filename: str, content_hash: str, total_pages: int, rows: list[dict]) -> tuple[int, bool]:
+    """
+    Save a document and all of its chunks in one transaction.
+
+    Reuses the row of an earlier upload of the same content.
+
+    Returns:
+        Tuple of (document id, whether the content was already known)
+    """
+    async with session_scope() as db:
+        doc = await db.scalar(select(Document).where(Document.content_sha256 == content_hash))
+        deduplicated = doc is not None
+        if doc is None:
+            doc = Document(
+                filename=filename,
+                content_sha256=content_hash,
+                total_pages=total_pages,
+                total_chunks=len(rows)
+            )
+            db.add(doc)
+        try:
+            await db.flush()
+            if await db.scalar(select(Chunk.id).where(Chunk.document_id == doc.id).limit(1)) is None:
+                await bulk_insert_chunks(db, [{**row, "document_id": doc.id} for row in rows])
+            await db.commit()
+        except IntegrityError:
+            # A concurrent upload of the same content won the race
+            await db.rollback()
+            deduplicated = True
+        return await find_document_by_hash(db, content_hash), deduplicated
+
+
+async def find_document_by_hash(db: AsyncSession, content_hash: str) -> Optional[int]:
+    """Return the id of the document with the given content hash, if any."""
+    return await db.scalar(select(Document.id).where(Document.content_sha256 == content_hash))
+
+
+def discard_upload(path: str) -> None:
+    """Delete a spooled upload once it has been processed."""
     try:
-        docs = db.query(Document).order_by(Document.uploaded_at.desc()).all()
-        return [
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def iter_ingestion(filename: str, path: str, content_hash: str,
+                         on_progress: Optional[Callable[[int, int], None]] = None,
+                         eager: bool = False, extractor: Optional[str] = None) -> AsyncIterator[dict]:
+    """
+    Extract, chunk and record a PDF, yielding chunks as they are produced.
+
+    Pages are chunked as soon as they are extracted, so the first chunks are
+    available long before the last page has been parsed.
+
+    Args:
+        filename: Original filename of the upload
+        path: Spooled PDF file
+        content_hash: SHA-256 of the file
+        on_progress: Called with ``(pages_done, pages_total)`` during extraction
+        eager: Extract the first page on its own to minimise time to first chunk
+        extractor: Extraction backend instead of ``settings.EXTRACTION_MODE``
+
+    Yields:
+        ``{"type": "chunk", ...}`` records in order, then one
+        ``{"type": "trailer", ...}`` record with the document totals
+    """
+    # Identical bytes were processed before: serve the cached result, or the
+    # stored chunks if it has been evicted
+    cached = chunk_cache.get(content_hash)
+    if cached is None:
+        cached = await load_stored_result(content_hash, filename)
+        if cached is not None:
+            chunk_cache.put(content_hash, cached)
+    if cached is not None:
+        for chunk in cached["chunks"]:
+            yield {"type": "chunk", **chunk}
+        yield {
+            "type": "trailer",
+            "document_id": cached["document_id"],
+            "filename": filename,
+            "total_pages": cached["total_pages"],
+            "total_chunks": cached["total_chunks"],
+            "skipped_pages": cached.get("skipped_pages", []),
+            "deduplicated": True
+        }
+        return
+
+    chunker = SpanChunker(
+        chunk_size=settings.CHUNK_SIZE,
+        overlap=settings.CHUNK_OVERLAP,
+        boundary=settings.CHUNK_BOUNDARY,
+        mode=settings.CHUNK_MODE
+    )
+    rows = []
+    total_pages = 0
+    skipped_pages = []
+
+    def to_rows(chunks) -> list[dict]:
+        new_rows = [
             {
-                "id": doc.id,
-                "filename": doc.filename,
-                "total_pages": doc.total_pages,
-                "total_chunks": doc.total_chunks,
-                "uploaded_at": doc.uploaded_at.isoformat()
+                "ordinal": len(rows) + i,
+                "page_start": span.page_start,
+                "page_end": span.page_end,
+                "char_start": span.start,
+                "char_end": span.end,
+                "text": text
             }
-            for doc in docs
+            for i, (span, text) in enumerate(chunks)
         ]
+        rows.extend(new_rows)
+        return new_rows
+
+    # Extract pages in order and chunk each one as it arrives. Time spent by
+    # the consumer of the yielded chunks is excluded from both stages.
+    extract_seconds = chunk_seconds = 0.0
+    waiting_since = time.perf_counter()
+    async for page_number, text in extraction_executor.iter_pages(
+        path, on_progress=on_progress, eager=eager,
+        on_skipped_page=lambda page, reason: skipped_pages.append({"page": page, "reason": reason}),
+        mode=extractor
+    ):
+        extract_seconds += time.perf_counter() - waiting_since
+        total_pages += 1
+        started = time.perf_counter()
+        new_rows = to_rows(chunker.feed(page_number, text))
+        chunk_seconds += time.perf_counter() - started
+        for row in new_rows:
+            yield {"type": "chunk", **chunk_record(row)}
+        waiting_since = time.perf_counter()
+    started = time.perf_counter()
+    new_rows = to_rows(chunker.finish())
+    chunk_seconds += time.perf_counter() - started
+    for row in new_rows:
+        yield {"type": "chunk", **chunk_record(row)}
+
+    STAGE_SECONDS.labels(stage="extract").observe(extract_seconds)
+    STAGE_SECONDS.labels(stage="chunk").observe(chunk_seconds)
+    PDF_PAGES.observe(total_pages)
+    CHUNKS_PER_DOCUMENT.observe(len(rows))
+    if extract_seconds > 0:
+        EXTRACTION_PAGES_PER_SECOND.observe(total_pages / extract_seconds)
+
+    started = time.perf_counter()
+    document_id, deduplicated = await save_document(filename, content_hash, total_pages, rows)
+    STAGE_SECONDS.labels(stage="commit").observe(time.perf_counter() - started)
+    logger.info(
+        "Processed %s: %d pages, %d chunks, %d pages skipped (extract %.3fs, chunk %.3fs)",
+        filename, total_pages, len(rows), len(skipped_pages), extract_seconds, chunk_seconds
+    )
+    chunk_cache.put(
+        content_hash, {**chunk_result(document_id, filename, total_pages, rows), "skipped_pages": skipped_pages}
+    )
+    if not deduplicated:
+        chunk_indexer.submit(document_id, rows)
+
+    yield {
+        "type": "trailer",
+        "document_id": document_id,
+        "filename": filename,
+        "total_pages": total_pages,
+        "total_chunks": len(rows),
+        "skipped_pages": skipped_pages,
+        "deduplicated": deduplicated
+    }
+
+
+async def ingest_document(filename: str, path: str, content_hash: str,
+                          on_progress: Optional[Callable[[int, int], None]] = None,
+                          extractor: Optional[str] = None) -> dict:
+    """
+    Extract, chunk and record a PDF.
+
+    Shared by the synchronous ``/process_pdf`` path and the job queue workers.
+
+    Returns:
+        Processing result matching ``ProcessPDFResponse``
+    """
+    chunks = []
+    async for record in iter_ingestion(filename, path, content_hash, on_progress=on_progress, extractor=extractor):
+        if record.pop("type") == "chunk":
+            chunks.append(record)
+        else:
+            trailer = record
+    return {**trailer, "chunks": chunks}
+
+
+async def stream_ndjson(filename: str, path: str, content_hash: str,
+                       extractor: Optional[str] = None) -> AsyncIterator[bytes]:
+    """
+    Serialise an ingestion as newline-delimited JSON.
+
+    Emits a header record, one record per chunk and a trailer with totals.
+    Errors after the response has started are reported as an error record.
+    The spooled upload is deleted when the stream ends.
+    """
+    try:
+        yield json.dumps({"type": "header", "filename": filename, "content_sha256": content_hash}).encode() + b"\n"
+        serialize_seconds = 0.0
+        try:
+            async for record in iter_ingestion(filename, path, content_hash, eager=True, extractor=extractor):
+                started = time.perf_counter()
+                line = json.dumps(record).encode() + b"\n"
+                serialize_seconds += time.perf_counter() - started
+                yield line
+        except Exception as e:
+            logger.error("Streaming %s failed: %s", filename, e)
+            yield json.dumps({"type": "error", "detail": f"PDF processing failed: {str(e)}"}).encode() + b"\n"
+        STAGE_SECONDS.labels(stage="serialize").observe(serialize_seconds)
     finally:
-        db.close()
+        discard_upload(path)
 
 
-@app.post("/process_pdf", response_model=ProcessPDFResponse)
-async def process_pdf(file: UploadFile = File(...)):
+async def run_ingestion_job(job: Job, payload: tuple[str, str, Optional[str]]) -> dict:
+    """Job queue handler: ingest a queued upload and report page progress."""
+    path, content_hash, extractor = payload
+    try:
+        return await ingest_document(
+            job.filename, path, content_hash, on_progress=job.update_progress, extractor=extractor
+        )
+    finally:
+        discard_upload(path)
+
+
+# Uploads submitted with ?async=true are processed by background workers
+job_queue = JobQueue(
+    run_ingestion_job,
+    workers=settings.JOB_WORKERS,
+    max_queued=settings.JOB_QUEUE_SIZE,
+    result_ttl=settings.JOB_RESULT_TTL,
+)
+
+
+@app.post(
+    "/process_pdf",
+    response_model=ProcessPDFResponse,
+    responses={202: {"model": JobAcceptedResponse}, 503: {"description": "Job queue is full"}}
+)
+async def process_pdf(file: UploadFile = File(...), async_mode: bool = Query(False, alias="async"),
+                      extractor: Optional[Literal["layout", "fast", "auto"]] = Query(None),
+                      accept: Optional[str] = Header(None)):
     """
     Extract text from PDF file and return text chunks.
 
-    The PDF is processed page-by-page, then all text is combined and split
-    into overlapping chunks suitable for embeddings and retrieval.
+    Pages are extracted in parallel on the extraction pool and chunked
+    incrementally, in page order, as each one arrives: overlapping chunks
+    suitable for embeddings and retrieval, each with the ``page_start`` and
+    ``page_end`` it spans. Uploads are deduplicated by SHA-256: repeating an
+    upload returns the earlier result without parsing the PDF again.
+
+    With ``?async=true`` the upload is queued instead and ``202 Accepted`` is
+    returned with a job id to poll at ``/jobs/{job_id}``. When the queue is
+    full the request is refused with ``503`` and a ``Retry-After`` header.
+
+    With ``Accept: application/x-ndjson`` the result is streamed instead: a
+    header record, each chunk as soon as its page is extracted, then a
+    trailer with the totals.
+
+    ``?extractor=layout|fast|auto`` overrides the extraction backend
+    (``EXTRACTION_MODE``) for this upload. Repeated uploads of the same
+    content return the earlier result whatever the backend.
     """
     if not file.filename.endswith('.pdf'):
         raise HTTPException(
@@ -85,63 +575,74 @@ async def process_pdf(file: UploadFile = File(...)):
             detail="Only PDF files are allowed"
         )
 
-    content = await file.read()
+    started = time.perf_counter()
+    path, content_hash, size = await spool_and_hash(file, upload_spool_dir)
+    STAGE_SECONDS.labels(stage="read").observe(time.perf_counter() - started)
+    PDF_BYTES.observe(size)
+    logger.info("Received %s (%d bytes)", file.filename, size)
 
-    try:
-        # Extract text from PDF
-        with pdfplumber.open(BytesIO(content)) as pdf:
-            text_by_page = []
-            for page_num, page in enumerate(pdf.pages, start=1):
-                text = page.extract_text()
-                if text:
-                    text_by_page.append({
-                        "page": page_num,
-                        "text": text
-                    })
-
-        # Combine all pages into single text
-        full_text = " ".join([page["text"] for page in text_by_page])
-
-        # Chunk the text
-        chunks = chunk_text(
-            full_text,
-            chunk_size=settings.CHUNK_SIZE,
-            overlap=settings.CHUNK_OVERLAP
-        )
-
-        # Save metadata to database
-        db = SessionLocal()
+    if async_mode:
         try:
-            doc = Document(
-                filename=file.filename,
-                total_pages=len(text_by_page),
-                total_chunks=len(chunks)
+            job = job_queue.submit(file.filename, (path, content_hash, extractor))
+        except QueueFullError as e:
+            discard_upload(path)
+            raise HTTPException(
+                status_code=503,
+                detail="Ingestion queue is full. Please retry later.",
+                headers={"Retry-After": str(e.retry_after)}
             )
-            db.add(doc)
-            db.commit()
-            db.refresh(doc)
-            document_id = doc.id
-        finally:
-            db.close()
+        return JSONResponse(
+            status_code=202,
+            content={"job_id": job.id, "status": job.status.value, "status_url": f"/jobs/{job.id}"}
+        )
 
-        # Build response
-        return {
-            "document_id": document_id,
-            "filename": file.filename,
-            "total_pages": len(text_by_page),
-            "total_chunks": len(chunks),
-            "chunks": [
-                {
-                    "chunk_id": i,
-                    "text": chunk,
-                    "char_count": len(chunk)
-                }
-                for i, chunk in enumerate(chunks)
-            ]
-        }
+    if accept and NDJSON_MEDIA_TYPE in accept:
+        return StreamingResponse(
+            stream_ndjson(file.filename, path, content_hash, extractor),
+            media_type=NDJSON_MEDIA_TYPE
+        )
 
+    try:
+        result = await ingest_document(file.filename, path, content_hash, extractor=extractor)
     except Exception as e:
+        logger.error("Processing %s failed: %s", file.filename, e)
         raise HTTPException(
             status_code=500,
             detail=f"PDF processing failed: {str(e)}"
         )
+    finally:
+        discard_upload(path)
+
+    started = time.perf_counter()
+    body = ProcessPDFResponse.model_validate(result).model_dump_json()
+    STAGE_SECONDS.labels(stage="serialize").observe(time.perf_counter() - started)
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """
+    Report the state of an asynchronous ingestion job.
+
+    Includes page progress while the job runs and the processing result once
+    it has succeeded.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {
+        "job_id": job.id,
+        "status": job.status.value,
+        "filename": job.filename,
+        "pages_done": job.pages_done,
+        "pages_total": job.pages_total,
+        "queue_position": job_queue.position(job.id),
+        "result": job.result,
+        "error": job.error,
+        "created_at": datetime.fromtimestamp(job.created_at, timezone.utc).isoformat(),
+        "finished_at": (
+            datetime.fromtimestamp(job.finished_at, timezone.utc).isoformat()
+            if job.finished_at else None
+        ),
+    }
@@ -2,7 +2,7 @@
 SQLAlchemy database models.
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, Text, UniqueConstraint
 
 from database import Base
 
@@ -14,17 +14,56 @@ class Document(Base):
     Attributes:
         id: Primary key
         filename: Original filename of uploaded document
+        content_sha256: SHA-256 of the uploaded bytes, used for deduplication
         total_pages: Number of pages in the PDF
         total_chunks: Number of text chunks created
         uploaded_at: Timestamp when document was processed
     """
     __tablename__ = "documents"
+    __table_args__ = (
+        # Keyset pagination of the document listing, newest first
+        Index("ix_documents_uploaded_at_id", "uploaded_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, index=True)
+    content_sha256 = Column(String(64), unique=True, index=True, nullable=True)
     total_pages = Column(Integer)
     total_chunks = Column(Integer)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
 
     def __repr__(self):
         return f"<Document(id={self.id}, filename='{self.filename}')>"
+
+
+class Chunk(Base):
+    """
+    Stores the text chunks extracted from a document.
+
+    Attributes:
+        id: Primary key
+        document_id: Document the chunk belongs to
+        ordinal: Position of the chunk within the document (0-based)
+        page_start: PDF page the chunk starts on
+        page_end: PDF page the chunk ends on
+        char_start: Offset of the chunk start in the document text
+        char_end: Offset just past the chunk end in the document text
+        text: Chunk text
+    """
+    __tablename__ = "chunks"
+    __table_args__ = (
+        UniqueConstraint("document_id", "ordinal", name="uq_chunks_document_ordinal"),
+        Index("ix_chunks_document_page", "document_id", "page_start"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    ordinal = Column(Integer, nullable=False)
+    page_start = Column(Integer, nullable=False)
+    page_end = Column(Integer, nullable=False)
+    char_start = Column(Integer, nullable=False)
+    char_end = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+
+    def __repr__(self):
+        return f"<Chunk(document_id={self.document_id}, ordinal={self.ordinal})>"
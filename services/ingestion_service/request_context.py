@@ -0,0 +1,37 @@
+"""
+Request IDs for tracing one request across services.
+
+The API gateway generates an ``X-Request-ID`` for every request and sends it
+with its calls to this service. The ID is bound to a context variable for
+the duration of the request, so every log line written while handling it
+carries the same ID as the gateway's log lines.
+"""
+import logging
+import uuid
+from contextvars import ContextVar
+
+REQUEST_ID_HEADER = "X-Request-ID"
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] - %(message)s"
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+
+def new_request_id() -> str:
+    return str(uuid.uuid4())
+
+
+class RequestIdFilter(logging.Filter):
+    """Add the current request ID to log records as ``request_id``."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return True
+
+
+def configure_logging(level: int = logging.INFO) -> None:
+    """Log with the request ID of the request being handled ("-" outside requests)."""
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+    for handler in logging.getLogger().handlers:
+        if not any(isinstance(f, RequestIdFilter) for f in handler.filters):
+            handler.addFilter(RequestIdFilter())
@@ -2,6 +2,8 @@
 Pydantic schemas for API request/response validation.
 """
 from datetime import datetime
+from typing import Optional
+
 from pydantic import BaseModel
 
 
@@ -10,6 +12,14 @@ class ChunkResponse(BaseModel):
     chunk_id: int
     text: str
     char_count: int
+    page_start: Optional[int] = None
+    page_end: Optional[int] = None
+
+
+class SkippedPage(BaseModel):
+    """A page whose text could not be extracted within the extraction budgets."""
+    page: int
+    reason: str  # timeout, deadline, memory, error or crashed
 
 
 class ProcessPDFResponse(BaseModel):
@@ -19,6 +29,29 @@ class ProcessPDFResponse(BaseModel):
     total_pages: int
     total_chunks: int
     chunks: list[ChunkResponse]
+    skipped_pages: list[SkippedPage] = []
+    deduplicated: bool = False  # True when the same content was uploaded before
+
+
+class JobAcceptedResponse(BaseModel):
+    """Schema for an upload accepted for asynchronous processing."""
+    job_id: str
+    status: str
+    status_url: str
+
+
+class JobStatusResponse(BaseModel):
+    """Schema for the state of an asynchronous ingestion job."""
+    job_id: str
+    status: str  # queued, running, succeeded or failed
+    filename: str
+    pages_done: int
+    pages_total: Optional[int] = None
+    queue_position: Optional[int] = None  # 1-based, while queued
+    result: Optional[ProcessPDFResponse] = None
+    error: Optional[str] = None
+    created_at: str  # ISO format datetime string
+    finished_at: Optional[str] = None
 
 
 class DocumentListItem(BaseModel):
@@ -33,6 +66,24 @@ class DocumentListItem(BaseModel):
         from_attributes = True  # Allows creation from SQLAlchemy models
 
 
+class StoredChunk(BaseModel):
+    """Schema for a chunk read back from the database."""
+    ordinal: int
+    page_start: int
+    page_end: int
+    char_start: int
+    char_end: int
+    text: str
+
+
+class DocumentChunksResponse(BaseModel):
+    """Schema for a page of a document's stored chunks."""
+    document_id: int
+    total_chunks: int
+    chunks: list[StoredChunk]
+    next_after: Optional[int] = None  # Pass as ``after`` to fetch the next page
+
+
 class HealthResponse(BaseModel):
     """Schema for health check response."""
     status: str
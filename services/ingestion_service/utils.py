@@ -1,6 +1,30 @@
 """
 Utility functions for text processing.
+
+Chunking works on spans: ``(start, end, page_start, page_end)`` offsets into
+the document text rather than copies of it. Spans are produced lazily, so
+only the chunk currently being consumed is ever materialised, and every
+chunk knows which PDF pages it came from.
 """
+import re
+from bisect import bisect_right
+from typing import Iterator, NamedTuple, Optional
+
+BOUNDARY_MODES = ("none", "whitespace", "sentence")
+CHUNK_MODES = ("chars", "tokens")
+
+_TOKEN = re.compile(r"\S+")
+_WORD_START = re.compile(r"(?<!\S)\S")
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*(?=\s)")
+_SENTENCE_TOKEN = re.compile(r"[.!?][\"')\]]*$")
+
+
+class ChunkSpan(NamedTuple):
+    """Location of a chunk in the document text (``end`` is exclusive)."""
+    start: int
+    end: int
+    page_start: int
+    page_end: int
 
 
 def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 100) -> list[str]:
@@ -8,7 +32,9 @@ def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 100) -> list[st
     Split text into overlapping chunks.
 
     This function creates overlapping chunks to preserve context across boundaries,
-    which is important for semantic search and LLM processing.
+    which is important for semantic search and LLM processing. The last chunk
+    always ends at the end of the text, so no trailing chunk made up only of
+    overlap is produced.
 
     Args:
         text: The text to chunk
@@ -26,16 +52,245 @@ def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 100) -> list[st
         >>> len(chunks[0])
         1000
     """
-    if not text:
-        return []
+    return [
+        text[span.start:span.end]
+        for span in iter_chunk_spans(text, [0], [1], chunk_size=chunk_size, overlap=overlap)
+    ]
+
+
+def join_pages(text_by_page: list[dict], separator: str = " ") -> tuple[str, list[int]]:
+    """
+    Join page texts into one string, recording where each page starts.
+
+    Args:
+        text_by_page: ``{"page": number, "text": text}`` dicts in page order
+        separator: String placed between pages
+
+    Returns:
+        Tuple of (joined text, start offset of each page in the joined text)
+    """
+    page_starts = []
+    offset = 0
+    for page in text_by_page:
+        page_starts.append(offset)
+        offset += len(page["text"]) + len(separator)
+    return separator.join(page["text"] for page in text_by_page), page_starts
+
+
+def page_index_at(page_starts: list[int], offset: int) -> int:
+    """
+    Return the index of the page containing a character offset.
+
+    A separator between pages counts towards the preceding page.
+    """
+    return max(bisect_right(page_starts, offset) - 1, 0)
+
+
+def _snap_end(text: str, start: int, hard_end: int, boundary: str) -> int:
+    """Move a chunk end back to a sentence or word boundary in its second half."""
+    if boundary == "none" or text[hard_end].isspace():
+        return hard_end
+
+    low = start + (hard_end - start) // 2
+    if boundary == "sentence":
+        last = None
+        for last in _SENTENCE_END.finditer(text, low, hard_end):
+            pass
+        if last is not None:
+            return last.end()
+
+    cut = max(text.rfind(" ", low, hard_end), text.rfind("\n", low, hard_end), text.rfind("\t", low, hard_end))
+    return cut if cut > start else hard_end
+
+
+def _snap_start(text: str, start: int, end: int, boundary: str) -> int:
+    """Move a chunk start forward to the beginning of a word."""
+    if boundary == "none":
+        return start
+    match = _WORD_START.search(text, start, end)
+    return match.start() if match else start
+
+
+def _find_span(text: str, start: int, chunk_size: int, overlap: int, boundary: str,
+               mode: str, final: bool) -> Optional[tuple[int, Optional[int]]]:
+    """
+    Locate the chunk beginning at ``text[start]``.
+
+    Args:
+        final: Whether ``text`` holds the rest of the document; if not, spans
+            that might still grow are not returned
+
+    Returns:
+        ``(end, next_start)`` with ``next_start`` None for the last chunk, or
+        None if more text is needed to decide
+    """
+    if mode == "tokens":
+        tokens = []
+        for match in _TOKEN.finditer(text, start):
+            tokens.append(match.span())
+            if len(tokens) > chunk_size:
+                break
+
+        if len(tokens) <= chunk_size:
+            if not final or not tokens:
+                return None
+            return tokens[-1][1], None
+
+        last = chunk_size - 1
+        if boundary == "sentence":
+            for i in range(chunk_size - 1, chunk_size // 2 - 1, -1):
+                if _SENTENCE_TOKEN.search(text, *tokens[i]):
+                    last = i
+                    break
+        next_token = max(last + 1 - overlap, 1)
+        return tokens[last][1], tokens[next_token][0]
+
+    hard_end = start + chunk_size
+    if hard_end >= len(text):
+        if not final:
+            return None
+        return len(text), None
+
+    end = _snap_end(text, start, hard_end, boundary)
+    next_start = _snap_start(text, max(end - overlap, start + 1), end, boundary)
+    return end, next_start
+
 
-    chunks = []
-    start = 0
+def _validate(chunk_size: int, overlap: int, boundary: str, mode: str) -> None:
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    if overlap < 0:
+        raise ValueError("overlap must not be negative")
+    if boundary not in BOUNDARY_MODES:
+        raise ValueError(f"Unknown boundary mode: {boundary}")
+    if mode not in CHUNK_MODES:
+        raise ValueError(f"Unknown chunk mode: {mode}")
+
+
+def iter_chunk_spans(text: str, page_starts: list[int], page_numbers: list[int],
+                     chunk_size: int = 1000, overlap: int = 100,
+                     boundary: str = "none", mode: str = "chars") -> Iterator[ChunkSpan]:
+    """
+    Lazily yield overlapping chunk spans over a single text buffer.
+
+    Args:
+        text: Document text, e.g. from ``join_pages``
+        page_starts: Offset in ``text`` where each page starts
+        page_numbers: PDF page number of each entry in ``page_starts``
+        chunk_size: Chunk size in characters, or in whitespace-separated
+            tokens when ``mode="tokens"``
+        overlap: Overlap between consecutive chunks, in the same unit
+        boundary: ``"none"`` cuts anywhere, ``"whitespace"`` avoids splitting
+            words and ``"sentence"`` prefers ending at a sentence end
+        mode: ``"chars"`` or ``"tokens"``
+
+    Yields:
+        ``ChunkSpan`` objects; slice ``text[span.start:span.end]`` for the text
+    """
+    _validate(chunk_size, overlap, boundary, mode)
 
+    start = _snap_start(text, 0, len(text), boundary)
     while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk)
-        start = end - overlap
+        found = _find_span(text, start, chunk_size, overlap, boundary, mode, final=True)
+        if found is None:
+            return
+        end, next_start = found
+        yield ChunkSpan(
+            start, end,
+            page_numbers[page_index_at(page_starts, start)],
+            page_numbers[page_index_at(page_starts, end - 1)],
+        )
+        if next_start is None:
+            return
+        start = next_start
+
+
+class SpanChunker:
+    """
+    Incremental, page-at-a-time version of ``iter_chunk_spans``.
+
+    Pages are fed as they are extracted and chunks are emitted as soon as
+    they are complete. Text before the next chunk start is dropped, so the
+    buffer only ever holds about one chunk of text.
+
+    Args:
+        chunk_size: See ``iter_chunk_spans``
+        overlap: See ``iter_chunk_spans``
+        boundary: See ``iter_chunk_spans``
+        mode: See ``iter_chunk_spans``
+        separator: String placed between pages
+    """
+
+    def __init__(self, chunk_size: int = 1000, overlap: int = 100,
+                 boundary: str = "none", mode: str = "chars", separator: str = " "):
+        _validate(chunk_size, overlap, boundary, mode)
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.boundary = boundary
+        self.mode = mode
+        self.separator = separator
+        self.page_starts: list[int] = []
+        self.page_numbers: list[int] = []
+        self._buffer = ""
+        self._base = 0  # Document offset of self._buffer[0]
+        self._start: Optional[int] = None  # Document offset of the next chunk
+        self._done = False
+
+    @property
+    def length(self) -> int:
+        """Length of the document text fed so far."""
+        return self._base + len(self._buffer)
+
+    def feed(self, page_number: int, text: str) -> list[tuple[ChunkSpan, str]]:
+        """
+        Add the text of the next page.
+
+        Returns:
+            ``(span, chunk text)`` pairs for chunks completed by this page
+        """
+        # Empty pages still take a separator, as in ``join_pages``
+        if self.page_starts:
+            self._buffer += self.separator
+        self.page_starts.append(self.length)
+        self.page_numbers.append(page_number)
+        self._buffer += text
+        return self._emit(final=False)
+
+    def finish(self) -> list[tuple[ChunkSpan, str]]:
+        """Flush the remaining chunks once all pages have been fed."""
+        return self._emit(final=True)
+
+    def _emit(self, final: bool) -> list[tuple[ChunkSpan, str]]:
+        chunks = []
+        if self._start is None:
+            if self.boundary != "none" and not final and not _WORD_START.search(self._buffer):
+                # Only blank pages so far: the first chunk starts at a word still to come
+                return chunks
+            self._start = self._base + _snap_start(self._buffer, 0, len(self._buffer), self.boundary)
+
+        while not self._done and self._start < self.length:
+            relative = self._start - self._base
+            found = _find_span(self._buffer, relative, self.chunk_size, self.overlap,
+                               self.boundary, self.mode, final)
+            if found is None:
+                break
+            end, next_start = found
+            chunks.append((
+                ChunkSpan(
+                    self._start, self._base + end,
+                    self.page_numbers[page_index_at(self.page_starts, self._start)],
+                    self.page_numbers[page_index_at(self.page_starts, self._base + end - 1)],
+                ),
+                self._buffer[relative:end],
+            ))
+            if next_start is None:
+                self._done = True
+            else:
+                self._start = self._base + next_start
 
-    return chunks
+        # Drop text no later chunk can reach
+        consumed = self._start - self._base
+        if consumed > 0:
+            self._buffer = self._buffer[consumed:]
+            self._base = self._start
+        return chunks
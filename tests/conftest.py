@@ -1,10 +1,146 @@
 """
 Pytest configuration and shared fixtures.
 """
+import importlib.util
+import os
 import pytest
 import sys
+import tempfile
 from pathlib import Path
 
-# Add project root to Python path
+import httpx
+
+# Add project root and the services' directories to Python path; services use
+# flat imports, and the API Gateway's comes first so ``import main`` is its own
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
+for service in ("embeddings_service", "ingestion_service", "api_gateway"):
+    sys.path.insert(0, str(project_root / "services" / service))
+
+# Keep test databases out of the working tree and extraction in-process
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/documents.db")
+os.environ.setdefault("EXTRACTION_EXECUTOR", "thread")
+os.environ.setdefault("EMBED_CACHE_PATH", f"{tempfile.mkdtemp()}/embedding_cache.db")
+os.environ.setdefault("VECTOR_STORE_PATH", f"{tempfile.mkdtemp()}/vectors")
+
+# Accepted by the API Gateway's default configuration
+API_KEY = "dev-key-change-in-production"
+
+
+def _load_service_main(service: str, module_name: str):
+    """Import a service's ``main.py`` under a unique module name, once per session."""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    spec = importlib.util.spec_from_file_location(module_name, project_root / "services" / service / "main.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def ingestion_main():
+    """
+    The ingestion service's ``main`` module.
+
+    It is registered as ``ingestion_main`` so it does not clash with the API
+    Gateway's ``main`` module.
+    """
+    return _load_service_main("ingestion_service", "ingestion_main")
+
+
+@pytest.fixture(scope="session")
+def embeddings_main():
+    """The embeddings service's ``main`` module, registered as ``embeddings_main``."""
+    return _load_service_main("embeddings_service", "embeddings_main")
+
+
+@pytest.fixture(scope="session")
+def gateway_main():
+    """The API Gateway's ``main`` module."""
+    import main
+
+    return main
+
+
+@pytest.fixture
+def api_headers():
+    """Headers authenticating a request to the API Gateway."""
+    return {"X-API-Key": API_KEY}
+
+
+@pytest.fixture
+def mock_upstream(gateway_main):
+    """
+    Fixture returning ``install(handler, services=("ingestion",))``, which
+    sends the gateway's calls to the named upstream services to an
+    ``httpx.MockTransport`` handler instead. The gateway's own clients are
+    restored afterwards.
+    """
+    replaced = set()
+
+    def install(handler, services=("ingestion",)) -> httpx.AsyncClient:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        for service in services:
+            setattr(gateway_main.app.state, f"{service}_client", client)
+            replaced.add(service)
+        return client
+
+    yield install
+    for service in replaced:
+        setattr(gateway_main.app.state, f"{service}_client", None)
+
+
+def build_pdf(pages: list[str]) -> bytes:
+    """
+    Build a minimal, valid PDF with one Helvetica text page per entry.
+
+    Lines within a page are separated by newlines. Used to exercise the
+    extraction pipeline without shipping binary fixtures.
+    """
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = add(None)
+    page_ids = []
+    for text in pages:
+        ops = ["BT", "/F1 11 Tf", "14 TL", "72 750 Td"]
+        for line in text.split("\n"):
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            ops.append(f"({escaped}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, content_id, font_id)
+        ))
+
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref
+    )
+    return bytes(out)
+
+
+@pytest.fixture
+def make_pdf():
+    """Fixture returning the ``build_pdf`` helper."""
+    return build_pdf
@@ -0,0 +1,162 @@
+"""
+Tests for API Gateway - Admission Control.
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import auth
+from admission import AdmissionController, ConcurrencyLimiter
+from auth import ApiKey, parse_api_keys
+
+
+@pytest.fixture
+def keys(monkeypatch, gateway_main):
+    """Two clients with tight limits, and a fresh admission controller."""
+    keys = parse_api_keys("lab:lab-key:1:2:1,ci:ci-key:0::1")
+    monkeypatch.setattr(auth, "api_keys", keys)
+    monkeypatch.setattr(gateway_main, "admission", AdmissionController(
+        max_in_flight=10, max_queued=0, queue_timeout=0.0
+    ))
+    return keys
+
+
+@pytest.fixture
+def slow_upstream(mock_upstream):
+    """Mock ingestion service that holds each upload until ``release`` is set."""
+    state = {"release": asyncio.Event(), "received": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        state["received"] += 1
+        await state["release"].wait()
+        return httpx.Response(200, json={"document_id": 1, "total_chunks": 1})
+
+    mock_upstream(handler)
+    return state
+
+
+def _client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://gateway")
+
+
+async def _wait_for(condition):
+    while not condition():
+        await asyncio.sleep(0.01)
+
+
+def test_parse_api_keys():
+    """Test per-key limits, defaults, the API_KEY fallback and malformed entries."""
+    keys = parse_api_keys("lab:s3cret:5:10:2, ci:t0ken::3")
+
+    assert keys["s3cret"] == ApiKey("lab", "s3cret", 5.0, 10, 2)
+    assert keys["t0ken"].burst == 3
+    assert keys["t0ken"].rate_per_second == auth.DEFAULT_RATE_LIMIT_PER_SECOND
+    assert parse_api_keys("", "legacy") == {"legacy": ApiKey("default", "legacy")}
+    with pytest.raises(ValueError):
+        parse_api_keys("no-key-field")
+
+
+def test_missing_and_unknown_keys_are_rejected(keys, gateway_main):
+    """Test that authentication failures return 401/403 rather than errors."""
+    client = TestClient(gateway_main.app)
+
+    assert client.get("/info").status_code == 401
+    assert client.get("/info", headers={"X-API-Key": "dev-key-change-in-production"}).status_code == 403
+    assert client.get("/info", headers={"X-API-Key": "ci-key"}).status_code == 200
+    assert client.get("/health").status_code == 200
+
+
+def test_rate_limit_is_per_key(keys, gateway_main):
+    """Test that a key over its burst gets 429 with Retry-After and others are unaffected."""
+    client = TestClient(gateway_main.app)
+    lab = {"X-API-Key": "lab-key"}
+
+    assert [client.get("/info", headers=lab).status_code for _ in range(2)] == [200, 200]
+    limited = client.get("/info", headers=lab)
+
+    assert limited.status_code == 429
+    assert limited.headers["Retry-After"] == "1"
+    assert all(client.get("/info", headers={"X-API-Key": "ci-key"}).status_code == 200 for _ in range(5))
+
+
+async def test_concurrent_uploads_are_capped_per_key(keys, slow_upstream, make_pdf, gateway_main):
+    """Test that a second upload from the same key is shed while the first is in progress."""
+    files = {"file": ("a.pdf", make_pdf(["admission"]), "application/pdf")}
+
+    async with _client(gateway_main.app) as client:
+        first = asyncio.create_task(client.post("/upload", headers={"X-API-Key": "ci-key"}, files=files))
+        await _wait_for(lambda: slow_upstream["received"] == 1)
+
+        rejected = await client.post("/upload", headers={"X-API-Key": "ci-key"}, files=files)
+        other_key = asyncio.create_task(client.post("/upload", headers={"X-API-Key": "lab-key"}, files=files))
+        await _wait_for(lambda: slow_upstream["received"] == 2)
+        slow_upstream["release"].set()
+
+        assert rejected.status_code == 429
+        assert rejected.headers["Retry-After"] == "1"
+        assert (await first).status_code == 200
+        assert (await other_key).status_code == 200
+        # The slot is returned once the upload finishes
+        assert (await client.post("/upload", headers={"X-API-Key": "ci-key"}, files=files)).status_code == 200
+
+
+async def test_global_limit_sheds_load_with_503(keys, slow_upstream, make_pdf, monkeypatch, gateway_main):
+    """Test that requests beyond the in-flight limit and its queue get 503."""
+    monkeypatch.setattr(gateway_main, "admission", AdmissionController(
+        max_in_flight=1, max_queued=1, queue_timeout=0.05, retry_after=2
+    ))
+    files = {"file": ("a.pdf", make_pdf(["admission"]), "application/pdf")}
+
+    async with _client(gateway_main.app) as client:
+        upload = asyncio.create_task(client.post("/upload", headers={"X-API-Key": "ci-key"}, files=files))
+        await _wait_for(lambda: slow_upstream["received"] == 1)
+
+        overloaded = await client.get("/info", headers={"X-API-Key": "ci-key"})
+        slow_upstream["release"].set()
+        await upload
+
+        assert overloaded.status_code == 503
+        assert overloaded.headers["Retry-After"] == "2"
+        assert (await client.get("/info", headers={"X-API-Key": "ci-key"})).status_code == 200
+
+
+async def test_concurrency_limiter_queue():
+    """Test that waiters get released slots in order and the queue is bounded."""
+    limiter = ConcurrencyLimiter(limit=1, max_queued=1, max_wait=1.0)
+    assert await limiter.acquire()
+
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert await limiter.acquire() is False  # queue full
+    limiter.release()
+    assert await waiter is True
+    assert limiter.in_flight == 1
+
+    limiter.max_wait = 0.01
+    assert await limiter.acquire() is False  # timed out
+    limiter.release()
+    assert limiter.in_flight == 0
+
+
+async def test_batch_files_each_take_an_upload_slot(keys, slow_upstream, make_pdf, gateway_main):
+    """Test that a batch cannot exceed the key's upload cap, and files find no slot while it is used."""
+    pdf = make_pdf(["admission"])
+    batch_files = [("files", (f"doc{i}.pdf", pdf, "application/pdf")) for i in range(3)]
+    ci = {"X-API-Key": "ci-key"}
+
+    async with _client(gateway_main.app) as client:
+        batch = asyncio.create_task(client.post("/upload/batch", headers=ci, files=batch_files))
+        await _wait_for(lambda: slow_upstream["received"] == 1)
+        await asyncio.sleep(0.05)
+        # One upload slot, so the batch forwards one file at a time
+        assert slow_upstream["received"] == 1
+        rejected = await client.post("/upload", headers=ci, files={"file": ("a.pdf", pdf, "application/pdf")})
+        slow_upstream["release"].set()
+        results = [json.loads(line) for line in (await batch).text.splitlines()]
+
+    assert rejected.status_code == 429
+    assert [r["status"] for r in results if r["type"] == "result"] == ["succeeded"] * 3
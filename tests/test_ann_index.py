@@ -0,0 +1,115 @@
+"""
+Tests for Embeddings Service - IVF Approximate Nearest-Neighbour Index.
+"""
+import threading
+
+import numpy as np
+from fastapi.testclient import TestClient
+from starlette.datastructures import State
+
+from ann_index import IVFIndex
+from vector_store import VectorStore, normalize_rows
+
+
+def _clustered(n, dimension=32, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension))
+    vectors = centers[rng.integers(clusters, size=n)] + 0.3 * rng.standard_normal((n, dimension))
+    return normalize_rows(vectors)
+
+
+def _ids(n, document_id=1):
+    return np.column_stack([np.full(n, document_id), np.arange(n)])
+
+
+def test_ivf_recall_improves_with_nprobe():
+    """Test that probing every cell is exact and a few cells give high recall."""
+    vectors = _clustered(3000)
+    queries = _clustered(50, seed=1)
+    index = IVFIndex(32, nlist=32)
+    index.train(vectors)
+    index.add(vectors, _ids(3000))
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :10]
+
+    def recall(nprobe):
+        results = index.search(queries, k=10, nprobe=nprobe)
+        return np.mean([
+            len({hit.ordinal for hit in hits} & set(expected)) / 10
+            for hits, expected in zip(results, exact.tolist())
+        ])
+
+    assert index.ntotal == 3000
+    assert recall(32) == 1.0
+    assert recall(8) >= 0.9
+
+
+def test_ivf_incremental_add_and_persistence(tmp_path):
+    """Test that vectors added after training are searchable and survive a reload."""
+    vectors = _clustered(600)
+    index = IVFIndex(32, nlist=8)
+    index.train(vectors[:500])
+    index.add(vectors[:500], _ids(500))
+    index.save(str(tmp_path / "ivf"))
+
+    loaded = IVFIndex.load(str(tmp_path / "ivf"))
+    loaded.add(vectors[500:], _ids(100, document_id=2))
+
+    hit = loaded.search(vectors[550], k=1, nprobe=8)[0][0]
+    assert (hit.document_id, hit.ordinal) == (2, 50)
+    assert loaded.ntotal == 600
+    assert {h.document_id for h in loaded.search(vectors[0], k=5, nprobe=8, document_ids=[2])[0]} == {2}
+
+
+def test_search_uses_ann_index_and_exact_tail(tmp_path, monkeypatch, embeddings_main):
+    """Test that rows not yet in the IVF index are still found."""
+    store = VectorStore(str(tmp_path / "vectors"), dimension=32)
+    vectors = _clustered(400)
+    store.add(1, range(300), vectors[:300])
+    state = State({"vector_store": store, "ann_index": None})
+    monkeypatch.setattr(embeddings_main, "ANN_MIN_VECTORS", 100)
+    monkeypatch.setattr(embeddings_main, "ANN_INDEX_PATH", str(tmp_path / "ivf"))
+
+    embeddings_main.sync_ann_index(state)
+    assert state.ann_index.ntotal == 300
+    assert (tmp_path / "ivf" / "meta.json").exists()
+
+    store.add(2, range(100), vectors[300:])
+    hit = embeddings_main.search_vectors(state, vectors[350], k=1, nprobe=1)[0]
+    assert (hit.document_id, hit.ordinal) == (2, 50)
+
+    embeddings_main.sync_ann_index(state)
+    assert state.ann_index.ntotal == 400
+
+
+def test_search_endpoint_accepts_nprobe_and_exact(tmp_path, monkeypatch, embeddings_main):
+    """Test the per-query search options over HTTP."""
+    monkeypatch.setattr(embeddings_main, "VECTOR_STORE_PATH", str(tmp_path / "vectors"))
+    monkeypatch.setattr(embeddings_main, "ANN_INDEX_PATH", str(tmp_path / "ivf"))
+    monkeypatch.setattr(embeddings_main, "BM25_INDEX_PATH", str(tmp_path / "bm25"))
+    with TestClient(embeddings_main.app) as client:
+        client.post("/index", json={"document_id": 1, "chunks": [{"ordinal": 0, "text": "vector search"}]})
+        for options in ({"nprobe": 4}, {"exact": True}):
+            response = client.post("/search", json={"query": "vector search", **options})
+            assert response.status_code == 200
+            assert response.json()["results"][0]["ordinal"] == 0
+
+
+def test_ivf_search_during_add_sees_every_covered_row():
+    """Test that rows below ntotal are always searchable while another thread adds."""
+    vectors = _clustered(4000, seed=2)
+    index = IVFIndex(32, nlist=16)
+    index.train(vectors[:1000])
+
+    def add_all():
+        for start in range(0, 4000, 50):
+            index.add(vectors[start:start + 50], _ids(4000)[start:start + 50])
+
+    adder = threading.Thread(target=add_all)
+    adder.start()
+    while adder.is_alive():
+        covered = index.ntotal
+        if covered:
+            hit = index.search(vectors[covered - 1], k=1, nprobe=16)[0][0]
+            assert hit.ordinal == covered - 1
+    adder.join()
+    assert index.ntotal == 4000
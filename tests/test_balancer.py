@@ -0,0 +1,237 @@
+"""
+Tests for API Gateway - Ingestion Load Balancing.
+"""
+import asyncio
+from collections import Counter
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from balancer import HALF_OPEN, OPEN, BalancingTransport, LoadBalancer, RetryBudget
+
+INGESTION = "http://ingestion:8001"
+REPLICAS = ["http://replica-a:8001", "http://replica-b:8001"]
+
+
+def _balanced_client(handler, **options):
+    options.setdefault("health_interval", 0)
+    balancer = LoadBalancer(INGESTION, REPLICAS, **options)
+    client = httpx.AsyncClient(transport=BalancingTransport(httpx.MockTransport(handler), balancer))
+    return client, balancer
+
+
+async def test_requests_are_spread_by_outstanding_load():
+    """Test that concurrent requests are shared out and sent with the replica's Host."""
+    served = Counter()
+
+    async def handler(request):
+        assert request.headers["Host"] == request.url.netloc.decode()
+        served[request.url.host] += 1
+        await asyncio.sleep(0.02)
+        return httpx.Response(200, json={})
+
+    client, balancer = _balanced_client(handler)
+    responses = await asyncio.gather(*(client.post(f"{INGESTION}/process_pdf") for _ in range(40)))
+
+    assert all(response.status_code == 200 for response in responses)
+    assert set(served) == {"replica-a", "replica-b"}
+    assert min(served.values()) >= 15
+    assert all(replica.outstanding == 0 for replica in balancer.replicas)
+
+
+async def test_other_upstreams_are_not_balanced():
+    """Test that requests to other services (e.g. embeddings) pass through unchanged."""
+    hosts = []
+
+    async def handler(request):
+        hosts.append(request.url.host)
+        return httpx.Response(200)
+
+    client, _ = _balanced_client(handler)
+    await client.post("http://embeddings:8003/search")
+
+    assert hosts == ["embeddings"]
+
+
+async def test_failing_replica_is_ejected_then_tried_again():
+    """Test retries of unsent requests, the circuit breaker and its trial request."""
+    down = {"replica-b"}
+    served = []
+
+    async def handler(request):
+        if request.url.host in down:
+            raise httpx.ConnectError("connection refused", request=request)
+        served.append(request.url.host)
+        return httpx.Response(200)
+
+    client, balancer = _balanced_client(handler, failure_threshold=2, open_seconds=0.1)
+    for _ in range(30):
+        # Uploads are not idempotent, but a refused connection means nothing was sent
+        assert (await client.post(f"{INGESTION}/process_pdf", content=b"%PDF-")).status_code == 200
+
+    assert served == ["replica-a"] * 30
+    assert balancer.replicas[1].state == OPEN
+
+    down.clear()
+    await asyncio.sleep(0.1)
+    for _ in range(30):
+        await client.post(f"{INGESTION}/process_pdf")
+    assert "replica-b" in served[30:]
+
+
+async def test_read_timeouts_do_not_eject_a_replica():
+    """Test that slow responses are not breaker failures while 500s are."""
+    async def handler(request):
+        if request.url.path == "/slow":
+            raise httpx.ReadTimeout("timed out", request=request)
+        return httpx.Response(500)
+
+    client, balancer = _balanced_client(handler, failure_threshold=2)
+    for _ in range(6):
+        with pytest.raises(httpx.ReadTimeout):
+            await client.post(f"{INGESTION}/slow")
+    assert all(replica.state != OPEN for replica in balancer.replicas)
+
+    for _ in range(4):
+        await client.post(f"{INGESTION}/process_pdf")
+    assert all(replica.state == OPEN for replica in balancer.replicas)
+
+
+async def test_shed_trial_request_keeps_the_circuit_open():
+    """Test that a 503 to a trial request neither closes nor reopens the breaker."""
+    async def handler(request):
+        return httpx.Response(503)
+
+    balancer = LoadBalancer(INGESTION, REPLICAS[:1], health_interval=0, open_seconds=0)
+    client = httpx.AsyncClient(transport=BalancingTransport(httpx.MockTransport(handler), balancer))
+    replica = balancer.replicas[0]
+    balancer._open(replica, "errors")
+
+    assert (await client.get(f"{INGESTION}/jobs/1")).status_code == 503
+    assert replica.state == HALF_OPEN
+    assert not replica.trial_in_flight
+    assert replica.outstanding == 0
+
+
+async def test_health_loop_survives_unexpected_errors(monkeypatch):
+    """Test that an exception in a round of checks does not stop later rounds."""
+    balancer = LoadBalancer(INGESTION, REPLICAS, health_interval=0.01)
+    rounds = []
+
+    async def check_health(client):
+        rounds.append(len(rounds))
+        if len(rounds) == 1:
+            raise KeyError("bug")
+
+    monkeypatch.setattr(balancer, "check_health", check_health)
+    balancer.start()
+    while len(rounds) < 3:
+        await asyncio.sleep(0.01)
+    await balancer.stop()
+
+
+async def test_only_idempotent_requests_are_retried_on_errors():
+    """Test that a 503 is retried on the other replica for GET but returned for POST."""
+    hosts = []
+
+    async def handler(request):
+        hosts.append(request.url.host)
+        # Every first attempt is shed
+        return httpx.Response(503 if len(hosts) % 2 else 200)
+
+    client, _ = _balanced_client(handler)
+
+    assert (await client.post(f"{INGESTION}/process_pdf")).status_code == 503
+    hosts.clear()
+    assert (await client.get(f"{INGESTION}/jobs/1")).status_code == 200
+    assert len(hosts) == 2 and hosts[0] != hosts[1]
+
+
+async def test_retry_budget_limits_retries():
+    """Test that retries stop once the budget is spent."""
+    async def handler(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    client, balancer = _balanced_client(
+        handler, failure_threshold=100, retry_budget=RetryBudget(ratio=0.0, min_retries=1)
+    )
+    for _ in range(3):
+        with pytest.raises(httpx.ConnectError):
+            await client.get(f"{INGESTION}/jobs/1")
+
+    assert len(balancer.retry_budget._retries) == 1
+
+
+async def test_no_available_replica_fails_fast():
+    """Test that with every replica ejected requests fail without waiting on a timeout."""
+    client, balancer = _balanced_client(lambda request: httpx.Response(200), open_seconds=60)
+    for replica in balancer.replicas:
+        balancer._open(replica, "errors")
+
+    with pytest.raises(httpx.ConnectError):
+        await client.post(f"{INGESTION}/process_pdf")
+
+
+async def test_health_checks_eject_and_restore_replicas():
+    """Test that consecutive failed checks eject a replica and a passing one lets it back."""
+    healthy = {"replica-a": True, "replica-b": False}
+
+    async def handler(request):
+        assert request.url.path == "/health"
+        return httpx.Response(200 if healthy[request.url.host] else 503)
+
+    balancer = LoadBalancer(INGESTION, REPLICAS, unhealthy_threshold=2, open_seconds=60)
+    checker = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    await balancer.check_health(checker)
+    assert balancer.choose(exclude={"http://replica-a:8001"}) is not None
+    await balancer.check_health(checker)
+    assert balancer.choose(exclude={"http://replica-a:8001"}) is None
+
+    healthy["replica-b"] = True
+    await balancer.check_health(checker)
+    trial = balancer.choose(exclude={"http://replica-a:8001"})
+    assert trial.url == "http://replica-b:8001"
+    balancer.record_success(trial)
+    assert trial.state == "closed"
+
+
+def test_jobs_are_polled_on_the_replica_that_queued_them(make_pdf, monkeypatch, gateway_main, api_headers):
+    """Test job affinity, and finding a job this gateway did not see queued."""
+    jobs = {"replica-a": set(), "replica-b": set()}
+
+    async def handler(request):
+        host = request.url.host
+        if request.url.path == "/process_pdf":
+            await request.aread()
+            job_id = f"job-{sum(len(ids) for ids in jobs.values())}"
+            jobs[host].add(job_id)
+            return httpx.Response(202, json={"job_id": job_id, "status": "queued"})
+        job_id = request.url.path.rsplit("/", 1)[1]
+        if job_id not in jobs[host]:
+            return httpx.Response(404, json={"detail": "Job not found"})
+        return httpx.Response(200, json={"job_id": job_id, "status": "running", "replica": host})
+
+    client, balancer = _balanced_client(handler)
+    monkeypatch.setattr(gateway_main, "INGESTION_SERVICE_URL", INGESTION)
+    monkeypatch.setattr(gateway_main, "ingestion_balancer", balancer)
+    gateway_main.app.state.ingestion_client = client
+    try:
+        gateway = TestClient(gateway_main.app)
+        queued = [
+            gateway.post(
+                "/upload", params={"async": "true"}, headers=api_headers,
+                files={"file": ("a.pdf", make_pdf([f"job {i}"]), "application/pdf")}
+            ).json()["job_id"]
+            for i in range(6)
+        ]
+        for job_id in queued:
+            owner = "replica-a" if job_id in jobs["replica-a"] else "replica-b"
+            assert gateway.get(f"/jobs/{job_id}", headers=api_headers).json()["replica"] == owner
+
+        jobs["replica-b"].add("from-before-restart")
+        assert gateway.get("/jobs/from-before-restart", headers=api_headers).json()["replica"] == "replica-b"
+        assert gateway.get("/jobs/unknown", headers=api_headers).status_code == 404
+    finally:
+        gateway_main.app.state.ingestion_client = None
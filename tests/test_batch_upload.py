@@ -0,0 +1,139 @@
+"""
+Tests for API Gateway - Batch Uploads.
+"""
+import asyncio
+import io
+import json
+import re
+import zipfile
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def upstream(mock_upstream):
+    """Mock ingestion service; files named ``slow*`` take longer to process."""
+    state = {"received": [], "in_flight": 0, "peak": 0, "params": []}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        state["params"].append(dict(request.url.params))
+        filename = re.search(rb'filename="([^"]+)"', body).group(1).decode()
+        state["received"].append(filename)
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(0.2 if filename.startswith("slow") else 0.01)
+        state["in_flight"] -= 1
+        return httpx.Response(200, json={
+            "document_id": len(state["received"]), "filename": filename,
+            "total_pages": 1, "total_chunks": 2, "chunks": [],
+        })
+
+    mock_upstream(handler)
+    return state
+
+
+def _records(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_batch_returns_results_in_completion_order(upstream, make_pdf, gateway_main, api_headers):
+    """Test that fast files are reported before a slow one sent first."""
+    pdf = make_pdf(["batch"])
+    files = [("files", ("slow.pdf", pdf, "application/pdf"))]
+    files += [("files", (f"fast{i}.pdf", pdf, "application/pdf")) for i in range(3)]
+
+    response = TestClient(gateway_main.app).post("/upload/batch", headers=api_headers, files=files)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = _records(response)
+    results, summary = records[:-1], records[-1]
+    assert [r["filename"] for r in results][-1] == "slow.pdf"
+    assert all(r["status"] == "succeeded" and r["total_chunks"] == 2 for r in results)
+    assert sorted(r["index"] for r in results) == [0, 1, 2, 3]
+    assert summary == {**summary, "type": "summary", "total": 4, "succeeded": 4, "failed": 0}
+
+
+def test_batch_concurrency_is_bounded(upstream, make_pdf, monkeypatch, gateway_main, api_headers):
+    """Test that no more than BATCH_UPLOAD_CONCURRENCY files are in flight."""
+    monkeypatch.setattr(gateway_main, "BATCH_UPLOAD_CONCURRENCY", 2)
+    pdf = make_pdf(["batch"])
+    files = [("files", (f"slow{i}.pdf", pdf, "application/pdf")) for i in range(5)]
+
+    response = TestClient(gateway_main.app).post("/upload/batch", headers=api_headers, files=files)
+
+    assert _records(response)[-1]["succeeded"] == 5
+    assert upstream["peak"] == 2
+
+
+def test_batch_expands_zip_archives(upstream, make_pdf, gateway_main, api_headers):
+    """Test that PDFs inside a zip are ingested and other members reported."""
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("papers/", "")
+        zf.writestr("papers/one.pdf", make_pdf(["first"]))
+        zf.writestr("papers/two.pdf", make_pdf(["second"]))
+        zf.writestr("papers/notes.txt", "not a pdf")
+        zf.writestr("__MACOSX/papers/._one.pdf", "metadata")
+
+    response = TestClient(gateway_main.app).post(
+        "/upload/batch", headers=api_headers,
+        files=[("files", ("papers.zip", archive.getvalue(), "application/zip"))]
+    )
+
+    results = {r["filename"]: r for r in _records(response)[:-1]}
+    assert set(results) == {"papers/one.pdf", "papers/two.pdf", "papers/notes.txt"}
+    assert results["papers/one.pdf"]["status"] == "succeeded"
+    assert results["papers/one.pdf"]["archive"] == "papers.zip"
+    assert results["papers/notes.txt"]["status_code"] == 400
+    assert sorted(upstream["received"]) == ["one.pdf", "two.pdf"]
+
+
+def test_batch_reports_invalid_files_without_failing_the_batch(upstream, make_pdf, monkeypatch, gateway_main,
+                                                               api_headers):
+    """Test per-file errors for bad signatures, extensions, oversize and file limits."""
+    monkeypatch.setattr(gateway_main, "BATCH_MAX_FILES", 2)
+    pdf = make_pdf(["ok"])
+    files = [
+        ("files", ("fake.pdf", b"not a pdf", "application/pdf")),
+        ("files", ("notes.txt", b"text", "text/plain")),
+        ("files", ("broken.zip", b"PK not really", "application/zip")),
+        ("files", ("good.pdf", pdf, "application/pdf")),
+        ("files", ("extra.pdf", pdf, "application/pdf")),
+    ]
+
+    response = TestClient(gateway_main.app).post("/upload/batch", headers=api_headers, files=files)
+
+    results = {r["filename"]: r for r in _records(response)[:-1]}
+    assert results["fake.pdf"]["status_code"] == 400
+    assert results["notes.txt"]["status_code"] == 400
+    assert results["broken.zip"]["detail"] == "File is not a valid zip archive"
+    assert results["good.pdf"]["status"] == "succeeded"
+    assert results["extra.pdf"]["status_code"] == 413
+    assert upstream["received"] == ["good.pdf"]
+
+
+def test_batch_forwards_extractor_choice(upstream, make_pdf, gateway_main, api_headers):
+    """Test that ``?extractor=`` is passed on for every file and validated."""
+    files = [("files", (f"doc{i}.pdf", make_pdf(["batch"]), "application/pdf")) for i in range(2)]
+    client = TestClient(gateway_main.app)
+
+    response = client.post("/upload/batch", params={"extractor": "fast"}, headers=api_headers, files=files)
+
+    assert _records(response)[-1]["succeeded"] == 2
+    assert upstream["params"] == [{"extractor": "fast"}] * 2
+    assert client.post(
+        "/upload/batch", params={"extractor": "ocr"}, headers=api_headers, files=files
+    ).status_code == 422
+
+
+def test_batch_without_files_is_rejected(upstream, gateway_main, api_headers):
+    """Test that a batch with no file parts fails as a whole."""
+    response = TestClient(gateway_main.app).post(
+        "/upload/batch", headers=api_headers, data={"note": "nothing"}, files=[("other", ("x.bin", b"x"))]
+    )
+
+    assert response.status_code == 400
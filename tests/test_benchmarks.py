@@ -0,0 +1,36 @@
+"""
+Tests for the benchmark helpers.
+"""
+from io import BytesIO
+from pathlib import Path
+import sys
+
+import pdfplumber
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+
+from compare import compare  # noqa: E402
+from harness import summarize  # noqa: E402
+from synthetic import synthetic_pdf  # noqa: E402
+
+
+def test_synthetic_pdf_has_requested_pages_and_density():
+    """Test that generated PDFs are valid, reproducible and distinct per seed."""
+    content = synthetic_pdf(3, words_per_page=250, seed=1)
+
+    with pdfplumber.open(BytesIO(content)) as pdf:
+        assert len(pdf.pages) == 3
+        assert len(pdf.pages[2].extract_text().split()) == 250
+    assert synthetic_pdf(3, words_per_page=250, seed=1) == content
+    assert synthetic_pdf(3, words_per_page=250, seed=2) != content
+
+
+def test_compare_flags_regressions():
+    """Test that slower latency and lower throughput beyond the threshold are reported."""
+    baseline = {"results": [summarize("extract", [0.1] * 10, 1.0, pages=10)]}
+    candidate = {"results": [summarize("extract", [0.2] * 10, 1.05, pages=10)]}
+
+    regressions = compare(baseline, candidate, threshold=10)
+
+    assert any(regression.startswith("extract p50_ms") for regression in regressions)
+    assert not any("pages_per_s" in regression for regression in regressions)
@@ -0,0 +1,124 @@
+"""
+Tests for Embeddings Service - BM25 Keyword Index and Hybrid Search.
+"""
+import math
+from collections import Counter
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from bm25 import BM25Index, tokenize
+
+WORDS = ["protein", "binding", "cell", "gene", "expression", "model", "data", "signal", "tumor", "receptor"]
+
+
+def _random_texts(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(WORDS, size=rng.integers(3, 30))) for _ in range(n)]
+
+
+def _exhaustive_bm25(texts, query, k1=1.2, b=0.75):
+    tokens = [tokenize(text) for text in texts]
+    average_length = sum(map(len, tokens)) / len(tokens)
+    scores = [0.0] * len(texts)
+    for term in set(tokenize(query)):
+        df = sum(term in t for t in tokens)
+        idf = math.log(1 + (len(texts) - df + 0.5) / (df + 0.5))
+        for i, t in enumerate(tokens):
+            tf = Counter(t)[term]
+            if tf:
+                scores[i] += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(t) / average_length))
+    return scores
+
+
+def test_tokenize_keeps_compounds_and_parts():
+    """Test that hyphenated terms match both whole and split."""
+    assert tokenize("IL-6 binds BRCA1, see Eq. 3.2") == [
+        "il-6", "il", "6", "binds", "brca1", "see", "eq", "3.2", "3", "2"
+    ]
+
+
+def test_exact_term_ranks_first(tmp_path):
+    """Test that a rare exact term finds its chunk."""
+    index = BM25Index(str(tmp_path))
+    index.add(1, [0, 1, 2], ["the cell model", "BRCA1 mutations in the cell", "gene expression data"])
+
+    hits = index.search("brca1", k=5)
+
+    assert [(hit.document_id, hit.ordinal) for hit in hits] == [(1, 1)]
+    assert index.search("unknownterm") == []
+
+
+def test_maxscore_matches_exhaustive_scoring_after_merges(tmp_path):
+    """Test that pruned top-k search returns the exact BM25 ranking across merged segments."""
+    texts = _random_texts(400)
+    index = BM25Index(str(tmp_path), merge_factor=4)
+    for document_id in range(40):
+        index.add(document_id, range(10), texts[document_id * 10:(document_id + 1) * 10])
+
+    assert len(index) == 400
+    assert index.segment_count < 10
+
+    for query in ("protein binding", "tumor receptor signal gene", "cell"):
+        scores = _exhaustive_bm25(texts, query)
+        hits = index.search(query, k=10)
+        assert [round(hit.score, 4) for hit in hits] == [round(s, 4) for s in sorted(scores, reverse=True)[:10]]
+        for hit in hits:
+            assert math.isclose(hit.score, scores[hit.document_id * 10 + hit.ordinal], rel_tol=1e-4)
+
+
+def test_segment_count_stays_logarithmic_for_mixed_document_sizes(tmp_path):
+    """Test that documents of varying sizes still merge, and results survive a reopen."""
+    rng = np.random.default_rng(1)
+    sizes = rng.integers(1, 60, size=600)
+    texts = _random_texts(int(sizes.sum()), seed=1)
+    index = BM25Index(str(tmp_path), merge_factor=4)
+    start = 0
+    for document_id, size in enumerate(sizes):
+        index.add(document_id, range(size), texts[start:start + size])
+        start += size
+        tiers = math.log(len(index), 4) + 1
+        assert index.segment_count <= 3 * tiers
+
+    reopened = BM25Index(str(tmp_path), merge_factor=4)
+    assert len(reopened) == len(texts)
+    assert reopened.segment_count == index.segment_count
+    scores = _exhaustive_bm25(texts, "tumor receptor")
+    hits = reopened.search("tumor receptor", k=5)
+    assert [round(hit.score, 4) for hit in hits] == [round(s, 4) for s in sorted(scores, reverse=True)[:5]]
+
+
+def test_index_reopens_and_filters_by_document(tmp_path):
+    """Test that segments are reloaded from disk and results can be restricted."""
+    index = BM25Index(str(tmp_path))
+    index.add(1, [0], ["receptor binding site"])
+    index.add(2, [0, 1], ["receptor tyrosine kinase", "unrelated text"])
+
+    reopened = BM25Index(str(tmp_path))
+
+    assert len(reopened) == 3
+    assert {hit.document_id for hit in reopened.search("receptor", k=10)} == {1, 2}
+    assert [(hit.document_id, hit.ordinal) for hit in reopened.search("receptor", k=10, document_ids=[2])] == [(2, 0)]
+
+
+def test_search_modes_over_http(tmp_path, monkeypatch, embeddings_main):
+    """Test keyword and hybrid search through the endpoint."""
+    monkeypatch.setattr(embeddings_main, "VECTOR_STORE_PATH", str(tmp_path / "vectors"))
+    monkeypatch.setattr(embeddings_main, "ANN_INDEX_PATH", str(tmp_path / "ivf"))
+    monkeypatch.setattr(embeddings_main, "BM25_INDEX_PATH", str(tmp_path / "bm25"))
+    chunks = [
+        {"ordinal": 0, "text": "Deep learning for protein structure prediction"},
+        {"ordinal": 1, "text": "The TP53 gene is frequently mutated in tumors"},
+    ]
+    with TestClient(embeddings_main.app) as client:
+        assert client.get("/corpus_version").json() == {"version": 0}
+        assert client.post("/index", json={"document_id": 1, "chunks": chunks}).status_code == 200
+        assert client.get("/corpus_version").json() == {"version": 2}
+
+        keyword = client.post("/search", json={"query": "TP53", "mode": "keyword"}).json()
+        hybrid = client.post("/search", json={"query": "TP53 mutations", "mode": "hybrid"}).json()
+
+    assert keyword["mode"] == "keyword"
+    assert [result["ordinal"] for result in keyword["results"]] == [1]
+    assert hybrid["results"][0]["ordinal"] == 1
+    assert len(hybrid["results"]) == 2
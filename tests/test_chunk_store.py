@@ -0,0 +1,56 @@
+"""
+Tests for Ingestion Service - Chunk Persistence.
+"""
+from fastapi.testclient import TestClient
+
+from utils import join_pages, page_index_at
+
+
+def test_join_pages_records_page_starts():
+    """Test that page start offsets point at each page's text."""
+    pages = [{"page": 1, "text": "abc"}, {"page": 3, "text": "defg"}]
+    text, starts = join_pages(pages)
+
+    assert text == "abc defg"
+    assert starts == [0, 4]
+    assert page_index_at(starts, 0) == 0
+    assert page_index_at(starts, 3) == 0  # Separator belongs to the earlier page
+    assert page_index_at(starts, 4) == 1
+
+
+def test_chunks_are_stored_with_page_offsets(make_pdf, ingestion_main):
+    """Test that processed chunks can be read back with page references."""
+    client = TestClient(ingestion_main.app)
+    pages = ["First page " * 60, "Second page " * 60, "Third page " * 60]
+    result = client.post("/process_pdf", files={"file": ("stored.pdf", make_pdf(pages), "application/pdf")}).json()
+
+    response = client.get(f"/documents/{result['document_id']}/chunks")
+    assert response.status_code == 200
+    stored = response.json()
+
+    assert stored["total_chunks"] == result["total_chunks"] == len(stored["chunks"])
+    assert [c["text"] for c in stored["chunks"]] == [c["text"] for c in result["chunks"]]
+    assert stored["chunks"][0]["page_start"] == 1
+    assert stored["chunks"][-1]["page_end"] == 3
+    for chunk in stored["chunks"]:
+        assert chunk["char_end"] - chunk["char_start"] == len(chunk["text"])
+        assert chunk["page_start"] <= chunk["page_end"]
+
+
+def test_document_chunks_pagination(make_pdf, ingestion_main):
+    """Test keyset pagination over stored chunks."""
+    client = TestClient(ingestion_main.app)
+    pdf = make_pdf(["Paginated chunk text " * 40] * 4)
+    document_id = client.post("/process_pdf", files={"file": ("paged.pdf", pdf, "application/pdf")}).json()["document_id"]
+
+    first = client.get(f"/documents/{document_id}/chunks?limit=2").json()
+    second = client.get(f"/documents/{document_id}/chunks?limit=2&after={first['next_after']}").json()
+
+    assert [c["ordinal"] for c in first["chunks"]] == [0, 1]
+    assert second["chunks"][0]["ordinal"] == 2
+
+
+def test_document_chunks_unknown_document(ingestion_main):
+    """Test that chunks of an unknown document return 404."""
+    client = TestClient(ingestion_main.app)
+    assert client.get("/documents/999999/chunks").status_code == 404
@@ -0,0 +1,123 @@
+"""
+Tests for Ingestion Service - Page-Aware Span Chunking.
+"""
+import pytest
+
+from utils import SpanChunker, iter_chunk_spans, join_pages
+
+PAGES = [
+    {"page": 1, "text": "Alpha beta gamma. Delta epsilon zeta eta theta. Iota kappa."},
+    {"page": 2, "text": "Lambda mu nu xi omicron. Pi rho sigma tau upsilon phi chi psi."},
+    {"page": 4, "text": "Omega ends the document here."},
+]
+
+
+def _spans(pages=PAGES, **kwargs):
+    text, starts = join_pages(pages)
+    numbers = [p["page"] for p in pages]
+    return text, list(iter_chunk_spans(text, starts, numbers, **kwargs))
+
+
+def test_spans_cover_text_with_overlap():
+    """Test that consecutive spans overlap and the last one ends the text."""
+    text, spans = _spans(chunk_size=40, overlap=10)
+
+    assert spans[0].start == 0
+    assert spans[-1].end == len(text)
+    for prev, nxt in zip(spans, spans[1:]):
+        assert nxt.start == prev.end - 10
+
+
+def test_spans_carry_page_numbers():
+    """Test that each span reports the PDF pages it was taken from."""
+    text, spans = _spans(chunk_size=40, overlap=10)
+
+    assert spans[0].page_start == spans[0].page_end == 1
+    assert spans[-1].page_end == 4  # Page numbers come from the PDF, gaps included
+    crossing = [s for s in spans if s.page_start != s.page_end]
+    assert crossing and all(s.page_start < s.page_end for s in crossing)
+
+
+def test_whitespace_boundary_never_splits_words():
+    """Test that whitespace snapping cuts chunks between words."""
+    text, spans = _spans(chunk_size=30, overlap=8, boundary="whitespace")
+    words = set(text.split())
+
+    for span in spans:
+        assert set(text[span.start:span.end].split()) <= words
+
+
+def test_sentence_boundary_prefers_sentence_ends():
+    """Test that sentence snapping ends chunks after sentence punctuation."""
+    text, spans = _spans(chunk_size=50, overlap=5, boundary="sentence")
+
+    for span in spans[:-1]:
+        assert text[span.start:span.end].rstrip()[-1] in ".!?"
+
+
+def test_token_mode_counts_words():
+    """Test that token mode sizes chunks in whitespace-separated tokens."""
+    text, spans = _spans(chunk_size=5, overlap=2, mode="tokens")
+
+    assert all(len(text[s.start:s.end].split()) == 5 for s in spans[:-1])
+    assert text[spans[1].start:spans[1].end].split()[:2] == text[spans[0].start:spans[0].end].split()[-2:]
+    assert spans[-1].end == len(text)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"chunk_size": 40, "overlap": 10},
+    {"chunk_size": 30, "overlap": 8, "boundary": "whitespace"},
+    {"chunk_size": 50, "overlap": 5, "boundary": "sentence"},
+    {"chunk_size": 6, "overlap": 2, "mode": "tokens"},
+])
+def test_incremental_chunker_matches_batch(kwargs):
+    """Test that feeding pages one at a time yields the same chunks."""
+    text, spans = _spans(**kwargs)
+    chunker = SpanChunker(**kwargs)
+
+    emitted = []
+    for page in PAGES:
+        emitted.extend(chunker.feed(page["page"], page["text"]))
+    emitted.extend(chunker.finish())
+
+    assert [span for span, _ in emitted] == spans
+    assert [chunk for _, chunk in emitted] == [text[s.start:s.end] for s in spans]
+
+
+@pytest.mark.parametrize("blank", ["", "  \n "])
+@pytest.mark.parametrize("kwargs", [
+    {"chunk_size": 40, "overlap": 10},
+    {"chunk_size": 30, "overlap": 8, "boundary": "whitespace"},
+    {"chunk_size": 50, "overlap": 5, "boundary": "sentence"},
+    {"chunk_size": 6, "overlap": 2, "mode": "tokens"},
+])
+def test_incremental_chunker_matches_batch_with_blank_pages(kwargs, blank):
+    """Test that empty or whitespace-only pages, first or in between, chunk the same both ways."""
+    texts = [blank, blank, PAGES[0]["text"], blank, PAGES[1]["text"], PAGES[2]["text"]]
+    pages = [{"page": number, "text": text} for number, text in enumerate(texts, start=1)]
+    text, spans = _spans(pages, **kwargs)
+    chunker = SpanChunker(**kwargs)
+
+    emitted = []
+    for page in pages:
+        emitted.extend(chunker.feed(page["page"], page["text"]))
+    emitted.extend(chunker.finish())
+
+    assert [span for span, _ in emitted] == spans
+    assert [chunk for _, chunk in emitted] == [text[s.start:s.end] for s in spans]
+
+
+def test_incremental_chunker_keeps_buffer_small():
+    """Test that the incremental chunker drops text it no longer needs."""
+    chunker = SpanChunker(chunk_size=100, overlap=10)
+    for page in range(1, 200):
+        chunker.feed(page, "x" * 500)
+
+    assert len(chunker._buffer) < 2 * 500
+    assert chunker.length == 199 * 500 + 198
+
+
+def test_invalid_mode_rejected():
+    """Test that unknown chunking modes are rejected."""
+    with pytest.raises(ValueError):
+        list(iter_chunk_spans("text", [0], [1], boundary="paragraph"))
@@ -0,0 +1,59 @@
+"""
+Tests for Ingestion Service - Async Database Layer.
+"""
+import asyncio
+
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, inspect, text
+
+from database import Base, async_database_url, session_scope, upgrade_schema
+
+
+def test_async_database_url_uses_async_drivers():
+    """Test that database URLs are mapped to asyncpg and aiosqlite."""
+    assert async_database_url("postgresql://u:p@db:5432/app") == "postgresql+asyncpg://u:p@db:5432/app"
+    assert async_database_url("postgresql+psycopg2://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert async_database_url("sqlite:///./documents.db") == "sqlite+aiosqlite:///./documents.db"
+
+
+def test_sqlite_sessions_use_wal_and_record_checkout_time():
+    """Test that async SQLite connections get the configured pragmas."""
+    before = REGISTRY.get_sample_value("ingestion_db_pool_checkout_seconds_count") or 0
+
+    async def pragmas():
+        async with session_scope() as db:
+            journal_mode = await db.scalar(text("PRAGMA journal_mode"))
+            synchronous = await db.scalar(text("PRAGMA synchronous"))
+            return journal_mode, synchronous
+
+    journal_mode, synchronous = asyncio.run(pragmas())
+
+    assert journal_mode == "wal"
+    assert synchronous == 1  # NORMAL
+    assert REGISTRY.get_sample_value("ingestion_db_pool_checkout_seconds_count") == before + 1
+
+
+def test_upgrade_schema_brings_an_old_database_up_to_date(tmp_path):
+    """Test that columns, indexes and tables added since a database was created are added to it."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE documents (id INTEGER PRIMARY KEY, filename VARCHAR, "
+            "total_pages INTEGER, total_chunks INTEGER, uploaded_at DATETIME)"
+        ))
+        connection.execute(text("INSERT INTO documents (filename, total_pages) VALUES ('old.pdf', 3)"))
+
+    upgrade_schema(Base.metadata, engine)
+    upgrade_schema(Base.metadata, engine)  # idempotent
+
+    inspector = inspect(engine)
+    assert "content_sha256" in {column["name"] for column in inspector.get_columns("documents")}
+    indexes = {index["name"]: index for index in inspector.get_indexes("documents")}
+    assert indexes["ix_documents_content_sha256"]["unique"]
+    assert "ix_documents_uploaded_at_id" in indexes
+    assert "chunks" in inspector.get_table_names()
+    with engine.connect() as connection:
+        assert connection.execute(text(
+            "SELECT filename FROM documents WHERE content_sha256 IS NULL"
+        )).scalars().all() == ["old.pdf"]
+    engine.dispose()
@@ -0,0 +1,73 @@
+"""
+Tests for Ingestion Service - Upload Deduplication.
+"""
+import hashlib
+
+from fastapi.testclient import TestClient
+
+from dedup import ChunkCache
+
+
+def _result(text: str) -> dict:
+    return {"document_id": 1, "chunks": [{"chunk_id": 0, "text": text, "char_count": len(text)}]}
+
+
+def test_chunk_cache_evicts_least_recently_used():
+    """Test that the cache drops the least recently used entry first."""
+    cache = ChunkCache(max_entries=2)
+    cache.put("a", _result("a"))
+    cache.put("b", _result("b"))
+    assert cache.get("a") is not None  # "b" is now least recently used
+
+    cache.put("c", _result("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_chunk_cache_respects_byte_budget():
+    """Test that the cache stays within its byte budget."""
+    cache = ChunkCache(max_entries=100, max_bytes=20_000)
+    for i in range(10):
+        cache.put(str(i), _result("x" * 5_000))
+
+    assert cache.size_bytes <= 20_000
+    assert 0 < len(cache) < 10
+
+
+def test_repeated_upload_is_served_from_cache(make_pdf, monkeypatch, ingestion_main):
+    """Test that re-uploading identical bytes skips extraction and reuses the document."""
+    client = TestClient(ingestion_main.app)
+    pdf = make_pdf(["Deduplicated paper", "Second page"])
+    files = {"file": ("paper.pdf", pdf, "application/pdf")}
+
+    first = client.post("/process_pdf", files=files)
+    assert first.status_code == 200
+    assert first.json()["deduplicated"] is False
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("PDF should not be parsed again")
+
+    monkeypatch.setattr(ingestion_main.extraction_executor, "extract_pages", fail)
+    second = client.post("/process_pdf", files={"file": ("copy.pdf", pdf, "application/pdf")})
+
+    assert second.status_code == 200
+    body = second.json()
+    assert body["deduplicated"] is True
+    assert body["document_id"] == first.json()["document_id"]
+    assert body["filename"] == "copy.pdf"
+    assert body["chunks"] == first.json()["chunks"]
+
+
+def test_upload_after_eviction_reuses_document_row(make_pdf, ingestion_main):
+    """Test that a known hash maps to the existing document even after eviction."""
+    client = TestClient(ingestion_main.app)
+    pdf = make_pdf(["Evicted paper"])
+
+    first = client.post("/process_pdf", files={"file": ("a.pdf", pdf, "application/pdf")}).json()
+    ingestion_main.chunk_cache.discard(hashlib.sha256(pdf).hexdigest())
+    second = client.post("/process_pdf", files={"file": ("a.pdf", pdf, "application/pdf")}).json()
+
+    assert second["document_id"] == first["document_id"]
+    assert second["deduplicated"] is True
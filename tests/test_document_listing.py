@@ -0,0 +1,82 @@
+"""
+Tests for Ingestion Service - Paginated Document Listing.
+"""
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from database import SessionLocal
+from models import Document
+
+BASE_TIME = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def _create_documents(prefix: str, count: int) -> None:
+    db = SessionLocal()
+    try:
+        for i in range(count):
+            db.add(Document(
+                filename=f"{prefix}{i}.pdf",
+                total_pages=1,
+                total_chunks=1,
+                # Pairs of documents share a timestamp to exercise the id tie-break
+                uploaded_at=BASE_TIME + timedelta(minutes=i // 2)
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_keyset_pagination_walks_all_documents(ingestion_main):
+    """Test that following X-Next-Cursor returns every document once, newest first."""
+    _create_documents("listing-walk-", 7)
+    client = TestClient(ingestion_main.app)
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 3, "filename_prefix": "listing-walk-"}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/documents", params=params)
+        assert response.status_code == 200
+        seen.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert len(seen) == 7
+    assert len({doc["id"] for doc in seen}) == 7
+    keys = [(doc["uploaded_at"], doc["id"]) for doc in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_date_range_filter(ingestion_main):
+    """Test filtering on upload time."""
+    _create_documents("listing-range-", 6)
+    client = TestClient(ingestion_main.app)
+
+    response = client.get("/documents", params={
+        "filename_prefix": "listing-range-",
+        "uploaded_after": (BASE_TIME + timedelta(minutes=1)).isoformat(),
+        "uploaded_before": (BASE_TIME + timedelta(minutes=2)).isoformat(),
+    })
+
+    assert sorted(doc["filename"] for doc in response.json()) == ["listing-range-2.pdf", "listing-range-3.pdf"]
+
+
+def test_filename_prefix_is_literal(ingestion_main):
+    """Test that LIKE wildcards in the prefix are matched literally."""
+    _create_documents("listing_%literal-", 1)
+    _create_documents("listingXXliteral-", 1)
+    client = TestClient(ingestion_main.app)
+
+    response = client.get("/documents", params={"filename_prefix": "listing_%literal-"})
+
+    assert [doc["filename"] for doc in response.json()] == ["listing_%literal-0.pdf"]
+
+
+def test_invalid_cursor_rejected(ingestion_main):
+    """Test that a malformed cursor returns 400."""
+    client = TestClient(ingestion_main.app)
+    assert client.get("/documents", params={"cursor": "not-a-cursor"}).status_code == 400
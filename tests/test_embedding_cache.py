@@ -0,0 +1,62 @@
+"""
+Tests for Embeddings Service - Embedding Cache.
+"""
+import asyncio
+
+import numpy as np
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from embedding_cache import EmbeddingCache, cache_key
+
+
+def test_cache_key_normalises_text_and_includes_model():
+    """Test that whitespace and Unicode variants share a key, models do not."""
+    assert cache_key("Deep  learning\n", "m1") == cache_key("Deep learning", "m1")
+    assert cache_key("ﬁle", "m1") == cache_key("file", "m1")  # NFKC folds ligatures
+    assert cache_key("Deep learning", "m1") != cache_key("Deep learning", "m2")
+
+
+def test_cache_evicts_by_bytes_and_reloads_from_disk(tmp_path):
+    """Test that the memory tier stays within budget and misses fall back to SQLite."""
+    path = str(tmp_path / "cache.db")
+    vectors = {f"k{i}": np.full(16, i, dtype=np.float32) for i in range(4)}  # 64 bytes each
+
+    async def run():
+        cache = EmbeddingCache(path, max_bytes=128)
+        await cache.put_many(vectors)
+        assert len(cache) == 2 and cache.size_bytes == 128
+        found = await cache.get_many(["k0", "k3", "missing"])
+        cache.close()
+        return found
+
+    found = asyncio.run(run())
+    assert set(found) == {"k0", "k3"}
+    np.testing.assert_array_equal(found["k0"], vectors["k0"])
+
+    async def reopen():
+        return await EmbeddingCache(path, max_bytes=0).get_many(["k1"])
+
+    np.testing.assert_array_equal(asyncio.run(reopen())["k1"], vectors["k1"])
+
+
+def test_embed_only_computes_misses(monkeypatch, embeddings_main):
+    """Test that cached and duplicate texts are not sent to the backend again."""
+    embedded = []
+    misses_before = REGISTRY.get_sample_value("embeddings_cache_lookups_total", {"result": "miss"}) or 0
+
+    with TestClient(embeddings_main.app) as client:
+        original = client.app.state.batcher.embed
+
+        async def recording_embed(texts):
+            embedded.append(list(texts))
+            return await original(texts)
+
+        monkeypatch.setattr(client.app.state.batcher, "embed", recording_embed)
+        first = client.post("/embed", json={"texts": ["cache me", "cache  me", "other text"]}).json()
+        second = client.post("/embed", json={"texts": ["other text", "brand new"]}).json()
+
+    assert embedded == [["cache me", "other text"], ["brand new"]]
+    assert first["embeddings"][0] == first["embeddings"][1]
+    assert second["embeddings"][0] == first["embeddings"][2]
+    assert REGISTRY.get_sample_value("embeddings_cache_lookups_total", {"result": "miss"}) == misses_before + 4
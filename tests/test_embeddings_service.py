@@ -0,0 +1,87 @@
+"""
+Tests for Embeddings Service - Embedding API and Micro-batching.
+"""
+import asyncio
+import base64
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backends import HashingBackend
+from batcher import MicroBatcher
+
+
+def test_hashing_backend_is_deterministic_and_normalised():
+    """Test that the local backend returns stable unit vectors."""
+    texts = ["Transformers use attention.", "Attention is what transformers use.", "Soup recipes for winter."]
+    first = HashingBackend(dimension=64).embed(texts)
+    second = HashingBackend(dimension=64).embed(texts)
+
+    assert first.shape == (3, 64)
+    assert first.dtype == np.float32
+    np.testing.assert_array_equal(first, second)
+    np.testing.assert_allclose(np.linalg.norm(first, axis=1), 1.0, rtol=1e-5)
+    # Shared vocabulary scores higher than unrelated text
+    assert first[0] @ first[1] > first[0] @ first[2]
+
+
+def test_micro_batcher_coalesces_concurrent_requests():
+    """Test that concurrent requests share one backend call and keep their order."""
+    calls = []
+
+    def embed_fn(texts):
+        calls.append(list(texts))
+        return np.array([[float(text)] for text in texts], dtype=np.float32)
+
+    async def run():
+        batcher = MicroBatcher(embed_fn, max_batch_size=64, max_wait_ms=50)
+        try:
+            return await asyncio.gather(*(batcher.embed([str(i), str(i + 0.5)]) for i in range(10)))
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    for i, vectors in enumerate(results):
+        assert vectors[:, 0].tolist() == [i, i + 0.5]
+
+
+def test_micro_batcher_splits_large_requests():
+    """Test that no backend call exceeds the maximum batch size."""
+    sizes = []
+
+    def embed_fn(texts):
+        sizes.append(len(texts))
+        return np.zeros((len(texts), 2), dtype=np.float32)
+
+    async def run():
+        batcher = MicroBatcher(embed_fn, max_batch_size=8, max_wait_ms=1)
+        try:
+            return await batcher.embed(["x"] * 20)
+        finally:
+            await batcher.stop()
+
+    assert asyncio.run(run()).shape == (20, 2)
+    assert sizes == [8, 8, 4]
+
+
+def test_embed_endpoint(embeddings_main):
+    """Test embedding texts over HTTP in both encodings."""
+    with TestClient(embeddings_main.app) as client:
+        response = client.post("/embed", json={"texts": ["alpha beta", "gamma"]})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["dimension"] == client.app.state.backend.dimension
+        assert len(data["embeddings"]) == 2
+        assert len(data["embeddings"][0]) == data["dimension"]
+
+        encoded = client.post("/embed", json={"texts": ["alpha beta"], "encoding_format": "base64"}).json()
+        vector = np.frombuffer(base64.b64decode(encoded["embeddings"][0]), dtype="<f4")
+        np.testing.assert_allclose(vector, data["embeddings"][0], rtol=1e-6)
+
+
+def test_embed_rejects_empty_request(embeddings_main):
+    """Test that a request without texts is rejected."""
+    with TestClient(embeddings_main.app) as client:
+        assert client.post("/embed", json={"texts": []}).status_code == 422
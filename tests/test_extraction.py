@@ -0,0 +1,199 @@
+"""
+Tests for Ingestion Service - Parallel PDF Extraction.
+"""
+from collections import Counter
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import extraction
+import extractors
+from extraction import ExtractionExecutor, extract_page_range, split_page_ranges
+
+
+def test_split_page_ranges_balanced():
+    """Test that pages are split into contiguous, balanced ranges."""
+    assert split_page_ranges(10, 3) == [(1, 4), (5, 7), (8, 10)]
+    assert split_page_ranges(0, 4) == []
+
+
+def test_split_page_ranges_respects_min_pages():
+    """Test that small documents are not scattered across workers."""
+    assert split_page_ranges(6, 8, min_pages=4) == [(1, 6)]
+    assert split_page_ranges(3, 8, min_pages=4) == [(1, 3)]
+    assert len(split_page_ranges(100, 8, min_pages=4)) == 8
+
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+async def test_extract_pages_keeps_page_order(make_pdf, kind, tmp_path):
+    """Test that pages extracted by different workers are reassembled in order."""
+    pages = [f"Page number {i}" for i in range(1, 10)]
+    pages[4] = ""  # Pages without text are skipped
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(make_pdf(pages))
+    executor = ExtractionExecutor(
+        kind=kind, max_workers=3, min_pages_per_task=1,
+        worker_memory_limit=1024 * 1024 * 1024, max_tasks_per_child=1
+    )
+
+    try:
+        text_by_page = await executor.extract_pages(str(path))
+    finally:
+        executor.shutdown()
+
+    assert [p["page"] for p in text_by_page] == [1, 2, 3, 4, 6, 7, 8, 9]
+    assert text_by_page[0]["text"] == "Page number 1"
+    assert text_by_page[-1]["text"] == "Page number 9"
+    assert executor.queue_depth == 0
+
+
+def _slow_or_failing_page(monkeypatch, slow=(), failing=()):
+    original = extractors.Page.extract_text
+
+    def extract_text(page, **kwargs):
+        if page.page_number in slow:
+            time.sleep(5)
+        if page.page_number in failing:
+            raise ValueError("broken font")
+        return original(page, **kwargs)
+
+    monkeypatch.setattr(extractors.Page, "extract_text", extract_text)
+
+
+def test_page_timeout_skips_only_that_page(make_pdf, tmp_path, monkeypatch):
+    """Test that a page over its time budget is skipped and the rest still extracted."""
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(make_pdf(["one", "two", "three"]))
+    _slow_or_failing_page(monkeypatch, slow={2})
+
+    started = time.perf_counter()
+    pages = extract_page_range(str(path), 1, 3, page_timeout=0.2)
+
+    assert time.perf_counter() - started < 2
+    assert [(number, text, outcome) for number, text, _, outcome in pages] == [
+        (1, "one", None), (2, "", extraction.TIMEOUT), (3, "three", None)
+    ]
+
+
+def test_failing_page_is_degraded_to_simple_extraction(make_pdf, tmp_path, monkeypatch):
+    """Test the fallback extractor for pages whose layout analysis raises."""
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(make_pdf(["fine", "fallback"]))
+    _slow_or_failing_page(monkeypatch, failing={2})
+
+    pages = extract_page_range(str(path), 1, 2)
+
+    assert pages[1][1] == "fallback"
+    assert pages[1][3] == extraction.DEGRADED
+
+
+async def test_document_deadline_reports_skipped_pages(make_pdf, tmp_path):
+    """Test that pages past the document deadline are reported, not raised."""
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(make_pdf(["one", "two"]))
+    executor = ExtractionExecutor(kind="thread", max_workers=1, document_timeout=1e-9)
+    skipped = []
+
+    try:
+        pages = [page async for page in executor.iter_pages(
+            str(path), on_skipped_page=lambda number, reason: skipped.append((number, reason))
+        )]
+    finally:
+        executor.shutdown()
+
+    assert pages == []
+    assert skipped == [(1, extraction.DEADLINE), (2, extraction.DEADLINE)]
+
+
+def test_process_pdf_reports_skipped_pages_and_removes_spooled_upload(make_pdf, monkeypatch, ingestion_main):
+    """Test that a document over its budget still succeeds, listing what was skipped."""
+    monkeypatch.setattr(ingestion_main.extraction_executor, "document_timeout", 1e-9)
+
+    response = TestClient(ingestion_main.app).post(
+        "/process_pdf", files={"file": ("budget.pdf", make_pdf(["over budget", "also over"]), "application/pdf")}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["skipped_pages"] == [
+        {"page": 1, "reason": "deadline"}, {"page": 2, "reason": "deadline"}
+    ]
+    assert os.listdir(ingestion_main.upload_spool_dir) == []
+
+
+def test_memory_error_releases_page_once(make_pdf, tmp_path, monkeypatch):
+    """Test that a page whose extraction runs out of memory is released exactly once."""
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(make_pdf(["one", "two"]))
+    released = []
+    original_release = extractors.LayoutExtractor.release
+
+    def extract_text(page, **kwargs):
+        raise MemoryError
+
+    def release(extractor, page):
+        released.append(page.page_number)
+        original_release(extractor, page)
+
+    monkeypatch.setattr(extractors.Page, "extract_text", extract_text)
+    monkeypatch.setattr(extractors.LayoutExtractor, "release", release)
+
+    pages = extract_page_range(str(path), 1, 2)
+
+    assert [outcome for _, _, _, outcome in pages] == [extraction.MEMORY, extraction.MEMORY]
+    assert released == [1, 2]
+
+
+async def test_broken_pool_is_shut_down_and_replaced(monkeypatch):
+    """Test that a pool whose worker died is shut down, and the next task gets a new one."""
+    class BrokenPool:
+        shut_down = None
+
+        def submit(self, fn, *args):
+            raise extraction.BrokenProcessPool("worker died")
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            self.shut_down = (wait, cancel_futures)
+
+    executor = ExtractionExecutor(kind="thread", max_workers=1)
+    broken = executor._executor = BrokenPool()
+
+    with pytest.raises(extraction.BrokenProcessPool):
+        await executor._submit(len, "abc")
+
+    assert broken.shut_down == (False, True)
+    assert await executor._submit(len, "abc") == 3
+    assert executor.queue_depth == 0
+    executor.shutdown()
+
+
+async def test_page_range_that_kills_its_worker_is_skipped(make_pdf, tmp_path, monkeypatch):
+    """Test that ranges failed by a dying worker are retried and only the crashing one is skipped."""
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(make_pdf(["one", "two", "three"]))
+    executor = ExtractionExecutor(kind="thread", max_workers=3, min_pages_per_task=1)
+    submit = executor._submit
+    attempts = Counter()
+
+    async def crashing_submit(fn, *args):
+        if fn is extract_page_range:
+            first = args[1]
+            attempts[first] += 1
+            # The broken pool fails every range in flight; page 2 kills the fresh one too
+            if first == 2 or attempts[first] == 1:
+                raise extraction.BrokenProcessPool("worker died")
+        return await submit(fn, *args)
+
+    monkeypatch.setattr(executor, "_submit", crashing_submit)
+    skipped = []
+    try:
+        pages = [page async for page in executor.iter_pages(
+            str(path), on_skipped_page=lambda number, reason: skipped.append((number, reason))
+        )]
+    finally:
+        executor.shutdown()
+
+    assert pages == [(1, "one"), (3, "three")]
+    assert skipped == [(2, extraction.CRASHED)]
+    assert attempts == {1: 2, 2: 2, 3: 2}
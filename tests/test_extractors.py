@@ -0,0 +1,103 @@
+"""
+Tests for Ingestion Service - Extraction Backends.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+import extractors
+from extraction import ExtractionExecutor, extract_page_range, inspect_document
+
+
+@pytest.fixture
+def pdf_path(make_pdf, tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(make_pdf(["Born digital text\nsecond line", "", "Page three, with (parentheses)"]))
+    return str(path)
+
+
+def test_fast_and_layout_extract_the_same_words(pdf_path):
+    """Test that the PDFium text layer matches layout analysis on a born-digital PDF."""
+    layout = extract_page_range(pdf_path, 1, 3, mode=extractors.LAYOUT)
+    fast = extract_page_range(pdf_path, 1, 3, mode=extractors.FAST)
+
+    assert [(number, text.split(), outcome) for number, text, _, outcome in fast] == [
+        (number, text.split(), outcome) for number, text, _, outcome in layout
+    ]
+    assert fast[0][1] == "Born digital text\nsecond line"
+
+
+def test_failing_fast_page_falls_back_to_layout(pdf_path, monkeypatch):
+    """Test that a page PDFium cannot read is extracted by pdfplumber instead."""
+    def extract(self, page):
+        raise ValueError("unreadable text layer")
+
+    monkeypatch.setattr(extractors.FastExtractor, "extract", extract)
+
+    pages = extract_page_range(pdf_path, 3, 3, mode=extractors.FAST)
+
+    assert pages[0][1] == "Page three, with (parentheses)"
+    assert pages[0][3] == "degraded"
+
+
+def test_incomplete_extractor_cannot_be_created(pdf_path):
+    """Test that a backend missing part of the interface fails when created, not during extraction."""
+    class TextOnly(extractors.Extractor):
+        def extract(self, page):
+            return ""
+
+    with pytest.raises(TypeError):
+        TextOnly(pdf_path)
+
+
+@pytest.mark.parametrize("text, usable", [
+    ("An ordinary page of born-digital text.", True),
+    ("", True),
+    ("Thewholepagewithoutanyspacesbetweenitswordsatall", False),
+    ("Unmapped ��� glyphs �� in the font", False),
+])
+def test_text_layer_heuristic(text, usable):
+    """Test the checks that make ``auto`` fall back to layout analysis."""
+    assert extractors.text_layer_looks_usable(text) is usable
+
+
+def test_auto_resolves_per_document(pdf_path, monkeypatch):
+    """Test that ``auto`` keeps the fast backend unless the sample looks broken."""
+    assert inspect_document(pdf_path, extractors.AUTO) == (3, extractors.FAST)
+    assert inspect_document(pdf_path, extractors.LAYOUT) == (3, extractors.LAYOUT)
+
+    monkeypatch.setattr(extractors, "text_layer_looks_usable", lambda text: False)
+    assert inspect_document(pdf_path, extractors.AUTO) == (3, extractors.LAYOUT)
+
+
+async def test_executor_mode_can_be_overridden_per_document(pdf_path):
+    """Test the executor default, a per-document override and mode validation."""
+    executor = ExtractionExecutor(kind="thread", max_workers=2, min_pages_per_task=1, mode=extractors.FAST)
+
+    try:
+        fast = await executor.extract_pages(pdf_path)
+        layout = await executor.extract_pages(pdf_path, mode=extractors.LAYOUT)
+        with pytest.raises(ValueError):
+            await executor.extract_pages(pdf_path, mode="ocr")
+    finally:
+        executor.shutdown()
+
+    assert [p["page"] for p in fast] == [p["page"] for p in layout] == [1, 3]
+    with pytest.raises(ValueError):
+        ExtractionExecutor(kind="thread", mode="ocr")
+
+
+def test_process_pdf_accepts_extractor_parameter(make_pdf, ingestion_main):
+    """Test selecting the backend per request and rejecting unknown ones."""
+    client = TestClient(ingestion_main.app)
+    pdf = make_pdf(["Selected per request " * 20])
+
+    response = client.post(
+        "/process_pdf", params={"extractor": "fast"}, files={"file": ("fast.pdf", pdf, "application/pdf")}
+    )
+    assert response.status_code == 200
+    assert response.json()["chunks"][0]["text"].startswith("Selected per request")
+
+    rejected = client.post(
+        "/process_pdf", params={"extractor": "ocr"}, files={"file": ("fast.pdf", pdf, "application/pdf")}
+    )
+    assert rejected.status_code == 422
@@ -0,0 +1,111 @@
+"""
+Tests for API Gateway - Structured Logging.
+"""
+import asyncio
+import json
+import logging
+
+from fastapi.testclient import TestClient
+
+from log_context import (
+    JsonFormatter,
+    RequestContextFilter,
+    SamplingFilter,
+    configure_logging,
+    request_id_var,
+    stop_logging,
+)
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _record(level=logging.INFO, **extra):
+    record = logging.LogRecord("test", level, __file__, 1, "value=%s", ("x",), None)
+    record.__dict__.update(extra)
+    return record
+
+
+async def test_concurrent_requests_keep_their_own_request_id():
+    """Test that interleaved tasks never tag log lines with each other's ID."""
+    handler = _ListHandler()
+    handler.addFilter(RequestContextFilter())
+    logger = logging.getLogger("test_gateway_logging.concurrent")
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    async def handle(request_id):
+        request_id_var.set(request_id)
+        for step in range(3):
+            logger.warning("step %d of %s", step, request_id)
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(asyncio.create_task(handle(f"req-{i}")) for i in range(5)))
+
+    assert len(handler.records) == 15
+    assert all(record.getMessage().endswith(record.request_id) for record in handler.records)
+
+
+def test_json_formatter_includes_context_and_extra_fields():
+    """Test the JSON line layout."""
+    entry = json.loads(JsonFormatter().format(_record(request_id="abc", upstream="ingestion")))
+
+    assert entry["request_id"] == "abc"
+    assert entry["message"] == "value=x"
+    assert entry["upstream"] == "ingestion"
+    assert entry["level"] == "INFO"
+
+
+def test_sampling_keeps_warnings_and_whole_requests():
+    """Test that sampling drops info lines per request but never warnings."""
+    drop_all = SamplingFilter(0.0)
+    keep_all = SamplingFilter(1.0)
+    token = request_id_var.set("some-request")
+    try:
+        assert not drop_all.filter(_record())
+        assert drop_all.filter(_record(level=logging.WARNING))
+        assert keep_all.filter(_record())
+        half = SamplingFilter(0.5)
+        assert len({half.filter(_record()) for _ in range(10)}) == 1
+    finally:
+        request_id_var.reset(token)
+
+
+def test_records_are_written_by_the_listener_thread(capsys):
+    """Test that queued records reach stdout as JSON once the listener drains."""
+    configure_logging(fmt="json")
+    try:
+        logging.getLogger("test_gateway_logging.queue").warning("queued %d", 42)
+    finally:
+        stop_logging()
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines() if "queued" in line]
+    assert lines[0]["message"] == "queued 42"
+    assert lines[0]["request_id"] == "-"
+
+
+def test_logging_is_configured_by_the_lifespan_only(gateway_main):
+    """Test that importing the gateway leaves the root logger alone and shutdown restores it."""
+    handlers = list(logging.getLogger().handlers)
+
+    with TestClient(gateway_main.app) as client:
+        assert client.get("/health").status_code == 200
+        assert len(logging.getLogger().handlers) == len(handlers) + 1
+
+    assert logging.getLogger().handlers == handlers
+
+
+def test_request_logs_carry_the_response_request_id(caplog, gateway_main):
+    """Test that the middleware binds the ID it returns to the request's log lines."""
+    with caplog.at_level(logging.INFO):
+        response = TestClient(gateway_main.app).get("/health")
+
+    request_id = response.headers["X-Request-ID"]
+    access = [record for record in caplog.records if record.name == "api_gateway.access"]
+    assert len(access) == 2
+    assert all(record.request_id == request_id for record in access)
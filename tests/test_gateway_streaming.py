@@ -0,0 +1,107 @@
+"""
+Tests for API Gateway - Streaming Uploads.
+"""
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def upstream(mock_upstream):
+    """Replace the ingestion service with an in-process mock that records uploads."""
+    received = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        received.append(body)
+        if request.url.params.get("async") == "true":
+            return httpx.Response(202, json={"job_id": "abc", "status": "queued", "status_url": "/jobs/abc"})
+        return httpx.Response(200, json={"document_id": 1, "total_chunks": 0, "size": len(body)})
+
+    mock_upstream(handler)
+    return received
+
+
+def test_upload_is_streamed_to_ingestion(upstream, make_pdf, gateway_main, api_headers):
+    """Test that the file bytes arrive upstream intact inside a multipart body."""
+    pdf = make_pdf(["hello"])
+    client = TestClient(gateway_main.app)
+
+    response = client.post("/upload", headers=api_headers, files={"file": ("paper.pdf", pdf, "application/pdf")})
+
+    assert response.status_code == 200
+    assert len(upstream) == 1
+    assert pdf in upstream[0]
+    assert b'filename="paper.pdf"' in upstream[0]
+
+
+def test_upload_rejects_non_pdf_before_forwarding(upstream, gateway_main, api_headers):
+    """Test that content without the PDF signature never reaches ingestion."""
+    client = TestClient(gateway_main.app)
+
+    response = client.post(
+        "/upload", headers=api_headers, files={"file": ("fake.pdf", b"not a pdf", "application/pdf")}
+    )
+
+    assert response.status_code == 400
+    assert upstream == []
+
+
+def test_upload_rejects_empty_file(upstream, gateway_main, api_headers):
+    """Test that empty uploads are rejected."""
+    client = TestClient(gateway_main.app)
+
+    response = client.post("/upload", headers=api_headers, files={"file": ("empty.pdf", b"", "application/pdf")})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "File is empty"
+
+
+def test_upload_rejects_oversized_file_mid_stream(upstream, monkeypatch, make_pdf, gateway_main, api_headers):
+    """Test that the size limit is enforced while streaming."""
+    monkeypatch.setattr(gateway_main, "MAX_FILE_SIZE", 1024)
+    client = TestClient(gateway_main.app)
+    pdf = make_pdf(["x" * 80] * 40)
+    assert len(pdf) > 1024
+
+    response = client.post("/upload", headers=api_headers, files={"file": ("big.pdf", pdf, "application/pdf")})
+
+    assert response.status_code == 413
+
+
+def test_upload_rejects_wrong_extension(upstream, gateway_main, api_headers):
+    """Test that only .pdf filenames are accepted."""
+    client = TestClient(gateway_main.app)
+
+    response = client.post("/upload", headers=api_headers, files={"file": ("notes.txt", b"%PDF-1.4", "text/plain")})
+
+    assert response.status_code == 400
+
+
+def test_async_upload_returns_job(upstream, make_pdf, gateway_main, api_headers):
+    """Test that ?async=true is forwarded and the 202 job handle passed through."""
+    client = TestClient(gateway_main.app)
+
+    response = client.post(
+        "/upload?async=true", headers=api_headers,
+        files={"file": ("paper.pdf", make_pdf(["hi"]), "application/pdf")}
+    )
+
+    assert response.status_code == 202
+    assert response.json()["job_id"] == "abc"
+
+
+def test_busy_ingestion_propagates_retry_after(make_pdf, gateway_main, api_headers, mock_upstream):
+    """Test that upstream overload keeps its status code and Retry-After."""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        return httpx.Response(503, headers={"Retry-After": "7"}, json={"detail": "full"})
+
+    mock_upstream(handler)
+    response = TestClient(gateway_main.app).post(
+        "/upload?async=true", headers=api_headers,
+        files={"file": ("paper.pdf", make_pdf(["hi"]), "application/pdf")}
+    )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
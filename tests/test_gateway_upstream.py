@@ -0,0 +1,63 @@
+"""
+Tests for API Gateway - Shared Ingestion Client.
+"""
+import httpx
+from fastapi.testclient import TestClient
+from prometheus_client import generate_latest
+
+import upstream
+
+
+def test_client_is_created_once_per_lifespan(gateway_main):
+    """Test that the lifespan owns one pooled client and closes it on shutdown."""
+    with TestClient(gateway_main.app) as client:
+        shared = gateway_main.app.state.ingestion_client
+        embeddings = gateway_main.app.state.embeddings_client
+        client.get("/health")
+        assert upstream.get_ingestion_client(gateway_main.app) is shared
+        assert upstream.get_embeddings_client(gateway_main.app) is embeddings
+        assert embeddings is not shared
+        assert not shared.is_closed
+
+    assert shared.is_closed
+    assert embeddings.is_closed
+
+
+def test_client_uses_configured_limits_and_timeouts():
+    """Test that pool limits and split timeouts come from configuration."""
+    client = upstream.create_ingestion_client()
+
+    assert client.timeout.connect == upstream.INGESTION_CONNECT_TIMEOUT
+    assert client.timeout.read == upstream.INGESTION_READ_TIMEOUT
+    pool = client._transport._pool
+    assert pool._max_connections == upstream.INGESTION_MAX_CONNECTIONS
+    assert pool._max_keepalive_connections == upstream.INGESTION_MAX_KEEPALIVE_CONNECTIONS
+
+
+def test_pool_metrics_are_exported():
+    """Test that pool utilisation shows up in the Prometheus registry."""
+    upstream.create_ingestion_client()
+    output = generate_latest().decode()
+
+    assert 'gateway_upstream_pool_connections{state="idle"}' in output
+    assert "gateway_upstream_pool_queued_requests" in output
+    assert "gateway_upstream_pool_max_connections" in output
+
+
+def test_search_is_forwarded_to_embeddings_service(gateway_main, api_headers, mock_upstream):
+    """Test that /search proxies the query to the embeddings service."""
+    seen = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/corpus_version":
+            return httpx.Response(200, json={"version": 0})
+        seen.append((request.url.path, await request.aread()))
+        return httpx.Response(200, json={"query": "q", "results": [{"document_id": 1, "ordinal": 0, "score": 0.9}]})
+
+    mock_upstream(handler, services=("embeddings",))
+    response = TestClient(gateway_main.app).post("/search", headers=api_headers, json={"query": "q", "k": 1})
+
+    assert response.status_code == 200
+    assert response.json()["results"][0]["score"] == 0.9
+    assert seen[0][0] == "/search"
+    assert b'"query"' in seen[0][1]
@@ -1,22 +1,7 @@
 """
 Tests for Ingestion Service - Utility Functions.
 """
-from pathlib import Path
-import sys
-import importlib.util
-
-# Add ingestion_service directory to Python path so imports work
-ingestion_service_dir = Path(__file__).parent.parent / "services" / "ingestion_service"
-sys.path.insert(0, str(ingestion_service_dir))
-
-# Load the ingestion service main module directly
-ingestion_main_path = ingestion_service_dir / "main.py"
-spec = importlib.util.spec_from_file_location("ingestion_main", ingestion_main_path)
-ingestion_main = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(ingestion_main)
-
-# Get the chunk_text function
-chunk_text = ingestion_main.chunk_text
+from utils import chunk_text
 
 
 def test_chunk_text_function():
@@ -45,11 +30,10 @@ def test_chunk_text_exact_size():
     text = "B" * 1000  # Exactly 1000 characters
     chunks = chunk_text(text, chunk_size=1000, overlap=100)
 
-    # With overlap=100, algorithm creates 2 chunks even for exact size
-    # Chunk 1: 0-1000, Chunk 2: 900-1000 (last 100 chars due to overlap)
-    assert len(chunks) == 2
+    # The first chunk already reaches the end of the text, so no trailing
+    # chunk made up only of overlap is produced
+    assert len(chunks) == 1
     assert len(chunks[0]) == 1000
-    assert len(chunks[1]) == 100  # Only the remaining chars after overlap
 
 
 def test_chunk_text_overlap():
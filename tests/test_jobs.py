@@ -0,0 +1,103 @@
+"""
+Tests for asynchronous ingestion jobs.
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from jobs import JobQueue, JobStatus, QueueFullError
+
+
+async def test_job_queue_runs_jobs_and_records_results():
+    """Test that queued jobs are processed by the workers."""
+    async def handler(job, payload):
+        job.update_progress(1, 1)
+        return {"value": payload * 2}
+
+    queue = JobQueue(handler, workers=2, max_queued=4)
+    queue.start()
+    try:
+        job = queue.submit("a.pdf", 21)
+        for _ in range(100):
+            if job.finished:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await queue.stop()
+
+    assert job.status == JobStatus.SUCCEEDED
+    assert job.result == {"value": 42}
+    assert (job.pages_done, job.pages_total) == (1, 1)
+
+
+async def test_job_queue_sheds_load_when_full():
+    """Test that submissions beyond the queue bound are refused with a retry hint."""
+    release = asyncio.Event()
+
+    async def handler(job, payload):
+        await release.wait()
+        return {}
+
+    queue = JobQueue(handler, workers=1, max_queued=1)
+    queue.start()
+    try:
+        queue.submit("running.pdf", None)
+        await asyncio.sleep(0)  # Let the worker pick up the first job
+        queue.submit("queued.pdf", None)
+
+        with pytest.raises(QueueFullError) as exc_info:
+            queue.submit("rejected.pdf", None)
+        assert exc_info.value.retry_after >= 1
+    finally:
+        release.set()
+        await queue.stop()
+
+
+async def test_failed_job_reports_error():
+    """Test that handler errors mark the job as failed."""
+    async def handler(job, payload):
+        raise ValueError("broken PDF")
+
+    queue = JobQueue(handler, workers=1)
+    queue.start()
+    try:
+        job = queue.submit("bad.pdf", None)
+        for _ in range(100):
+            if job.finished:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await queue.stop()
+
+    assert job.status == JobStatus.FAILED
+    assert job.error == "broken PDF"
+
+
+def test_async_process_pdf_returns_202_and_job_result(make_pdf, ingestion_main):
+    """Test the ?async=true flow end to end: accept, poll, fetch result."""
+    pdf = make_pdf(["Asynchronous ingestion", "Page two"])
+
+    with TestClient(ingestion_main.app) as client:
+        response = client.post("/process_pdf?async=true", files={"file": ("async.pdf", pdf, "application/pdf")})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        assert response.json()["status_url"] == f"/jobs/{job_id}"
+
+        for _ in range(200):
+            status = client.get(f"/jobs/{job_id}").json()
+            if status["status"] in ("succeeded", "failed"):
+                break
+            time.sleep(0.01)
+
+    assert status["status"] == "succeeded"
+    assert status["pages_done"] == status["pages_total"] == 2
+    assert status["result"]["total_pages"] == 2
+    assert "Asynchronous ingestion" in status["result"]["chunks"][0]["text"]
+
+
+def test_unknown_job_returns_404(ingestion_main):
+    """Test that polling an unknown job id returns 404."""
+    with TestClient(ingestion_main.app) as client:
+        assert client.get("/jobs/does-not-exist").status_code == 404
@@ -0,0 +1,70 @@
+"""
+Tests for streaming NDJSON responses.
+"""
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+NDJSON = {"Accept": "application/x-ndjson"}
+
+
+def _records(body: str) -> list[dict]:
+    return [json.loads(line) for line in body.splitlines() if line]
+
+
+def test_process_pdf_streams_header_chunks_trailer(make_pdf, ingestion_main):
+    """Test the NDJSON record sequence from the ingestion service."""
+    pdf = make_pdf([f"Streaming page {i} " * 30 for i in range(1, 6)])
+    client = TestClient(ingestion_main.app)
+
+    response = client.post("/process_pdf", headers=NDJSON, files={"file": ("stream.pdf", pdf, "application/pdf")})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = _records(response.text)
+    assert records[0]["type"] == "header"
+    assert records[-1]["type"] == "trailer"
+    chunks = [r for r in records if r["type"] == "chunk"]
+    assert records[-1]["total_chunks"] == len(chunks) > 1
+    assert records[-1]["total_pages"] == 5
+    assert [c["chunk_id"] for c in chunks] == list(range(len(chunks)))
+
+
+def test_ndjson_matches_json_response(make_pdf, ingestion_main):
+    """Test that streamed chunks equal the regular JSON response chunks."""
+    pdf = make_pdf(["Same content either way " * 50, "Another page " * 40])
+    client = TestClient(ingestion_main.app)
+
+    streamed = _records(client.post(
+        "/process_pdf", headers=NDJSON, files={"file": ("same.pdf", pdf, "application/pdf")}
+    ).text)
+    regular = client.post("/process_pdf", files={"file": ("same.pdf", pdf, "application/pdf")}).json()
+
+    chunks = [{k: v for k, v in r.items() if k != "type"} for r in streamed if r["type"] == "chunk"]
+    assert chunks == regular["chunks"]
+    assert streamed[-1]["document_id"] == regular["document_id"]
+
+
+def test_gateway_proxies_ndjson_stream(make_pdf, gateway_main, api_headers, mock_upstream):
+    """Test that the gateway passes an NDJSON stream through unchanged."""
+    lines = [b'{"type": "header"}\n', b'{"type": "chunk", "chunk_id": 0}\n', b'{"type": "trailer"}\n']
+
+    async def stream():
+        for line in lines:
+            yield line
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        assert request.headers["accept"] == "application/x-ndjson"
+        return httpx.Response(200, headers={"Content-Type": "application/x-ndjson"}, content=stream())
+
+    mock_upstream(handler)
+    response = TestClient(gateway_main.app).post(
+        "/upload",
+        headers={**NDJSON, **api_headers},
+        files={"file": ("paper.pdf", make_pdf(["hi"]), "application/pdf")}
+    )
+
+    assert response.status_code == 200
+    assert response.content == b"".join(lines)
@@ -0,0 +1,161 @@
+"""
+Tests for API Gateway - Search Query Cache.
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from query_cache import QueryCache, query_key
+
+
+def test_key_normalizes_query_and_parameter_order():
+    """Test that whitespace and key order do not split the cache, while the version does."""
+    key = query_key("/search", {"query": "BRCA1  repair\n", "k": 5}, 1)
+
+    assert key == query_key("/search", {"k": 5, "query": "BRCA1 repair"}, 1)
+    assert key != query_key("/search", {"k": 5, "query": "BRCA1 repair"}, 2)
+    assert key != query_key("/search", {"k": 6, "query": "BRCA1 repair"}, 1)
+
+
+def test_entries_expire_and_evict_least_recently_used(monkeypatch):
+    """Test TTL expiry and LRU eviction under the byte budget."""
+    now = [1000.0]
+    monkeypatch.setattr("query_cache.time.monotonic", lambda: now[0])
+    cache = QueryCache(max_bytes=10, ttl_seconds=60)
+    cache.put("a", 200, b"aaaa")
+    cache.put("b", 200, b"bbbb")
+    cache.get("a")
+    cache.put("c", 200, b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == (200, b"aaaa")
+    assert cache.size_bytes == 8
+
+    now[0] += 61
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+
+async def test_concurrent_misses_are_coalesced():
+    """Test that identical concurrent misses share one computation."""
+    cache = QueryCache()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 200, b"{}"
+
+    results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+
+    assert calls == 1
+    assert sorted(outcome for _, outcome in results) == ["coalesced"] * 4 + ["miss"]
+    assert await cache.get_or_compute("k", compute) == ((200, b"{}"), "hit")
+
+
+async def test_errors_are_shared_but_not_cached():
+    """Test that a failed computation fails its waiters and is retried afterwards."""
+    cache = QueryCache()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(*(cache.get_or_compute("k", fail) for _ in range(2)), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache.get("k") is None
+
+
+async def test_cancelled_leader_hands_off_to_a_waiter():
+    """Test that waiters are not cancelled with the request computing their response."""
+    cache = QueryCache()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return 200, b"{}"
+
+    leader = asyncio.create_task(cache.get_or_compute("k", compute))
+    await asyncio.sleep(0.01)
+    waiters = [asyncio.create_task(cache.get_or_compute("k", compute)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    results = await asyncio.gather(*waiters)
+    assert calls == 2
+    assert sorted(outcome for _, outcome in results) == ["coalesced", "miss"]
+    assert cache.get("k") == (200, b"{}")
+
+
+async def test_version_is_refreshed_at_most_once_per_interval(monkeypatch):
+    """Test that concurrent refreshes share a fetch and a new version clears the cache."""
+    now = [1000.0]
+    monkeypatch.setattr("query_cache.time.monotonic", lambda: now[0])
+    cache = QueryCache(version_ttl_seconds=1.0)
+    versions = iter([5, 5, 8])
+    fetches = 0
+
+    async def fetch():
+        nonlocal fetches
+        fetches += 1
+        await asyncio.sleep(0)
+        return next(versions)
+
+    await asyncio.gather(*(cache.refresh_version(fetch) for _ in range(3)))
+    cache.put(cache.key("/search", {"query": "q"}), 200, b"{}")
+    assert (fetches, cache.version, len(cache)) == (1, 5, 1)
+
+    now[0] += 2
+    await cache.refresh_version(fetch)
+    assert (cache.version, len(cache)) == (5, 1)
+
+    now[0] += 2
+    await cache.refresh_version(fetch)
+    assert (fetches, cache.version, len(cache)) == (3, 8, 0)
+
+
+@pytest.fixture
+def search_upstream(monkeypatch, gateway_main, mock_upstream):
+    """Fresh cache and mock upstreams answering searches, uploads and the corpus version."""
+    monkeypatch.setattr(gateway_main, "query_cache", QueryCache())
+    state = {"calls": [], "version": 1}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/corpus_version":
+            return httpx.Response(200, json={"version": state["version"]})
+        state["calls"].append(request.url.path)
+        if request.url.path == "/process_pdf":
+            return httpx.Response(200, json={"document_id": 1, "total_chunks": 1})
+        return httpx.Response(200, json={"query": "q", "results": [], "calls": len(state["calls"])})
+
+    mock_upstream(handler, services=("ingestion", "embeddings"))
+    return state
+
+
+def test_search_is_cached_until_new_chunks_are_indexed(search_upstream, gateway_main, api_headers):
+    """Test that uploads alone keep the cache and a new corpus version invalidates it."""
+    client = TestClient(gateway_main.app)
+
+    first = client.post("/search", headers=api_headers, json={"query": "gene  therapy", "k": 3})
+    second = client.post("/search", headers=api_headers, json={"k": 3, "query": "gene therapy"})
+    assert (first.headers["X-Cache"], second.headers["X-Cache"]) == ("miss", "hit")
+    assert second.json() == first.json()
+
+    upload = client.post(
+        "/upload", headers=api_headers, files={"file": ("paper.pdf", b"%PDF-1.4 test", "application/pdf")}
+    )
+    assert upload.status_code == 200
+    # Not searchable until the embeddings service has indexed the chunks
+    repeated = client.post("/search", headers=api_headers, json={"query": "gene therapy", "k": 3})
+    assert repeated.headers["X-Cache"] == "hit"
+
+    search_upstream["version"] = 2
+    third = client.post("/search", headers=api_headers, json={"query": "gene therapy", "k": 3})
+    assert third.headers["X-Cache"] == "miss"
+    assert search_upstream["calls"] == ["/search", "/process_pdf", "/search"]
@@ -0,0 +1,82 @@
+"""
+Tests for stage metrics and request-ID propagation across services.
+"""
+import logging
+
+import httpx
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+import upstream
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_ingestion_logs_and_echoes_forwarded_request_id(make_pdf, caplog, ingestion_main):
+    """Test that log lines of a request carry the caller's X-Request-ID."""
+    client = TestClient(ingestion_main.app)
+
+    with caplog.at_level(logging.INFO):
+        response = client.post(
+            "/process_pdf",
+            headers={"X-Request-ID": "trace-123"},
+            files={"file": ("traced.pdf", make_pdf(["Tracing across services " * 20]), "application/pdf")}
+        )
+
+    assert response.status_code == 200
+    assert response.headers["X-Request-ID"] == "trace-123"
+    records = [record for record in caplog.records if "traced.pdf" in record.getMessage()]
+    assert records and all(record.request_id == "trace-123" for record in records)
+
+
+def test_process_pdf_records_stage_metrics(make_pdf, ingestion_main):
+    """Test that each processing stage is observed."""
+    before = {
+        stage: _sample("ingestion_stage_seconds_count", stage=stage)
+        for stage in ("read", "extract", "chunk", "commit", "serialize")
+    }
+    pages_before = _sample("ingestion_pdf_pages_count")
+
+    response = TestClient(ingestion_main.app).post(
+        "/process_pdf",
+        files={"file": ("stages.pdf", make_pdf(["Stage metrics page one", "Page two"]), "application/pdf")}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["total_pages"] == 2
+    for stage, count in before.items():
+        assert _sample("ingestion_stage_seconds_count", stage=stage) == count + 1, stage
+    assert _sample("ingestion_pdf_pages_count") == pages_before + 1
+    assert _sample("ingestion_pdf_bytes_count") > 0
+
+
+def test_gateway_forwards_request_id_upstream(gateway_main, api_headers, mock_upstream):
+    """Test that the ID returned to the client is the one sent to the ingestion service."""
+    seen = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers.get("X-Request-ID"))
+        return httpx.Response(200, json={"job_id": "j1", "status": "running"})
+
+    mock_upstream(handler)
+    response = TestClient(gateway_main.app).get("/jobs/j1", headers=api_headers)
+
+    assert response.status_code == 200
+    assert seen == [response.headers["X-Request-ID"]]
+
+
+async def test_instrumented_transport_tracks_latency_and_in_flight():
+    """Test upstream latency labels and that in-flight drops once the body is closed."""
+    transport = upstream.InstrumentedTransport(httpx.MockTransport(lambda request: httpx.Response(200, text="ok")))
+    labels = {"upstream": "ingestion:8001", "endpoint": "/jobs", "status": "200"}
+    before = _sample("gateway_upstream_request_seconds_count", **labels)
+
+    async with httpx.AsyncClient(transport=transport) as client:
+        async with client.stream("GET", "http://ingestion:8001/jobs/abc") as response:
+            assert _sample("gateway_upstream_requests_in_flight", upstream="ingestion:8001") == 1
+            assert await response.aread() == b"ok"
+
+    assert _sample("gateway_upstream_requests_in_flight", upstream="ingestion:8001") == 0
+    assert _sample("gateway_upstream_request_seconds_count", **labels) == before + 1
@@ -0,0 +1,183 @@
+"""
+Tests for API Gateway - Resumable Uploads.
+"""
+import asyncio
+import hashlib
+import os
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from resumable import ResumableUploadStore
+
+
+@pytest.fixture
+def upstream(mock_upstream):
+    """Mock ingestion service that records uploaded bodies; 503 while ``busy`` is set."""
+    state = {"received": [], "busy": False}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if state["busy"]:
+            return httpx.Response(503, headers={"Retry-After": "5"})
+        state["received"].append(await request.aread())
+        return httpx.Response(200, json={"document_id": 7, "total_chunks": 3})
+
+    mock_upstream(handler)
+    return state
+
+
+@pytest.fixture
+def client(gateway_main):
+    return TestClient(gateway_main.app)
+
+
+@pytest.fixture
+def put(client, api_headers):
+    """Send bytes ``start``.. of an upload of ``size`` bytes."""
+    def put(upload_id, data, start, size):
+        return client.put(
+            f"/uploads/{upload_id}", content=data,
+            headers={**api_headers, "Content-Range": f"bytes {start}-{start + len(data) - 1}/{size}"}
+        )
+    return put
+
+
+def test_upload_in_parts_with_overlapping_retry(client, upstream, make_pdf, api_headers, put):
+    """Test a full session: parts, a resent overlapping part, offset query and completion."""
+    pdf = make_pdf(["resumable " * 50] * 3)
+    size = len(pdf)
+    created = client.post(
+        "/uploads", headers=api_headers,
+        json={"filename": "thesis.pdf", "size": size, "sha256": hashlib.sha256(pdf).hexdigest()}
+    )
+    assert created.status_code == 201
+    upload_id = created.json()["upload_id"]
+    assert created.headers["Location"] == f"/uploads/{upload_id}"
+
+    third = size // 3
+    assert put(upload_id, pdf[:third], 0, size).json()["offset"] == third
+    # The client lost the response and resends from an earlier position
+    assert put(upload_id, pdf[third // 2:2 * third], third // 2, size).json()["offset"] == 2 * third
+    assert client.get(f"/uploads/{upload_id}", headers=api_headers).json()["offset"] == 2 * third
+    assert put(upload_id, pdf[2 * third:], 2 * third, size).json()["complete"] is True
+
+    response = client.post(f"/uploads/{upload_id}/complete", headers=api_headers)
+
+    assert response.status_code == 200
+    assert response.json()["document_id"] == 7
+    assert pdf in upstream["received"][0]
+    assert b'filename="thesis.pdf"' in upstream["received"][0]
+    assert client.get(f"/uploads/{upload_id}", headers=api_headers).status_code == 404
+
+
+def test_out_of_order_and_incomplete_uploads_are_refused(client, upstream, make_pdf, api_headers, put):
+    """Test that gaps are rejected and completion waits for all bytes."""
+    pdf = make_pdf(["gap"])
+    created = client.post("/uploads", headers=api_headers, json={"filename": "a.pdf", "size": len(pdf)})
+    upload_id = created.json()["upload_id"]
+
+    assert put(upload_id, pdf[10:20], 10, len(pdf)).status_code == 409
+    assert put(upload_id, pdf[:10], 0, len(pdf)).status_code == 200
+    assert client.post(f"/uploads/{upload_id}/complete", headers=api_headers).status_code == 409
+    assert upstream["received"] == []
+
+
+def test_bad_content_range_and_oversized_upload(client, upstream, monkeypatch, gateway_main, api_headers, put):
+    """Test header validation and the resumable size limit."""
+    monkeypatch.setattr(gateway_main.resumable_uploads, "max_size", 1000)
+    assert client.post("/uploads", headers=api_headers, json={"filename": "big.pdf", "size": 1001}).status_code == 413
+    assert client.post("/uploads", headers=api_headers, json={"filename": "doc.txt", "size": 10}).status_code == 400
+
+    created = client.post("/uploads", headers=api_headers, json={"filename": "a.pdf", "size": 100})
+    upload_id = created.json()["upload_id"]
+
+    response = client.put(
+        f"/uploads/{upload_id}", content=b"%PDF-", headers={**api_headers, "Content-Range": "bytes 0-4/200"}
+    )
+    assert response.status_code == 400
+
+
+def test_non_pdf_is_rejected_after_first_part(client, upstream, api_headers, put):
+    """Test that the PDF signature is checked as soon as the first bytes arrive."""
+    created = client.post("/uploads", headers=api_headers, json={"filename": "a.pdf", "size": 100})
+    upload_id = created.json()["upload_id"]
+
+    assert put(upload_id, b"GIF89a", 0, 100).status_code == 400
+    assert client.get(f"/uploads/{upload_id}", headers=api_headers).status_code == 404
+
+
+def test_checksum_mismatch_discards_upload(client, upstream, make_pdf, api_headers, put):
+    """Test that a file not matching its declared SHA-256 is never forwarded."""
+    pdf = make_pdf(["checksum"])
+    upload_id = client.post(
+        "/uploads", headers=api_headers, json={"filename": "a.pdf", "size": len(pdf), "sha256": "0" * 64}
+    ).json()["upload_id"]
+    put(upload_id, pdf, 0, len(pdf))
+
+    response = client.post(f"/uploads/{upload_id}/complete", headers=api_headers)
+
+    assert response.status_code == 400
+    assert upstream["received"] == []
+
+
+def test_failed_completion_can_be_retried(client, upstream, make_pdf, api_headers, put):
+    """Test that an ingestion failure keeps the received file for another attempt."""
+    pdf = make_pdf(["retry"])
+    created = client.post("/uploads", headers=api_headers, json={"filename": "a.pdf", "size": len(pdf)})
+    upload_id = created.json()["upload_id"]
+    put(upload_id, pdf, 0, len(pdf))
+
+    upstream["busy"] = True
+    busy = client.post(f"/uploads/{upload_id}/complete", headers=api_headers)
+    assert busy.status_code == 503
+    assert busy.headers["Retry-After"] == "5"
+
+    upstream["busy"] = False
+    assert client.post(f"/uploads/{upload_id}/complete", headers=api_headers).status_code == 200
+
+
+async def test_concurrent_completions_forward_the_file_once(upstream, make_pdf, gateway_main, api_headers, put):
+    """Test that a second completion of the same upload is refused rather than forwarded again."""
+    pdf = make_pdf(["twice"])
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=gateway_main.app), base_url="http://gateway"
+    ) as client:
+        upload_id = (await client.post(
+            "/uploads", headers=api_headers, json={"filename": "a.pdf", "size": len(pdf)}
+        )).json()["upload_id"]
+        await client.put(
+            f"/uploads/{upload_id}", content=pdf,
+            headers={**api_headers, "Content-Range": f"bytes 0-{len(pdf) - 1}/{len(pdf)}"}
+        )
+        responses = await asyncio.gather(
+            *(client.post(f"/uploads/{upload_id}/complete", headers=api_headers) for _ in range(3))
+        )
+
+    codes = sorted(response.status_code for response in responses)
+    assert codes[0] == 200 and set(codes[1:]) <= {404, 409}
+    assert len(upstream["received"]) == 1
+
+
+async def test_bytes_before_a_dropped_connection_are_kept(tmp_path):
+    """Test that an interrupted part keeps what arrived and the hash stays consistent."""
+    store = ResumableUploadStore(str(tmp_path), max_size=10_000, ttl_seconds=60, max_sessions=4)
+    data = b"%PDF-" + os.urandom(995)
+    session = store.create("a.pdf", len(data))
+
+    async def dropped():
+        yield data[:300]
+        raise ConnectionResetError("client went away")
+
+    async def rest():
+        yield data[300:]
+
+    with pytest.raises(ConnectionResetError):
+        await store.write(session, 0, len(data), dropped())
+    assert session.offset == 300
+
+    await store.write(session, 300, len(data), rest())
+    assert store.verify(session) == hashlib.sha256(data).hexdigest()
+    assert b"".join([chunk async for chunk in store.iter_file(session)]) == data
+    store.close()
+    assert not any(tmp_path.iterdir())
@@ -0,0 +1,76 @@
+"""
+Tests for Embeddings Service - Vector Store and Search.
+"""
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from vector_store import VectorStore
+
+
+def _brute_force(vectors, query, k):
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.argsort(-(vectors @ (query / np.linalg.norm(query))))[:k].tolist()
+
+
+def test_search_matches_brute_force_across_segments_and_blocks(tmp_path):
+    """Test that blocked top-k search returns the exact nearest neighbours."""
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((300, 16)).astype(np.float32)
+    store = VectorStore(str(tmp_path), dimension=16, segment_rows=128, block_rows=50)
+    store.add(1, range(200), vectors[:200])
+    store.add(2, range(100), vectors[200:])
+
+    query = rng.standard_normal(16).astype(np.float32)
+    hits = store.search(query, k=5)[0]
+
+    expected = _brute_force(vectors, query, 5)
+    assert [(h.document_id, h.ordinal) for h in hits] == [
+        (1, i) if i < 200 else (2, i - 200) for i in expected
+    ]
+    assert hits[0].score >= hits[-1].score
+    assert len(list(tmp_path.glob("*.vec"))) == 3
+
+
+def test_search_filters_by_document(tmp_path):
+    """Test that results are restricted to the requested documents."""
+    store = VectorStore(str(tmp_path), dimension=4)
+    store.add(1, [0, 1], np.eye(4, dtype=np.float32)[:2])
+    store.add(2, [0, 1], np.eye(4, dtype=np.float32)[:2])
+
+    hits = store.search(np.array([1, 0, 0, 0], dtype=np.float32), k=10, document_ids=[2])[0]
+
+    assert {h.document_id for h in hits} == {2}
+    assert (hits[0].ordinal, round(hits[0].score, 5)) == (0, 1.0)
+
+
+def test_store_reopens_from_disk(tmp_path):
+    """Test that committed vectors are mapped again on restart."""
+    store = VectorStore(str(tmp_path), dimension=4, dtype="float16")
+    store.add(7, [3], np.array([[0, 0, 1, 0]], dtype=np.float32))
+
+    reopened = VectorStore(str(tmp_path), dimension=4, dtype="float16")
+    assert len(reopened) == 1
+    assert reopened.search(np.array([0, 0, 1, 0], dtype=np.float32), k=1)[0][0].ordinal == 3
+
+    with pytest.raises(ValueError):
+        VectorStore(str(tmp_path), dimension=8, dtype="float16")
+
+
+def test_index_and_search_endpoints(tmp_path, monkeypatch, embeddings_main):
+    """Test indexing chunks and searching them over HTTP."""
+    monkeypatch.setattr(embeddings_main, "VECTOR_STORE_PATH", str(tmp_path / "vectors"))
+    monkeypatch.setattr(embeddings_main, "ANN_INDEX_PATH", str(tmp_path / "ivf"))
+    monkeypatch.setattr(embeddings_main, "BM25_INDEX_PATH", str(tmp_path / "bm25"))
+
+    with TestClient(embeddings_main.app) as client:
+        response = client.post("/index", json={"document_id": 5, "chunks": [
+            {"ordinal": 0, "text": "Gradient descent optimises neural network weights."},
+            {"ordinal": 1, "text": "The recipe needs flour, eggs and butter."},
+        ]})
+        assert response.json() == {"document_id": 5, "indexed": 2}
+
+        results = client.post("/search", json={"query": "neural network gradient descent", "k": 2}).json()["results"]
+
+    assert [r["ordinal"] for r in results] == [0, 1]
+    assert results[0]["document_id"] == 5